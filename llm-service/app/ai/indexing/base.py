@@ -4,11 +4,14 @@ import os
 from abc import abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Type, Optional, TypeVar
+from typing import Any, Dict, Type, Optional, TypeVar
 
+from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.schema import BaseNode
 
-from .readers.base_reader import BaseReader, ReaderConfig
+from .parsed_document_cache import parsed_document_cache
+from .reader_pool import reader_pool
+from .readers.base_reader import BaseReader, ParsedDocument, ReaderConfig
 from .readers.csv import CSVReader
 from .readers.docling_reader import DoclingReader
 from .readers.docx import DocxReader
@@ -57,6 +60,8 @@ class NotSupportedFileExtensionError(Exception):
 
 
 class BaseTextIndexer:
+    splitter: SentenceSplitter
+
     def __init__(
         self,
         data_source_id: int,
@@ -76,6 +81,32 @@ class BaseTextIndexer:
     def index_file(self, file_path: Path, doc_id: str) -> None:
         pass
 
+    @abstractmethod
+    def index_parsed_document(self, parsed: ParsedDocument, doc_id: str) -> None:
+        pass
+
+    def parse_file(self, file_path: Path, doc_id: str) -> ParsedDocument:
+        """Parses the file with the reader `index_file` would use, without chunking it."""
+        return self._get_reader(file_path, doc_id).parse(file_path)
+
+    def parser_key(self, file_path: Path) -> tuple[Any, ...]:
+        """Identifies how `parse_file` would parse the file: which reader, with which config."""
+        reader_cls = self._get_reader_class(file_path)
+        return reader_cls.__name__, reader_cls.config_key(
+            self.reader_config or ReaderConfig()
+        )
+
+    def _get_reader(self, file_path: Path, doc_id: str) -> BaseReader:
+        reader_cls = self._get_reader_class(file_path)
+        return reader_cls(
+            splitter=self.splitter,
+            document_id=doc_id,
+            data_source_id=self.data_source_id,
+            config=self.reader_config,
+            cache=parsed_document_cache(),
+            pool=reader_pool(reader_cls.loads_models),
+        )
+
     def _get_reader_class(self, file_path: Path) -> Type[BaseReader]:
         file_extension = os.path.splitext(file_path)[1]
         reader_cls: Optional[Type[BaseReader]] = None
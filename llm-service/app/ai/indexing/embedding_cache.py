@@ -0,0 +1,218 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Callable, List, Optional, Sequence, cast
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Upper bound on the number of inserts between checks of the cache size.
+_EVICTION_CHECK_INTERVAL = 1000
+
+
+def model_key(embedding_model: BaseEmbedding) -> str:
+    """Identifies the embedding model that produced a vector."""
+    return f"{type(embedding_model).__name__}:{embedding_model.model_name}"
+
+
+def text_key(text: str) -> str:
+    """Hash of the chunk text, ignoring differences in unicode form and whitespace."""
+    normalized = _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, size-bounded cache of embedding vectors keyed by (embedding model, chunk text hash).
+
+    Backed by a SQLite database; once more than `max_entries` vectors are stored, the least recently
+    used ones are evicted. Vectors are stored as float32.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inserts_since_eviction = 0
+        self._eviction_check_interval = min(
+            _EVICTION_CHECK_INTERVAL, max(1, max_entries // 10)
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access INTEGER NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+        )
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[Embedding]]:
+        """Returns the cached vector for each text, or None where there is no entry."""
+        keys = [text_key(text) for text in texts]
+        found: dict[str, Embedding] = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                key_slice = keys[start : start + 500]
+                placeholders = ",".join("?" * len(key_slice))
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *key_slice],
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[text_hash] = array("f", vector).tolist()
+            if found:
+                now = time.time_ns()
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found],
+                )
+        return [found.get(key) for key in keys]
+
+    def put_many(
+        self, model: str, texts: Sequence[str], embeddings: Sequence[Embedding]
+    ) -> None:
+        now = time.time_ns()
+        rows = [
+            (model, text_key(text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._inserts_since_eviction += len(rows)
+            if self._inserts_since_eviction >= self._eviction_check_interval:
+                self._evict()
+
+    def _evict(self) -> None:
+        self._inserts_since_eviction = 0
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        logger.debug(f"Evicting {excess} entries from the embedding cache")
+        self._connection.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()
+        return int(count)
+
+
+_caches: dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Returns the embedding cache for the configured databases dir, or None if caching is disabled."""
+    if not settings.embedding_cache_enabled:
+        return None
+    path = os.path.join(settings.rag_databases_dir, "embedding_cache.sqlite")
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = EmbeddingCache(path, settings.embedding_cache_max_entries)
+            _caches[path] = cache
+        return cache
+
+
+def embed_with_cache(
+    embedding_model: BaseEmbedding,
+    texts: Sequence[str],
+    compute: Optional[Callable[[List[str]], List[Embedding]]] = None,
+) -> List[Embedding]:
+    """
+    Embeds `texts`, only calling the embedding model for texts that are not already cached.
+
+    `compute` makes the actual embedding call; it defaults to the model's `get_text_embedding_batch`.
+    """
+    compute = compute or embedding_model.get_text_embedding_batch
+    cache = get_embedding_cache()
+    if cache is None:
+        return compute(list(texts))
+
+    model = model_key(embedding_model)
+    embeddings = cache.get_many(model, texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        computed = compute([texts[i] for i in missing])
+        if len(computed) != len(missing):
+            raise ValueError(
+                f"Expected {len(missing)} embedding vectors for this batch of chunks,"
+                + f" but got {len(computed)} from {embedding_model.model_name}"
+            )
+        cache.put_many(model, [texts[i] for i in missing], computed)
+        for i, embedding in zip(missing, computed):
+            embeddings[i] = embedding
+    logger.debug(
+        f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses"
+    )
+    return cast(List[Embedding], embeddings)
@@ -0,0 +1,371 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Callable, Iterator, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import BaseModel
+
+from .embedding_cache import model_key
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 15
+MIN_BATCH_SIZE = 1
+MAX_BATCH_SIZE = 512
+BATCH_SIZE_STEP = 16
+MAX_ATTEMPTS = 6
+
+# Weight of the newest sample in the moving average of request latency.
+_LATENCY_SMOOTHING = 0.2
+# After backing off, hold the operating point for this long so that one burst of
+# throttled requests only causes a single decrease.
+_BACKOFF_HOLD_SECONDS = 10.0
+_SAVE_INTERVAL_SECONDS = 5.0
+
+_THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+class OperatingPoint(BaseModel):
+    """Batch size and concurrency currently used for an embedding model, with the signals that led there."""
+
+    model: str
+    batch_size: int = DEFAULT_BATCH_SIZE
+    concurrency: int = DEFAULT_CONCURRENCY
+    latency_seconds: Optional[float] = None
+    requests: int = 0
+    throttled: int = 0
+    timeouts: int = 0
+    updated_at: Optional[float] = None
+
+
+class _Failure(Enum):
+    THROTTLED = "throttled"
+    TIMEOUT = "timeout"
+    TOO_LARGE = "too_large"
+
+
+def _classify(exc: Exception, batch_size: int) -> Optional[_Failure]:
+    """Works out whether an embedding request failed because of load, rather than because it is invalid."""
+    status_code = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError
+        error_code = response.get("Error", {}).get("Code")
+        if error_code in _THROTTLING_ERROR_CODES:
+            return _Failure.THROTTLED
+        # Bedrock rejects batches with too many texts as invalid input
+        if error_code == "ValidationException" and batch_size > 1:
+            return _Failure.TOO_LARGE
+        status_code = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    elif status_code is None and response is not None:
+        status_code = getattr(response, "status_code", None)
+
+    if status_code in (429, 503):
+        return _Failure.THROTTLED
+    if status_code == 413 and batch_size > 1:
+        return _Failure.TOO_LARGE
+    if isinstance(exc, TimeoutError) or "timeout" in type(exc).__name__.lower():
+        return _Failure.TIMEOUT
+    return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    return float(min(30.0, 0.5 * 2**attempt) * random.uniform(0.5, 1.0))
+
+
+class AdaptiveEmbeddingController:
+    """
+    Tunes the batch size and number of concurrent requests used for one embedding model.
+
+    Follows additive-increase/multiplicative-decrease: after a round of successful requests
+    (one per allowed concurrent request) with latency under EMBEDDING_TARGET_LATENCY_SECONDS,
+    concurrency grows by one, and the batch size grows too while latency is well under target.
+    Throttling halves concurrency, timeouts halve the batch size, and latency over target shrinks
+    the batch size. The concurrency limit applies across all indexing jobs using the model.
+    """
+
+    def __init__(self, point: OperatingPoint, on_change: Callable[[], None]):
+        self._point = point
+        self._on_change = on_change
+        self._condition = threading.Condition()
+        self._in_use = 0
+        self._successes = 0
+        self._hold_until = 0.0
+
+    @property
+    def batch_size(self) -> int:
+        return self._point.batch_size
+
+    @property
+    def concurrency(self) -> int:
+        return self._point.concurrency
+
+    def operating_point(self) -> OperatingPoint:
+        with self._condition:
+            return self._point.model_copy()
+
+    def embed(
+        self, embedding_model: BaseEmbedding, texts: List[str]
+    ) -> List[Embedding]:
+        """Embeds `texts` as a single request, retrying when the provider is overloaded."""
+        attempt = 0
+        while True:
+            with self._slot():
+                start = time.monotonic()
+                try:
+                    embeddings = self._request(embedding_model, texts)
+                except Exception as e:
+                    failure = _classify(e, len(texts))
+                    if failure is None or attempt + 1 >= MAX_ATTEMPTS:
+                        raise
+                    logger.info(
+                        f"Embedding request for {len(texts)} texts failed ({failure.value}): {e}"
+                    )
+                else:
+                    self._record_success(time.monotonic() - start)
+                    return embeddings
+
+            if failure is _Failure.TOO_LARGE:
+                self._record_too_large(len(texts))
+                embeddings = []
+                remaining = texts
+                while remaining:
+                    # always smaller than the request that was rejected
+                    size = min(self.batch_size, len(texts) // 2)
+                    embeddings += self.embed(embedding_model, remaining[:size])
+                    remaining = remaining[size:]
+                return embeddings
+
+            self._record_failure(failure)
+            attempt += 1
+            time.sleep(_backoff_seconds(attempt))
+
+    @staticmethod
+    def _request(embedding_model: BaseEmbedding, texts: List[str]) -> List[Embedding]:
+        if embedding_model.embed_batch_size < len(texts):
+            # let the whole batch go out as one request instead of being split by the model
+            embedding_model = embedding_model.model_copy(
+                update={"embed_batch_size": len(texts)}
+            )
+        return embedding_model.get_text_embedding_batch(texts)
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        with self._condition:
+            while self._in_use >= self._point.concurrency:
+                self._condition.wait()
+            self._in_use += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify_all()
+
+    def _record_success(self, latency: float) -> None:
+        with self._condition:
+            point = self._point
+            point.requests += 1
+            if point.latency_seconds is None:
+                point.latency_seconds = latency
+            else:
+                point.latency_seconds += _LATENCY_SMOOTHING * (
+                    latency - point.latency_seconds
+                )
+            self._successes += 1
+            if (
+                self._successes < point.concurrency
+                or time.monotonic() < self._hold_until
+            ):
+                return
+            self._successes = 0
+
+            target = settings.embedding_target_latency_seconds
+            if point.latency_seconds > target:
+                point.batch_size = max(MIN_BATCH_SIZE, int(point.batch_size * 0.75))
+            else:
+                point.concurrency = min(
+                    settings.embedding_max_concurrency, point.concurrency + 1
+                )
+                if point.latency_seconds < target / 2:
+                    point.batch_size = min(
+                        MAX_BATCH_SIZE, point.batch_size + BATCH_SIZE_STEP
+                    )
+            point.updated_at = time.time()
+            self._condition.notify_all()
+        self._on_change()
+
+    def _record_failure(self, failure: _Failure) -> None:
+        with self._condition:
+            point = self._point
+            if failure is _Failure.THROTTLED:
+                point.throttled += 1
+            else:
+                point.timeouts += 1
+            self._successes = 0
+            if time.monotonic() < self._hold_until:
+                return
+            self._hold_until = time.monotonic() + _BACKOFF_HOLD_SECONDS
+            if failure is _Failure.THROTTLED:
+                point.concurrency = max(1, point.concurrency // 2)
+            else:
+                point.batch_size = max(MIN_BATCH_SIZE, point.batch_size // 2)
+            point.updated_at = time.time()
+            logger.info(
+                f"Backing off embedding requests for {point.model} after {failure.value}:"
+                + f" batch size {point.batch_size}, concurrency {point.concurrency}"
+            )
+        self._on_change()
+
+    def _record_too_large(self, batch_size: int) -> None:
+        with self._condition:
+            point = self._point
+            point.batch_size = max(
+                MIN_BATCH_SIZE, min(point.batch_size, batch_size // 2)
+            )
+            point.updated_at = time.time()
+        self._on_change()
+
+
+class _ControllerRegistry:
+    """Controllers for every embedding model, with their operating points persisted to a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._controllers: dict[str, AdaptiveEmbeddingController] = {}
+        self._last_saved = 0.0
+        self._points: dict[str, OperatingPoint] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    raw_points: dict[str, Any] = json.load(f)
+                self._points = {
+                    model: OperatingPoint.model_validate(point)
+                    for model, point in raw_points.items()
+                }
+            except Exception:
+                logger.exception(
+                    "Failed to load embedding operating points from %s", path
+                )
+
+    def controller(self, model: str) -> AdaptiveEmbeddingController:
+        with self._lock:
+            controller = self._controllers.get(model)
+            if controller is None:
+                point = self._points.get(model) or OperatingPoint(model=model)
+                point.concurrency = min(
+                    point.concurrency, settings.embedding_max_concurrency
+                )
+                controller = AdaptiveEmbeddingController(point, self._changed)
+                self._controllers[model] = controller
+            return controller
+
+    def operating_points(self) -> List[OperatingPoint]:
+        with self._lock:
+            points = dict(self._points)
+            controllers = list(self._controllers.items())
+        for model, controller in controllers:
+            points[model] = controller.operating_point()
+        return sorted(points.values(), key=lambda point: point.model)
+
+    def save(self, force: bool = False) -> None:
+        with self._lock:
+            if (
+                not force
+                and time.monotonic() - self._last_saved < _SAVE_INTERVAL_SECONDS
+            ):
+                return
+            self._last_saved = time.monotonic()
+        points = self.operating_points()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({point.model: point.model_dump() for point in points}, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            logger.exception(
+                "Failed to save embedding operating points to %s", self.path
+            )
+
+    def _changed(self) -> None:
+        self.save()
+
+
+_registries: dict[str, _ControllerRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def _registry() -> _ControllerRegistry:
+    path = os.path.join(settings.rag_databases_dir, "embedding_operating_points.json")
+    with _registries_lock:
+        registry = _registries.get(path)
+        if registry is None:
+            registry = _ControllerRegistry(path)
+            _registries[path] = registry
+        return registry
+
+
+def get_controller(embedding_model: BaseEmbedding) -> AdaptiveEmbeddingController:
+    return _registry().controller(model_key(embedding_model))
+
+
+def operating_points() -> List[OperatingPoint]:
+    """The operating points learned so far, for every embedding model."""
+    return _registry().operating_points()
+
+
+def save_operating_points() -> None:
+    _registry().save(force=True)
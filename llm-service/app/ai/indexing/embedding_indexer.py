@@ -36,27 +36,47 @@
 #  DATA.
 #
 
+import hashlib
+import itertools
+import json
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Generator, List
+from typing import Iterable, Iterator, List, Set
 
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.llms import LLM
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.schema import BaseNode, TextNode
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
 from typing_extensions import Optional
 
 from .base import BaseTextIndexer
-from .readers.base_reader import ReaderConfig, ChunksResult
+from .embedding_cache import embed_with_cache, model_key
+from .embedding_controller import (
+    AdaptiveEmbeddingController,
+    get_controller,
+    save_operating_points,
+)
+from .readers.base_reader import (
+    BaseReader,
+    ChunksResult,
+    ParsedDocument,
+    ReaderConfig,
+)
 from .readers.excel import ExcelReader
 from .readers.csv import CSVReader
 from ...ai.vector_stores.qdrant import QdrantVectorStore
 from ...ai.vector_stores.vector_store import VectorStore
-from ...services.utils import batch_sequence, flatten_sequence
+from ...config import settings
 
 logger = logging.getLogger(__name__)
 
+# Embedding batches that may be read ahead, per embedding request allowed in flight.
+# Bounding this is what keeps memory flat regardless of the size of the file being indexed.
+READ_AHEAD_FACTOR = 2
+
 
 class EmbeddingIndexer(BaseTextIndexer):
     def __init__(
@@ -79,88 +99,228 @@ class EmbeddingIndexer(BaseTextIndexer):
             f"Indexing file: {file_path} with embedding model: {self.embedding_model.model_name}"
         )
 
-        reader_cls = self._get_reader_class(file_path)
-
-        is_tabular_document = reader_cls in (ExcelReader, CSVReader)
-
-        reader = reader_cls(
-            splitter=self.splitter,
-            document_id=document_id,
-            data_source_id=self.data_source_id,
-            config=self.reader_config,
-        )
+        reader = self._get_reader(file_path, document_id)
 
         logger.debug(f"Parsing file: {file_path}")
 
-        chunks: ChunksResult = reader.load_chunks(file_path)
+        result = ChunksResult()
+        self._index_chunks(
+            reader,
+            file_path.name,
+            document_id,
+            reader.iter_chunks(file_path, result),
+            result,
+        )
 
-        nodes: list[TextNode] = chunks.chunks
-        if not nodes:
-            logger.warning(f"No chunks found in file: {file_path}")
-            return
+    def index_parsed_document(self, parsed: ParsedDocument, document_id: str) -> None:
+        logger.debug(
+            f"Indexing parsed file: {parsed.file_name} with embedding model: {self.embedding_model.model_name}"
+        )
 
-        logger.debug(f"Embedding {len(nodes)} chunks")
+        reader = self._get_reader(Path(parsed.file_name), document_id)
+        result = ChunksResult(
+            secret_types=parsed.secret_types, pii_found=parsed.pii_found
+        )
+        self._index_chunks(
+            reader,
+            parsed.file_name,
+            document_id,
+            reader.iter_parsed_chunks(parsed),
+            result,
+        )
 
-        chunks_with_embeddings = flatten_sequence(self._compute_embeddings(nodes))
+    def _index_chunks(
+        self,
+        reader: BaseReader,
+        file_name: str,
+        document_id: str,
+        chunks: Iterator[TextNode],
+        result: ChunksResult,
+    ) -> None:
+        is_tabular_document = isinstance(reader, (ExcelReader, CSVReader))
 
-        acc = 0
         use_qdrant_safe_batches = isinstance(
             self.chunks_vector_store, QdrantVectorStore
         )
         if use_qdrant_safe_batches and is_tabular_document:
-            batch_size = 256
+            upsert_batch_size = 256
         else:
-            batch_size = 1000
-        for chunk_batch in batch_sequence(chunks_with_embeddings, batch_size):
-            acc += len(chunk_batch)
-            logger.debug(f"Adding {acc}/{len(nodes)} chunks to vector store")
-
-            # We have to explicitly convert here even though the types are compatible (TextNode inherits from BaseNode)
-            # because the "add" annotation uses List instead of Sequence. We need to use TextNode explicitly because
-            # we're capturing "text".
-            converted_chunks: List[BaseNode] = [chunk for chunk in chunk_batch]
-
-            # flatten metadata if vector store has self.flat_metadata
-            if self.chunks_vector_store.flat_metadata:
-                converted_chunks = [
-                    self._flatten_metadata(chunk) for chunk in converted_chunks
-                ]
-
-            chunks_vector_store = self.chunks_vector_store.llama_vector_store()
-            chunks_vector_store.add(converted_chunks)
-
-        logger.debug(f"Indexing file: {file_path} completed")
-
-    def _compute_embeddings(
-        self, chunks: List[TextNode]
-    ) -> Generator[List[TextNode], None, None]:
-        batched_chunks = list(batch_sequence(chunks, 100))
-        batched_texts = [[chunk.text for chunk in batch] for batch in batched_chunks]
-
-        max_workers = 15
-        logger.debug("Using %s workers for embedding generation", max_workers)
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [
-                executor.submit(
-                    lambda batch_text, batch_index: (
-                        batch_index,
-                        self.embedding_model.get_text_embedding_batch(batch_text),
-                    ),
-                    b,
-                    i,
+            upsert_batch_size = 1000
+
+        existing_node_ids = self.chunks_vector_store.document_node_ids(document_id)
+        current_node_ids: Set[str] = set()
+
+        def new_or_changed(chunks: Iterable[TextNode]) -> Iterator[TextNode]:
+            for chunk_number, chunk in enumerate(chunks):
+                chunk.id_ = self._chunk_node_id(document_id, chunk_number, chunk)
+                current_node_ids.add(chunk.id_)
+                if chunk.id_ not in existing_node_ids:
+                    yield chunk
+
+        try:
+            indexed = self._embed_and_upsert(new_or_changed(chunks), upsert_batch_size)
+        except Exception:
+            # Don't leave the chunks indexed so far next to the previous version's
+            logger.warning(
+                f"Indexing file: {file_name} failed, removing the chunks indexed so far"
+            )
+            self.chunks_vector_store.delete_nodes(current_node_ids - existing_node_ids)
+            raise
+
+        if result.secret_types is not None:
+            # Chunks may have been upserted before the reader found the secret.
+            logger.warning(
+                f"Secrets of types {result.secret_types} found in file: {file_name}, removing it from the index"
+            )
+            self.chunks_vector_store.delete_document(document_id)
+            return
+
+        orphaned_node_ids = existing_node_ids - current_node_ids
+        self.chunks_vector_store.delete_nodes(orphaned_node_ids)
+        if indexed or orphaned_node_ids:
+            self.chunks_vector_store.refresh_stats()
+
+        if not current_node_ids:
+            logger.warning(f"No chunks found in file: {file_name}")
+            return
+
+        logger.debug(
+            f"Indexing file: {file_name} completed ({len(current_node_ids)} chunks,"
+            + f" {indexed} new or changed, {len(orphaned_node_ids)} removed)"
+        )
+
+    def _chunk_node_id(
+        self, document_id: str, chunk_number: int, chunk: TextNode
+    ) -> str:
+        """
+        Deterministic node ID for a chunk, so re-indexing a document only touches chunks that changed.
+
+        The content hash covers everything that ends up in the vector store for the chunk, including
+        which embedding model produced its vector.
+        """
+        content = json.dumps(
+            {
+                "text": chunk.text,
+                "metadata": chunk.metadata,
+                "embedding_model": model_key(self.embedding_model),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return str(
+            uuid.uuid5(
+                uuid.NAMESPACE_OID, f"{document_id}:{chunk_number}:{content_hash}"
+            )
+        )
+
+    def _embed_and_upsert(
+        self, chunks: Iterable[TextNode], upsert_batch_size: int
+    ) -> int:
+        """
+        Embed and upsert chunks while they are still being read.
+
+        Reading, embedding and upserting overlap: embedding batches are submitted as soon as they are read,
+        and upserts start as soon as enough embedded chunks are available. Batch size and the number of
+        concurrent embedding requests come from the model's AdaptiveEmbeddingController. Reading blocks once
+        READ_AHEAD_FACTOR batches per allowed request are waiting on embeddings, and at most one upsert is
+        in flight at a time.
+
+        Returns the number of chunks indexed.
+        """
+        vector_store: Optional[BasePydanticVectorStore] = None
+        total = 0
+        to_upsert: List[TextNode] = []
+        pending_upsert: Optional[Future[None]] = None
+
+        controller = get_controller(self.embedding_model)
+
+        with ThreadPoolExecutor(
+            max_workers=settings.embedding_max_concurrency
+        ) as embedding_executor, ThreadPoolExecutor(max_workers=1) as upsert_executor:
+
+            def collect(done: Set[Future[List[TextNode]]], flush: bool = False) -> None:
+                nonlocal to_upsert, pending_upsert, vector_store
+                for future in done:
+                    to_upsert.extend(future.result())
+                while len(to_upsert) >= upsert_batch_size or (flush and to_upsert):
+                    batch = to_upsert[:upsert_batch_size]
+                    to_upsert = to_upsert[upsert_batch_size:]
+                    if vector_store is None:
+                        # The collection can only be created once the dimension is known
+                        self.chunks_vector_store.prepare_for_write(
+                            len(batch[0].get_embedding())
+                        )
+                        vector_store = self.chunks_vector_store.llama_vector_store()
+                    if pending_upsert is not None:
+                        pending_upsert.result()
+                    pending_upsert = upsert_executor.submit(
+                        self._upsert, vector_store, batch
+                    )
+
+            in_flight: Set[Future[List[TextNode]]] = set()
+            for batch in self._read_batches(chunks, controller):
+                # hand finished embeddings to the upserter without waiting for the rest
+                finished = {future for future in in_flight if future.done()}
+                if finished:
+                    in_flight -= finished
+                    collect(finished)
+                while len(in_flight) >= READ_AHEAD_FACTOR * controller.concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(
+                    embedding_executor.submit(self._embed_batch, batch, controller)
                 )
-                for i, b in enumerate(batched_texts)
+                total += len(batch)
+                logger.debug(f"Read {total} chunks")
+
+            done, _ = wait(in_flight)
+            collect(done, flush=True)
+            if pending_upsert is not None:
+                pending_upsert.result()
+
+        save_operating_points()
+        return total
+
+    @staticmethod
+    def _read_batches(
+        chunks: Iterable[TextNode], controller: AdaptiveEmbeddingController
+    ) -> Iterator[List[TextNode]]:
+        iterator = iter(chunks)
+        while batch := list(itertools.islice(iterator, controller.batch_size)):
+            yield batch
+
+    def _embed_batch(
+        self, batch_chunks: List[TextNode], controller: AdaptiveEmbeddingController
+    ) -> List[TextNode]:
+        batch_embeddings = embed_with_cache(
+            self.embedding_model,
+            [chunk.text for chunk in batch_chunks],
+            compute=lambda texts: controller.embed(self.embedding_model, texts),
+        )
+        if len(batch_chunks) != len(batch_embeddings):
+            raise ValueError(
+                f"Expected {len(batch_chunks)} embedding vectors for this batch of chunks,"
+                + f" but got {len(batch_embeddings)} from {self.embedding_model.model_name}"
+            )
+        for chunk, embedding in zip(batch_chunks, batch_embeddings):
+            chunk.embedding = embedding
+        return batch_chunks
+
+    def _upsert(
+        self, vector_store: BasePydanticVectorStore, chunk_batch: List[TextNode]
+    ) -> None:
+        logger.debug(f"Adding {len(chunk_batch)} chunks to vector store")
+
+        # We have to explicitly convert here even though the types are compatible (TextNode inherits from BaseNode)
+        # because the "add" annotation uses List instead of Sequence. We need to use TextNode explicitly because
+        # we're capturing "text".
+        converted_chunks: List[BaseNode] = [chunk for chunk in chunk_batch]
+
+        # flatten metadata if vector store has self.flat_metadata
+        if self.chunks_vector_store.flat_metadata:
+            converted_chunks = [
+                self._flatten_metadata(chunk) for chunk in converted_chunks
             ]
-            logger.debug(f"Waiting for {len(futures)} futures")
-            for future in as_completed(futures):
-                i, batch_embeddings = future.result()
-                batch_chunks = batched_chunks[i]
-                if len(batch_chunks) != len(batch_embeddings):
-                    raise ValueError(
-                        f"Expected {len(batch_chunks)} embedding vectors for this batch of chunks,"
-                        + f" but got {len(batch_embeddings)} from {self.embedding_model.model_name}"
-                    )
-                for chunk, embedding in zip(batch_chunks, batch_embeddings):
-                    chunk.embedding = embedding
-                yield batch_chunks
+
+        vector_store.add(converted_chunks)
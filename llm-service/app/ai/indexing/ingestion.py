@@ -0,0 +1,198 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+Parsing a document once for both of the indexes it goes into.
+
+The backend asks for a document's embeddings and for its summary in two separate
+requests, in either order. Whichever arrives first downloads and parses the file and
+leaves the parse here, for the other one to chunk with its own splitter. Parses are only
+kept in memory, for `PARSED_DOCUMENT_HANDOFF_SECONDS`; a document is parsed again if the
+second request goes to another worker process, or comes later than that.
+
+Only files of up to `PARSED_DOCUMENT_HANDOFF_MAX_BYTES` are handed off: larger ones are
+streamed into the embedding index without holding their parse, and parsed again for the
+summary, from the parsed document cache if there is one.
+"""
+
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+from .base import BaseTextIndexer
+from .readers.base_reader import ParsedDocument
+from ...config import settings
+from ...services import document_storage
+from ...services.caching import TtlCache
+
+logger = logging.getLogger(__name__)
+
+# Parsed documents are only useful until the other request for the same document comes
+# in, so a few of them are enough.
+MAX_PARSED_FILES = 16
+
+
+@dataclass
+class ParsedFile:
+    document: ParsedDocument
+    size_bytes: int
+
+
+parsed_file_cache: TtlCache[tuple[Any, ...], ParsedFile] = TtlCache(
+    lambda: settings.parsed_document_handoff_seconds, maxsize=MAX_PARSED_FILES
+)
+
+_parsing_lock = threading.Lock()
+# Lock per file being parsed, and how many threads hold or wait for it
+_parsing: dict[tuple[Any, ...], tuple[threading.Lock, int]] = {}
+
+
+@contextmanager
+def _parsing_file(key: tuple[Any, ...]) -> Iterator[None]:
+    """Makes concurrent requests for the same file wait for one parse instead of each doing their own."""
+    with _parsing_lock:
+        lock, waiting = _parsing.get(key, (threading.Lock(), 0))
+        _parsing[key] = (lock, waiting + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _parsing_lock:
+            lock, waiting = _parsing[key]
+            if waiting == 1:
+                del _parsing[key]
+            else:
+                _parsing[key] = (lock, waiting - 1)
+
+
+def parse_stored_file(
+    indexer: BaseTextIndexer,
+    document_id: str,
+    bucket_name: str,
+    document_key: str,
+    original_filename: str,
+) -> ParsedFile:
+    """
+    Returns the document stored at `bucket_name`/`document_key`, parsed the way `indexer` would.
+
+    Raises NotSupportedFileExtensionError before downloading anything if there is no reader
+    for the file.
+    """
+    key = _parse_key(indexer, document_id, bucket_name, document_key, original_filename)
+    with _parsing_file(key):
+        parsed_file = parsed_file_cache.get(key)
+        if parsed_file is not None:
+            logger.debug("Reusing parsed document %s", document_id)
+            return parsed_file
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            logger.debug("created temporary directory %s", tmpdirname)
+            file_path = document_storage.from_environment().download(
+                tmpdirname, bucket_name, document_key, original_filename
+            )
+            parsed_file = ParsedFile(
+                document=indexer.parse_file(file_path, document_id),
+                size_bytes=file_path.stat().st_size,
+            )
+        if _can_hand_off(parsed_file.size_bytes):
+            parsed_file_cache.set(key, parsed_file)
+        return parsed_file
+
+
+def index_stored_file(
+    indexer: BaseTextIndexer,
+    document_id: str,
+    bucket_name: str,
+    document_key: str,
+    original_filename: str,
+) -> int:
+    """
+    Indexes the document stored at `bucket_name`/`document_key` with `indexer`, leaving its
+    parse for the other index if the file is small enough. Returns the size of the file.
+
+    Raises NotSupportedFileExtensionError before downloading anything if there is no reader
+    for the file.
+    """
+    key = _parse_key(indexer, document_id, bucket_name, document_key, original_filename)
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        with _parsing_file(key):
+            parsed_file = parsed_file_cache.get(key)
+            if parsed_file is None:
+                logger.debug("created temporary directory %s", tmpdirname)
+                file_path = document_storage.from_environment().download(
+                    tmpdirname, bucket_name, document_key, original_filename
+                )
+                size_bytes = file_path.stat().st_size
+                if _can_hand_off(size_bytes):
+                    parsed_file = ParsedFile(
+                        document=indexer.parse_file(file_path, document_id),
+                        size_bytes=size_bytes,
+                    )
+                    parsed_file_cache.set(key, parsed_file)
+            else:
+                logger.debug("Reusing parsed document %s", document_id)
+
+        if parsed_file is None:
+            # Streamed outside the lock, so a summary request for it parses it meanwhile
+            # instead of waiting for all of its embeddings
+            indexer.index_file(file_path, document_id)
+            return size_bytes
+    indexer.index_parsed_document(parsed_file.document, document_id)
+    return parsed_file.size_bytes
+
+
+def _parse_key(
+    indexer: BaseTextIndexer,
+    document_id: str,
+    bucket_name: str,
+    document_key: str,
+    original_filename: str,
+) -> tuple[Any, ...]:
+    return (
+        document_id,
+        bucket_name,
+        document_key,
+        *indexer.parser_key(Path(original_filename)),
+    )
+
+
+def _can_hand_off(size_bytes: int) -> bool:
+    return size_bytes <= settings.parsed_document_handoff_max_bytes
@@ -0,0 +1,97 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""Picks the contiguous blocks of a long document's nodes that get summarized."""
+
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+# Blocks closer than this (in cosine distance) to an already picked block add nothing new.
+MIN_BLOCK_DISTANCE = 0.02
+
+Sample = Callable[[Sequence[int], int], list[int]]
+
+
+def random_block_starts(
+    node_count: int, block_size: int, block_count: int, sample: Sample
+) -> list[int]:
+    """
+    Start indices of `block_count` non-overlapping blocks, uniformly at random.
+
+    Picking `block_count` sorted offsets among the `slack + block_count` positions left
+    once the blocks themselves are laid out gives every placement the same chance,
+    without ever materializing the candidate positions.
+    """
+    block_count = min(block_count, node_count // block_size)
+    slack = node_count - block_count * block_size
+    offsets = sorted(sample(range(slack + block_count), block_count))
+    return [offset + i * (block_size - 1) for i, offset in enumerate(offsets)]
+
+
+def candidate_block_starts(node_count: int, block_size: int) -> list[int]:
+    return list(range(0, node_count - block_size + 1, block_size))
+
+
+def representative_blocks(
+    block_embeddings: npt.NDArray[np.floating[Any]],
+    block_count: int,
+    min_distance: float = MIN_BLOCK_DISTANCE,
+) -> list[int]:
+    """
+    Indices of up to `block_count` mutually distant blocks, by farthest-point selection.
+
+    Starts from the block closest to the centroid, then repeatedly adds the block farthest
+    from everything picked so far. Stops early once the remaining blocks are all
+    near-duplicates of picked ones, so repetitive documents use fewer blocks.
+    """
+    if len(block_embeddings) == 0 or block_count <= 0:
+        return []
+    norms = np.linalg.norm(block_embeddings, axis=1, keepdims=True)
+    vectors = block_embeddings / np.where(norms == 0, 1, norms)
+
+    first = int(np.argmax(vectors @ vectors.mean(axis=0)))
+    picked = [first]
+    distances = 1 - vectors @ vectors[first]
+    while len(picked) < min(block_count, len(vectors)):
+        candidate = int(np.argmax(distances))
+        if distances[candidate] < min_distance:
+            break
+        picked.append(candidate)
+        distances = np.minimum(distances, 1 - vectors @ vectors[candidate])
+    return sorted(picked)
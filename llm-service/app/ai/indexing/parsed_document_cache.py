@@ -0,0 +1,488 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+Cache of what readers parse out of files, so re-chunking a document doesn't parse it again.
+
+Entries are keyed by the file's content hash, the reader and its `parser_version`, and the
+reader config. Each holds the parsed segments as gzipped JSON lines, followed by the PII
+findings; parses that turn out to contain secrets aren't stored. They are kept in a local
+directory, or under the document bucket when `PARSED_DOCUMENT_CACHE_PROVIDER` is S3, and the
+least recently used ones are evicted once the cache grows past
+`PARSED_DOCUMENT_CACHE_MAX_BYTES`.
+
+Each entry is also recorded under the data source and document it was parsed for, so that
+deleting either purges the parsed text along with it.
+"""
+
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import IO, Any, Generator, Iterator, List, Optional, Protocol, cast
+
+import boto3
+from botocore.exceptions import ClientError
+
+from .readers.base_reader import BaseReader, ParsedDocument, ParsedSegment
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the format of the entries changes
+FORMAT_VERSION = 1
+# Evicting lists every entry, so it is done at most this often per process
+EVICTION_INTERVAL_SECONDS = 60
+# S3 objects can't be touched, so a hit copies the object onto itself to record that it was
+# used; this only happens once the last use is older than this
+S3_TOUCH_INTERVAL = timedelta(days=1)
+ENTRY_SUFFIX = ".jsonl.gz"
+# Where entries are recorded under the documents they were parsed for
+OWNERS_DIR = "owners"
+# Temporary files older than this were left by a process that died while writing them
+STALE_TEMPORARY_FILE_SECONDS = 24 * 60 * 60
+
+
+def file_hash(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(functools.partial(f.read, 1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    name: str
+    size: int
+    last_used: float
+
+
+class CacheEntries(Protocol):
+    def temporary_dir(self) -> Optional[str]: ...
+
+    def open(self, name: str) -> Optional[IO[bytes]]: ...
+
+    def put(self, name: str, file_path: str) -> None: ...
+
+    def delete(self, name: str) -> None: ...
+
+    def list(self) -> List[CacheEntry]: ...
+
+    def add_owner(self, owner: str, name: str) -> None: ...
+
+    def owned(self, owner: str) -> List[str]: ...
+
+    def remove_owner(self, owner: str) -> None: ...
+
+    def delete_stale_temporary_files(self) -> None: ...
+
+
+class LocalCacheEntries:
+    """Entries in a local directory; opening one updates its mtime, which is its last use."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def temporary_dir(self) -> Optional[str]:
+        # Written next to the entries, so that putting them is a rename
+        os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def open(self, name: str) -> Optional[IO[bytes]]:
+        path = os.path.join(self.directory, name)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return f
+
+    def put(self, name: str, file_path: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        shutil.move(file_path, os.path.join(self.directory, name))
+
+    def delete(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def list(self) -> List[CacheEntry]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append(CacheEntry(name, stat.st_size, stat.st_mtime))
+        return entries
+
+    def add_owner(self, owner: str, name: str) -> None:
+        owner_dir = os.path.join(self.directory, OWNERS_DIR, owner)
+        os.makedirs(owner_dir, exist_ok=True)
+        Path(owner_dir, name).touch()
+
+    def owned(self, owner: str) -> List[str]:
+        return [
+            name
+            for _, _, names in os.walk(os.path.join(self.directory, OWNERS_DIR, owner))
+            for name in names
+        ]
+
+    def remove_owner(self, owner: str) -> None:
+        shutil.rmtree(
+            os.path.join(self.directory, OWNERS_DIR, owner), ignore_errors=True
+        )
+
+    def delete_stale_temporary_files(self) -> None:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        stale_before = time.time() - STALE_TEMPORARY_FILE_SECONDS
+        for name in names:
+            if not name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < stale_before:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class S3CacheEntries:
+    """Objects under a prefix of the document bucket; their LastModified is their last use."""
+
+    def __init__(self, bucket: str, prefix: str, s3_client: Any = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._s3 = s3_client or boto3.session.Session().client("s3")
+
+    def temporary_dir(self) -> Optional[str]:
+        return None
+
+    def open(self, name: str) -> Optional[IO[bytes]]:
+        key = self.prefix + name
+        try:
+            response = self._s3.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        if response["LastModified"] < datetime.now(timezone.utc) - S3_TOUCH_INTERVAL:
+            self._s3.copy_object(
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE",
+            )
+        return cast(IO[bytes], response["Body"])
+
+    def put(self, name: str, file_path: str) -> None:
+        try:
+            self._s3.upload_file(file_path, self.bucket, self.prefix + name)
+        finally:
+            os.remove(file_path)
+
+    def delete(self, name: str) -> None:
+        self._s3.delete_object(Bucket=self.bucket, Key=self.prefix + name)
+
+    def list(self) -> List[CacheEntry]:
+        return [
+            CacheEntry(
+                obj["Key"][len(self.prefix) :],
+                obj["Size"],
+                obj["LastModified"].timestamp(),
+            )
+            for obj in self._objects(self.prefix)
+            if "/" not in obj["Key"][len(self.prefix) :]
+        ]
+
+    def add_owner(self, owner: str, name: str) -> None:
+        self._s3.put_object(
+            Bucket=self.bucket, Key=f"{self._owner_prefix(owner)}{name}", Body=b""
+        )
+
+    def owned(self, owner: str) -> List[str]:
+        return [
+            obj["Key"].rsplit("/", 1)[-1]
+            for obj in self._objects(self._owner_prefix(owner))
+        ]
+
+    def remove_owner(self, owner: str) -> None:
+        for obj in self._objects(self._owner_prefix(owner)):
+            self._s3.delete_object(Bucket=self.bucket, Key=obj["Key"])
+
+    def delete_stale_temporary_files(self) -> None:
+        # Entries are written to a local temporary file, which is removed once uploaded
+        pass
+
+    def _owner_prefix(self, owner: str) -> str:
+        return f"{self.prefix}{OWNERS_DIR}/{owner}/"
+
+    def _objects(self, prefix: str) -> Iterator[Any]:
+        paginator = self._s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+
+class ParsedDocumentCache:
+    def __init__(self, entries: CacheEntries, max_bytes: int):
+        self.entries = entries
+        self.max_bytes = max_bytes
+        self._eviction_lock = threading.Lock()
+        self._last_eviction = 0.0
+
+    @staticmethod
+    def entry_name(reader: BaseReader, file_path: Path) -> str:
+        key = json.dumps(
+            [
+                FORMAT_VERSION,
+                file_hash(file_path),
+                type(reader).__qualname__,
+                reader.parser_version,
+                reader.config_key(reader.config),
+            ]
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ENTRY_SUFFIX
+
+    def segments(
+        self, reader: BaseReader, file_path: Path, parsed: ParsedDocument
+    ) -> Generator[ParsedSegment, None, None]:
+        """
+        `reader.read_segments`, read from the cache if the file was parsed before.
+
+        Otherwise the segments are written to the cache as the reader yields them, and the
+        entry is stored once they have all been read.
+        """
+        name = self.entry_name(reader, file_path)
+        f = self._open(name)
+        if f is not None:
+            logger.debug("Using cached parse of %s", file_path)
+            with f:
+                yield from self._read(name, f, parsed)
+            self._add_owner(reader, name)
+            return
+        stored = yield from self._write_through(
+            name, reader.read_segments(file_path, parsed), parsed
+        )
+        if stored:
+            self._add_owner(reader, name)
+
+    def purge(self, data_source_id: int, document_id: Optional[str] = None) -> None:
+        """Deletes the entries parsed for a document, or for every document of a data source."""
+        owner = _owner(data_source_id, document_id)
+        for name in set(self.entries.owned(owner)):
+            self.entries.delete(name)
+        self.entries.remove_owner(owner)
+
+    def _add_owner(self, reader: BaseReader, name: str) -> None:
+        try:
+            self.entries.add_owner(
+                _owner(reader.data_source_id, reader.document_id), name
+            )
+        except Exception as e:
+            logger.warning(
+                "Failed to record the document of parsed document cache entry %s: %s",
+                name,
+                e,
+            )
+
+    def _open(self, name: str) -> Optional[IO[bytes]]:
+        try:
+            return self.entries.open(name)
+        except Exception as e:
+            logger.warning("Failed to read parsed document cache entry %s: %s", name, e)
+            return None
+
+    def _read(
+        self, name: str, f: IO[bytes], parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        try:
+            with gzip.open(f, "rt", encoding="utf-8") as lines:
+                for line in lines:
+                    record = json.loads(line)
+                    if "segment" in record:
+                        segment = record["segment"]
+                        if segment["page_starts"] is not None:
+                            segment["page_starts"] = [
+                                (offset, label)
+                                for offset, label in segment["page_starts"]
+                            ]
+                        yield ParsedSegment(**segment)
+                    else:
+                        secret_types = record["secret_types"]
+                        parsed.secret_types = (
+                            set(secret_types) if secret_types is not None else None
+                        )
+                        parsed.pii_found = record["pii_found"]
+                        return
+            raise EOFError("Missing findings")
+        except Exception:
+            # Segments may have been yielded already, so there is no falling back to the
+            # reader; drop the entry so that the next attempt parses the file.
+            logger.exception("Corrupt parsed document cache entry %s", name)
+            self.entries.delete(name)
+            raise
+
+    def _write_through(
+        self, name: str, segments: Iterator[ParsedSegment], parsed: ParsedDocument
+    ) -> Generator[ParsedSegment, None, bool]:
+        """Yields `segments` while writing them to the entry `name`; returns whether it was stored."""
+        fd, temporary_path = tempfile.mkstemp(
+            suffix=".tmp", dir=self.entries.temporary_dir()
+        )
+        complete = False
+        try:
+            with gzip.open(os.fdopen(fd, "wb"), "wt", encoding="utf-8") as lines:
+                for segment in segments:
+                    lines.write(
+                        json.dumps({"segment": asdict(segment)}, default=str) + "\n"
+                    )
+                    yield segment
+                lines.write(
+                    json.dumps({"secret_types": None, "pii_found": parsed.pii_found})
+                    + "\n"
+                )
+            # The segments read before the reader found a secret must not be kept
+            complete = parsed.secret_types is None
+        finally:
+            if not complete:
+                os.remove(temporary_path)
+        if not complete:
+            return False
+        try:
+            self.entries.put(name, temporary_path)
+        except Exception as e:
+            logger.warning(
+                "Failed to store parsed document cache entry %s: %s", name, e
+            )
+            return False
+        self._evict_if_due()
+        return True
+
+    def _evict_if_due(self) -> None:
+        with self._eviction_lock:
+            if time.monotonic() - self._last_eviction < EVICTION_INTERVAL_SECONDS:
+                return
+            self._last_eviction = time.monotonic()
+        try:
+            self.evict()
+        except Exception as e:
+            logger.warning("Failed to evict parsed document cache entries: %s", e)
+
+    def evict(self) -> None:
+        """
+        Deletes the least recently used entries until the cache fits in `max_bytes`, and the
+        temporary files of writes that never finished.
+        """
+        self.entries.delete_stale_temporary_files()
+        entries = sorted(self.entries.list(), key=lambda entry: entry.last_used)
+        total = sum(entry.size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            logger.debug("Evicting parsed document cache entry %s", entry.name)
+            self.entries.delete(entry.name)
+            total -= entry.size
+
+
+@functools.cache
+def _parsed_document_cache(
+    s3: bool, bucket: str, prefix: str, local_dir: str, max_bytes: int
+) -> ParsedDocumentCache:
+    entries: CacheEntries
+    if s3:
+        entries = S3CacheEntries(bucket, f"{prefix}/parsed_documents/")
+    else:
+        entries = LocalCacheEntries(local_dir)
+    return ParsedDocumentCache(entries, max_bytes)
+
+
+def _owner(data_source_id: int, document_id: Optional[str]) -> str:
+    if document_id is None:
+        return str(data_source_id)
+    return f"{data_source_id}/{document_id}"
+
+
+def parsed_document_cache() -> Optional[ParsedDocumentCache]:
+    """The configured cache, or None if `PARSED_DOCUMENT_CACHE_MAX_BYTES` is 0."""
+    max_bytes = settings.parsed_document_cache_max_bytes
+    if max_bytes <= 0:
+        return None
+    return _parsed_document_cache(
+        settings.is_s3_parsed_document_cache_configured(),
+        settings.document_bucket,
+        settings.document_bucket_prefix,
+        os.path.join(settings.rag_databases_dir, "parsed_documents"),
+        max_bytes,
+    )
+
+
+def purge_parsed_documents(
+    data_source_id: int, document_id: Optional[str] = None
+) -> None:
+    """Deletes the cached parses of a document, or of every document of a data source."""
+    cache = parsed_document_cache()
+    if cache is None:
+        return
+    try:
+        cache.purge(data_source_id, document_id)
+    except Exception as e:
+        logger.warning(
+            "Failed to purge the parsed documents of data source %s, document %s: %s",
+            data_source_id,
+            document_id,
+            e,
+        )
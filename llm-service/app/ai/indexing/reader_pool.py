@@ -0,0 +1,255 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+Worker processes that run readers, so parsing doesn't hold the GIL of the processes serving chat.
+
+Workers are spawned rather than forked, run at a lower priority than the server, and are
+replaced after `READER_PROCESS_MAX_DOCUMENTS` documents, to contain memory that readers leak.
+Readers that load models, like Docling's, run in a pool of their own instead, of
+`DOCLING_PROCESSES` workers that are never replaced, so that the models are only loaded once.
+`READER_PROCESS_MAX_MEMORY_MB` limits the data segment of each worker, so that a runaway
+parse fails with a MemoryError instead of taking the server down with it. Workers only send
+back the parsed text and its metadata; chunking happens in the server process, since it
+depends on the indexer's splitter. Readers that can split a file into shards, like PDFs into
+ranges of pages, have them parsed by several workers at once.
+"""
+
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from llama_index.core.node_parser import SentenceSplitter
+
+from .readers.base_reader import (
+    BaseReader,
+    ParsedDocument,
+    ParsedSegment,
+    ReaderConfig,
+    stitch_shards,
+)
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+# Added to the niceness of the workers, so that the server's threads get the CPU first
+WORKER_NICENESS = 10
+
+
+def _initialize_worker(max_memory_mb: int) -> None:
+    os.nice(WORKER_NICENESS)
+    if max_memory_mb > 0:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def _parse(
+    reader_cls: Type[BaseReader],
+    document_id: str,
+    data_source_id: int,
+    config: ReaderConfig,
+    file_path: str,
+    shard: Any,
+) -> ParsedDocument:
+    reader = reader_cls(
+        splitter=SentenceSplitter(),
+        document_id=document_id,
+        data_source_id=data_source_id,
+        config=config,
+    )
+    if shard is None:
+        return reader.parse(Path(file_path))
+    return reader.parse_shard(Path(file_path), shard)
+
+
+class ReaderPool:
+    """Workers that run readers; each is replaced after `max_documents`, unless that is 0."""
+
+    def __init__(self, processes: int, max_documents: int, max_memory_mb: int):
+        self.processes = processes
+        self.max_documents = max_documents
+        self.max_memory_mb = max_memory_mb
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Tasks submitted to `_executor`
+        self._submitted = 0
+
+    def _submit(
+        self, *args: Any
+    ) -> Tuple[ProcessPoolExecutor, "Future[ParsedDocument]"]:
+        """Submits a `_parse` to the current executor, giving both."""
+        with self._lock:
+            if self._executor is None:
+                if sys.version_info >= (3, 11) and self.max_documents > 0:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_initialize_worker,
+                        initargs=(self.max_memory_mb,),
+                        max_tasks_per_child=self.max_documents,
+                    )
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_initialize_worker,
+                        initargs=(self.max_memory_mb,),
+                    )
+                self._submitted = 0
+            executor = self._executor
+            future = executor.submit(_parse, *args)
+            self._submitted += 1
+            if (
+                sys.version_info < (3, 11)
+                and self.max_documents > 0
+                and self._submitted >= self.processes * self.max_documents
+            ):
+                # max_tasks_per_child needs Python 3.11, so the whole pool is replaced instead
+                # once it has parsed as much as its workers would have. Its workers finish
+                # what was submitted before they exit.
+                self._executor = None
+                executor.shutdown(wait=False)
+            return executor, future
+
+    def iter_segments(
+        self, reader: BaseReader, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        """
+        `reader.iter_segments`, run in the workers.
+
+        Files the reader can shard are parsed a shard per worker, and segments are yielded as
+        soon as the shards before them are done.
+        """
+        shards: List[Any] = reader.shards(file_path) or [None]
+        submitted = [
+            self._submit(
+                type(reader),
+                reader.document_id,
+                reader.data_source_id,
+                reader.config,
+                str(file_path),
+                shard,
+            )
+            for shard in shards
+        ]
+        try:
+            yield from stitch_shards(
+                parsed,
+                (
+                    self._result(executor, future, file_path)
+                    for executor, future in submitted
+                ),
+            )
+        finally:
+            for _, future in submitted:
+                future.cancel()
+
+    def _result(
+        self,
+        executor: ProcessPoolExecutor,
+        future: "Future[ParsedDocument]",
+        file_path: Path,
+    ) -> ParsedDocument:
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # A worker died, probably killed for using too much memory. Every parse that
+            # was running fails with this, and the next one starts a new pool.
+            logger.error("Reader process died while parsing %s", file_path)
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool_lock = threading.Lock()
+# The pool for readers that load models, and the one for the others
+_pools: Dict[bool, ReaderPool] = {}
+
+
+def reader_pool(loads_models: bool = False) -> Optional[ReaderPool]:
+    """
+    The pool readers run in, or None if `READER_PROCESSES` is 0 and they run in-process.
+
+    Readers that load models get a pool of `DOCLING_PROCESSES` workers that are never replaced.
+    """
+    if settings.reader_processes <= 0:
+        return None
+    if loads_models:
+        processes, max_documents = settings.docling_processes, 0
+    else:
+        processes = settings.reader_processes
+        max_documents = settings.reader_process_max_documents
+    if processes <= 0:
+        return None
+    with _pool_lock:
+        pool = _pools.get(loads_models)
+        if (
+            pool is None
+            or pool.processes != processes
+            or pool.max_documents != max_documents
+        ):
+            if pool is not None:
+                pool.shutdown()
+            pool = _pools[loads_models] = ReaderPool(
+                processes,
+                max_documents=max_documents,
+                max_memory_mb=settings.reader_process_max_memory_mb,
+            )
+        return pool
+
+
+def shutdown_reader_pool() -> None:
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
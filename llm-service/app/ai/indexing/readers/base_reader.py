@@ -1,42 +1,129 @@
-import functools
-import os
-import tempfile
+import bisect
+import itertools
+import logging
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Set
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
-from detect_secrets.core.secrets_collection import SecretsCollection
-from detect_secrets.settings import default_settings
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core.schema import Document, TextNode, BaseNode
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
+from llama_index.core.schema import Document, TextNode, BaseNode, NodeRelationship
 
+from .pii_anonymizer import AnonymizedText, anonymize_pii
+from .secret_scanner import find_secrets
 
-@functools.cache
-def _get_analyzer() -> AnalyzerEngine:
-    """Cached analyzer engine to reuse compiled regex patterns."""
-    return AnalyzerEngine()
+if TYPE_CHECKING:
+    from ..parsed_document_cache import ParsedDocumentCache
+    from ..reader_pool import ReaderPool
 
+logger = logging.getLogger(__name__)
 
-@functools.cache
-def _get_anonymizer() -> AnonymizerEngine:
-    """Cached anonymizer engine to reuse compiled patterns."""
-    return AnonymizerEngine()  # type: ignore[no-untyped-call]
 
-
-@functools.cache
-def _get_secret_collection() -> SecretsCollection:
-    """Cached secrets collection to reuse compiled regex patterns."""
-    with default_settings():
-        return SecretsCollection()
+def page_label_at(page_starts: List[Tuple[int, str]], start_index: int) -> str:
+    """Label of the last page starting at or before `start_index`; `page_starts` is sorted."""
+    i = bisect.bisect_right(page_starts, start_index, key=lambda page: page[0])
+    return page_starts[i - 1][1] if i else ""
 
 
 @dataclass
 class ReaderConfig:
     block_secrets: bool = False
     anonymize_pii: bool = False
+    # Tabular documents: the most rows, and the most tokens, packed into one chunk; 0 is no limit
+    rows_per_chunk: int = 1
+    tokens_per_chunk: int = 0
+    # Tabular documents: the columns to keep, or None for all of them
+    columns: Optional[Tuple[str, ...]] = None
+
+    def __post_init__(self) -> None:
+        if self.rows_per_chunk < 0 or self.tokens_per_chunk < 0:
+            raise ValueError("rows_per_chunk and tokens_per_chunk can't be negative")
+        if self.rows_per_chunk == 0 and self.tokens_per_chunk == 0:
+            raise ValueError(
+                "rows_per_chunk and tokens_per_chunk can't both be unlimited"
+            )
+
+
+@dataclass
+class ParsedSegment:
+    text: str
+    # Copied onto every chunk made from this segment
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # If false, the segment becomes a single chunk instead of going through the splitter
+    split: bool = True
+    # Offset into the document and label of each page, for readers that keep track of pages
+    page_starts: Optional[List[Tuple[int, str]]] = None
+    # Offset of `text` into the document, for readers whose segments are parts of one text
+    start_char_idx: int = 0
+
+
+@dataclass
+class ParsedDocument:
+    """
+    What a reader gets out of a file before chunking it.
+
+    Producing it is the expensive part (converting the file, scanning for secrets and
+    anonymizing PII), and it doesn't depend on the splitter, so one parse can be chunked
+    for both the embedding and the summary index.
+    """
+
+    file_name: str
+    segments: List[ParsedSegment] = field(default_factory=list)
+    # If present, the file contained secrets and the segments are empty
+    secret_types: Optional[Set[str]] = None
+    # If true, the file contained PII and the segments contain anonymized text
+    pii_found: bool = False
+    # Time spent finding and anonymizing PII
+    pii_seconds: float = 0.0
+
+
+def _collect(
+    parsed: ParsedDocument, segments: Iterator[ParsedSegment]
+) -> ParsedDocument:
+    collected = list(segments)
+    if parsed.secret_types is None:
+        parsed.segments = collected
+    return parsed
+
+
+def stitch_shards(
+    parsed: ParsedDocument, shards: Iterable[ParsedDocument]
+) -> Iterator[ParsedSegment]:
+    """
+    Segments of independently parsed shards, in order, with offsets into the whole document.
+
+    Findings are merged into `parsed`, and the shards after one with secrets aren't read.
+    """
+    offset = 0
+    for shard in shards:
+        parsed.pii_found = parsed.pii_found or shard.pii_found
+        parsed.pii_seconds += shard.pii_seconds
+        if shard.secret_types is not None:
+            parsed.secret_types = shard.secret_types
+            return
+        shard_length = 0
+        for segment in shard.segments:
+            shard_length = max(shard_length, segment.start_char_idx + len(segment.text))
+            segment.start_char_idx += offset
+            if segment.page_starts is not None:
+                segment.page_starts = [
+                    (start + offset, label) for start, label in segment.page_starts
+                ]
+            yield segment
+        # Shards are joined with a newline, like pages
+        offset += shard_length + 1
 
 
 @dataclass
@@ -49,21 +136,150 @@ class ChunksResult:
 
 
 class BaseReader(ABC):
+    # Bump when a change to the reader changes what it parses out of files, so that
+    # parses cached by earlier versions stop being used
+    parser_version: ClassVar[int] = 1
+    # The fields of the reader config that change what the reader parses out of files, and so
+    # identify its parses along with `parser_version`
+    config_fields: ClassVar[Tuple[str, ...]] = ("block_secrets", "anonymize_pii")
+    # Readers that load models run in reader pool workers of their own, that keep them loaded
+    loads_models: ClassVar[bool] = False
+
     def __init__(
         self,
         splitter: SentenceSplitter,
         document_id: str,
         data_source_id: int,
         config: Optional[ReaderConfig] = None,
+        cache: Optional["ParsedDocumentCache"] = None,
+        pool: Optional["ReaderPool"] = None,
     ):
         self.splitter = splitter
         self.document_id = document_id
         self.data_source_id = data_source_id
         self.config = config or ReaderConfig()
+        self.cache = cache
+        self.pool = pool
+
+    @classmethod
+    def config_key(cls, config: ReaderConfig) -> Tuple[Any, ...]:
+        """The values of `config_fields` in `config`."""
+        return tuple(getattr(config, name) for name in cls.config_fields)
 
     @abstractmethod
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        """
+        Read the file, yielding its segments as they are produced.
+
+        Secret and PII findings are recorded on `parsed` instead of `parsed.segments`.
+        If `parsed.secret_types` is set once iteration stops, any segments that were already
+        yielded must be discarded by the caller.
+        """
+
+    def shards(self, file_path: Path) -> Optional[List[Any]]:
+        """
+        Parts of the file that can be parsed independently, in order, for `iter_shard_segments`.
+
+        None if the file can only be parsed as a whole.
+        """
+        return None
+
+    def iter_shard_segments(
+        self, file_path: Path, parsed: ParsedDocument, shard: Any
+    ) -> Iterator[ParsedSegment]:
+        """`iter_segments` for one of `shards`, with offsets from the start of the shard."""
+        raise NotImplementedError
+
+    def parse(self, file_path: Path) -> ParsedDocument:
+        parsed = ParsedDocument(file_name=file_path.name)
+        return _collect(parsed, self._segments(file_path, parsed))
+
+    def parse_shard(self, file_path: Path, shard: Any) -> ParsedDocument:
+        parsed = ParsedDocument(file_name=file_path.name)
+        return _collect(parsed, self.iter_shard_segments(file_path, parsed, shard))
+
+    def chunk(self, parsed: ParsedDocument) -> ChunksResult:
+        """Chunks a parsed document with this reader's splitter."""
+        ret = ChunksResult(secret_types=parsed.secret_types, pii_found=parsed.pii_found)
+        ret.chunks.extend(self.iter_parsed_chunks(parsed))
+        return ret
+
+    def iter_parsed_chunks(self, parsed: ParsedDocument) -> Iterator[TextNode]:
+        """`chunk`, one segment at a time."""
+        if parsed.secret_types is not None:
+            return
+        chunk_numbers = itertools.count()
+        for segment in parsed.segments:
+            yield from self._chunk_segment(parsed.file_name, segment, chunk_numbers)
+
     def load_chunks(self, file_path: Path) -> ChunksResult:
-        pass
+        return self.chunk(self.parse(file_path))
+
+    def iter_chunks(self, file_path: Path, result: ChunksResult) -> Iterator[TextNode]:
+        """
+        Yield chunks as they are produced, so indexing can start before the whole file is read.
+
+        Secret and PII findings are recorded on `result` instead of `result.chunks`.
+        If `result.secret_types` is set once iteration stops, any chunks that were already
+        yielded must be discarded by the caller.
+        """
+        parsed = ParsedDocument(file_name=file_path.name)
+        chunk_numbers = itertools.count()
+        for segment in self._segments(file_path, parsed):
+            yield from self._chunk_segment(parsed.file_name, segment, chunk_numbers)
+        result.secret_types = parsed.secret_types
+        result.pii_found = parsed.pii_found
+
+    def _segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        if self.cache is None:
+            return self.read_segments(file_path, parsed)
+        return self.cache.segments(self, file_path, parsed)
+
+    def read_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        """`iter_segments`, in this reader's pool if it has one."""
+        if self.pool is None:
+            yield from self.iter_segments(file_path, parsed)
+        else:
+            yield from self.pool.iter_segments(self, file_path, parsed)
+        if parsed.pii_seconds:
+            logger.info(
+                "PII processing of %s took %.2fs", file_path.name, parsed.pii_seconds
+            )
+
+    def _chunk_segment(
+        self, file_name: str, segment: ParsedSegment, chunk_numbers: Iterator[int]
+    ) -> List[TextNode]:
+        document = Document(text=segment.text, metadata=dict(segment.metadata))
+        document.id_ = self.document_id
+        self._add_document_metadata(document, Path(file_name))
+        if segment.split:
+            chunks = self._chunks_in_document(document)
+            for chunk in chunks:
+                chunk.metadata["chunk_number"] = next(chunk_numbers)
+                if chunk.start_char_idx is not None:
+                    chunk.start_char_idx += segment.start_char_idx
+                if chunk.end_char_idx is not None:
+                    chunk.end_char_idx += segment.start_char_idx
+        else:
+            chunk = TextNode(text=segment.text, metadata=dict(document.metadata))
+            chunk.metadata["chunk_number"] = next(chunk_numbers)
+            chunk.relationships[NodeRelationship.SOURCE] = (
+                document.as_related_node_info()
+            )
+            chunks = [chunk]
+        if segment.page_starts:
+            for chunk in chunks:
+                if chunk.start_char_idx is not None:
+                    chunk.metadata["page_number"] = page_label_at(
+                        segment.page_starts, chunk.start_char_idx
+                    )
+        return chunks
 
     def _add_document_metadata(self, node: BaseNode, file_path: Path) -> None:
         node.metadata["file_name"] = file_path.name
@@ -89,43 +305,20 @@ class BaseReader(ABC):
     def _block_secrets(self, chunks: List[str]) -> Optional[Set[str]]:
         if not self.config.block_secrets:
             return None
+        return find_secrets(chunks)
 
-        # Create a fresh collection each time since clear() doesn't exist
-        # but still benefit from cached settings/plugins via default_settings()
-        with tempfile.TemporaryDirectory() as tmpdir:
-            paths = []
-            for i, chunk in enumerate(chunks):
-                path = os.path.join(tmpdir, f"chunk_{i}.txt")
-                with open(path, "w") as f:
-                    f.write(chunk)
-                paths.append(path)
+    def _anonymize_pii(self, text: str, parsed: ParsedDocument) -> Optional[str]:
+        anonymized = self._anonymize_pii_keeping_offsets(text, [], parsed)
+        return anonymized.text if anonymized is not None else None
 
-            secrets_collection = _get_secret_collection()
-            with default_settings():
-                secrets_collection.scan_files(*paths)
-
-        secrets_json = secrets_collection.json()
-
-        ret = set()
-        for secrets in secrets_json.values():
-            for secret in secrets:
-                ret.add(secret.type)
-
-        return ret
-
-    def _anonymize_pii(self, text: str) -> Optional[str]:
+    def _anonymize_pii_keeping_offsets(
+        self, text: str, offsets: List[int], parsed: ParsedDocument
+    ) -> Optional[AnonymizedText]:
+        """`_anonymize_pii`, also giving where each of the sorted `offsets` is in the new text."""
         if not self.config.anonymize_pii:
             return None
-
-        analyzer = _get_analyzer()
-
-        # TODO: support other languages
-        results = analyzer.analyze(text=text, entities=None, language="en")
-
-        anonymizer = _get_anonymizer()
-
-        anonymized_text = anonymizer.anonymize(text=text, analyzer_results=results)  # type: ignore[arg-type]
-        if anonymized_text.text == text:
-            return None
-
-        return anonymized_text.text
+        started = time.perf_counter()
+        try:
+            return anonymize_pii(text, offsets)
+        finally:
+            parsed.pii_seconds += time.perf_counter() - started
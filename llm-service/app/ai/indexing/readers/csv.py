@@ -37,78 +37,37 @@
 #
 
 import logging
-import io
-import json
 from pathlib import Path
-from typing import List
+from typing import Iterator
 
 import pandas as pd
-from llama_index.core.node_parser.interface import MetadataAwareTextSplitter
-from llama_index.core.schema import Document, TextNode
 
-from .base_reader import BaseReader, ChunksResult
+from ....exceptions import DocumentParseError
+from .base_reader import ParsedDocument, ParsedSegment
+from .tabular import ROW_BATCH_SIZE, Row, TabularReader
 
 logger = logging.getLogger(__name__)
 
 
-class _CsvSplitter(MetadataAwareTextSplitter):
-    def split_text_metadata_aware(self, text: str, metadata_str: str) -> List[str]:
-        # metadata_str is kept as an argument to satisfy the interface, but it is not used
-        # because metadata is added to the chunks later.
-        return self.split_text(text)
-
-    def split_text(self, text: str) -> List[str]:
-        buffer = io.StringIO(text)
-        # Read the CSV file into a pandas DataFrame
-        df = pd.read_csv(buffer)
-        # Convert the dataframe into a list of dictionaries, one per row
-        rows = df.to_dict(orient="records")
-        # Convert each dictionary into a chunk
-        return [json.dumps(row, sort_keys=True) for row in rows]
-
-
-class CSVReader(BaseReader):
-    def load_chunks(self, file_path: Path) -> ChunksResult:
-
-        # Create the base document
-        with open(file_path, "r") as f:
-            content = f.read()
-
-        secrets = self._block_secrets([content])
-        if secrets is not None:
-            return ChunksResult(secret_types=secrets)
-
-        ret = ChunksResult()
-
-        anonymized_text = self._anonymize_pii(content)
-        if anonymized_text is not None:
-            ret.pii_found = True
-            content = anonymized_text
-
-        document = Document(text=content)
-        document.id_ = self.document_id
-        self._add_document_metadata(document, file_path)
-
-        local_splitter = _CsvSplitter()
+class CSVReader(TabularReader):
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        return self._row_segments(self._iter_rows(file_path), parsed)
 
+    @staticmethod
+    def _iter_rows(file_path: Path) -> Iterator[Row]:
+        row_number = 0
         try:
-            rows = local_splitter.get_nodes_from_documents([document])
+            with pd.read_csv(file_path, chunksize=ROW_BATCH_SIZE) as frames:
+                for frame in frames:
+                    for row in frame.to_dict(orient="records"):
+                        row_number += 1
+                        yield row, {"row_number": row_number}
         except Exception as e:
+            if row_number:
+                # Ending the stream here would pass the rows read so far off as the whole file
+                raise DocumentParseError(
+                    f"Error processing CSV file {file_path} after row {row_number}: {e}"
+                ) from e
             logger.error(f"Error processing CSV file {file_path}: {e}")
-            return ret
-
-        for i, row in enumerate(rows):
-            row.metadata["file_name"] = document.metadata["file_name"]
-            row.metadata["document_id"] = document.metadata["document_id"]
-            row.metadata["data_source_id"] = document.metadata["data_source_id"]
-            row.metadata["chunk_number"] = i
-            row.metadata["row_number"] = i + 1
-            row.metadata["chunk_format"] = "json"
-
-        converted_rows: List[TextNode] = []
-        for row in rows:
-            assert isinstance(row, TextNode)
-            converted_rows.append(row)
-
-        ret.chunks = converted_rows
-        return ret
@@ -37,45 +37,139 @@
 #
 
 
+import functools
 import logging
-import subprocess
+import queue
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from subprocess import CompletedProcess
+from typing import Iterator, List, Optional, Tuple
 
-from llama_index.core.schema import TextNode
+from docling.document_converter import DocumentConverter
+from docling_core.types.doc.base import ImageRefMode
+from docling_core.types.doc.document import DoclingDocument
+from pypdf import PdfReader
 
+from ....config import settings
 from ....exceptions import DocumentParseError
+from .base_reader import ParsedDocument, ParsedSegment
 from .markdown import MdReader
 
 logger = logging.getLogger(__name__)
 
 
-def load_chunks(markdown_reader: MdReader, file_path: Path) -> list[TextNode] | None:
-    directory = file_path.parent
-    logger.debug(f"{directory=}")
-    with open("docling-output.txt", "a") as f:
-        process: CompletedProcess[bytes] = subprocess.run(
-            [
-                "docling",
-                "-v",
-                "--image-export-mode=placeholder",
-                "--abort-on-error",
-                f"--output={directory}",
-                str(file_path),
-            ],
-            stdout=f,
-            stderr=f,
-        )
-    logger.info(f"docling return code = {process.returncode}")
+class ConverterPool:
+    """
+    Docling converters that stay loaded between documents.
+
+    A converter loads its layout and OCR models the first time it converts a format and
+    keeps them, so up to `size` converters are created per process, and each is lent to one
+    conversion at a time. The readers that use them run in reader pool workers that are never
+    replaced, so that this pool lives as long as they do.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: queue.LifoQueue[DocumentConverter] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    @contextmanager
+    def converter(self) -> Iterator[DocumentConverter]:
+        converter = self._take()
+        try:
+            yield converter
+        finally:
+            self._idle.put(converter)
+
+    def _take(self) -> DocumentConverter:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if not create:
+            return self._idle.get()
+        logger.info("Creating Docling converter %s of %s", self._created, self.size)
+        try:
+            return DocumentConverter()
+        except BaseException:
+            with self._lock:
+                self._created -= 1
+            raise
+
+
+@functools.cache
+def _converter_pool(size: int) -> ConverterPool:
+    return ConverterPool(size)
+
+
+def converter_pool() -> ConverterPool:
+    return _converter_pool(max(1, settings.docling_converters))
+
+
+def page_ranges(page_count: int, batch_size: int) -> List[Tuple[int, int]]:
+    """1-based, inclusive ranges of at most `batch_size` pages covering the document."""
+    if batch_size <= 0:
+        return [(1, page_count)]
+    return [
+        (start, min(start + batch_size - 1, page_count))
+        for start in range(1, page_count + 1, batch_size)
+    ]
+
+
+def _pdf_page_count(file_path: Path) -> Optional[int]:
+    try:
+        return len(PdfReader(file_path).pages)
+    except Exception as e:
+        # Docling may still manage to read it, all at once
+        logger.warning("Failed to count the pages of %s: %s", file_path, e)
+        return None
+
+
+def convert(file_path: Path) -> Iterator[DoclingDocument]:
+    """
+    Converts the file with a pooled converter, yielding a document per batch of pages.
+
+    PDFs are converted `DOCLING_PAGE_BATCH_SIZE` pages at a time, which bounds the memory a
+    large PDF takes and lets other documents have the converter in between batches. Page
+    numbers in the documents are still those of the whole file.
+    """
+    page_count = None
+    if file_path.suffix.lower() == ".pdf":
+        page_count = _pdf_page_count(file_path)
+    batches: List[Optional[Tuple[int, int]]] = [None]
+    if page_count:
+        batches = list(page_ranges(page_count, settings.docling_page_batch_size))
+    for batch in batches:
+        logger.debug("Converting %s, pages %s", file_path, batch or "all")
+        with converter_pool().converter() as converter:
+            try:
+                if batch is None:
+                    result = converter.convert(file_path)
+                else:
+                    result = converter.convert(file_path, page_range=batch)
+            except Exception as e:
+                raise DocumentParseError(
+                    f"docling failed to process {file_path}: {e}"
+                ) from e
+        yield result.document
+
+
+def iter_segments(
+    markdown_reader: MdReader, file_path: Path, parsed: ParsedDocument
+) -> Iterator[ParsedSegment]:
     # todo: figure out page numbers & look into the docling llama-index integration
-    markdown_file_path = file_path.with_suffix(".md")
-    logger.info(f"{markdown_file_path=}")
-    if process.returncode == 0 and markdown_file_path.exists():
-        # update chunk metadata to point at the original file
-        chunks = markdown_reader.load_chunks(markdown_file_path).chunks
-        for chunk in chunks:
-            chunk.metadata["file_name"] = file_path.name
-        return chunks
-    raise DocumentParseError(
-        f"docling failed to process {file_path} with return code {process.returncode}"
+    markdown = "\n\n".join(
+        document.export_to_markdown(image_mode=ImageRefMode.PLACEHOLDER)
+        for document in convert(file_path)
     )
+    with tempfile.TemporaryDirectory() as directory:
+        markdown_file_path = Path(directory) / file_path.with_suffix(".md").name
+        markdown_file_path.write_text(markdown)
+        # chunks point at the original file, since `parsed` is named after it
+        yield from markdown_reader.iter_segments(markdown_file_path, parsed)
@@ -36,36 +36,46 @@
 #  DATA.
 #
 
+import functools
 import logging
 from pathlib import Path
-from typing import List, Any
+from typing import Any, Dict, Iterator
 
-from docling.datamodel.document import ConversionResult
-from docling.document_converter import DocumentConverter
 from docling_core.transforms.chunker.base import BaseChunk
 from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
-from llama_index.core.schema import Document, TextNode, NodeRelationship
+from docling_core.types.doc.document import DoclingDocument
 
-from .base_reader import BaseReader
-from .base_reader import ChunksResult
+from . import docling
+from .base_reader import BaseReader, ParsedDocument, ParsedSegment
 from .pdf import MarkdownSerializerProvider
 
 logger = logging.getLogger(__name__)
 
+
+@functools.cache
+def _chunker() -> HybridChunker:
+    # Loads a tokenizer, so it is shared like the converters
+    return HybridChunker(serializer_provider=MarkdownSerializerProvider())
+
+
 class DoclingReader(BaseReader):
+    loads_models = True
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
 
-    def load_chunks(self, file_path: Path) -> ChunksResult:
-        document = Document()
-        document.id_ = self.document_id
-        self._add_document_metadata(document, file_path)
-        parent = document.as_related_node_info()
-
-        converted_chunks: List[TextNode] = []
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        # Docling's chunker follows the document's structure rather than our splitter,
+        # so its chunks are the segments, and they're kept as they are.
         logger.debug(f"{file_path=}")
-        docling_doc: ConversionResult = DocumentConverter().convert(file_path)
-        chunky_chunks = HybridChunker(serializer_provider=MarkdownSerializerProvider()).chunk(docling_doc.document)
+        for document in docling.convert(file_path):
+            yield from self._document_segments(document)
+
+    @staticmethod
+    def _document_segments(document: DoclingDocument) -> Iterator[ParsedSegment]:
+        chunky_chunks = _chunker().chunk(document)
         chunky_chunk: BaseChunk
         for i, chunky_chunk in enumerate(chunky_chunks):
             page_number: int = 0
@@ -74,16 +84,8 @@ class DoclingReader(BaseReader):
                 continue
             for item in chunky_chunk.meta.doc_items:
                 page_number= item.prov[0].page_no if item.prov else None
-            node = TextNode(text=chunky_chunk.text)
+            metadata: Dict[str, Any] = {}
             if page_number:
-                node.metadata["page_number"] = page_number
-            node.metadata["file_name"] = document.metadata["file_name"]
-            node.metadata["document_id"] = document.metadata["document_id"]
-            node.metadata["data_source_id"] = document.metadata["data_source_id"]
-            node.metadata["chunk_number"] = i
-            node.metadata["chunk_format"] = "markdown"
-            node.relationships.update(
-                {NodeRelationship.SOURCE: parent}
-            )
-            converted_chunks.append(node)
-        return ChunksResult(converted_chunks)
+                metadata["page_number"] = page_number
+            metadata["chunk_format"] = "markdown"
+            yield ParsedSegment(chunky_chunk.text, metadata=metadata, split=False)
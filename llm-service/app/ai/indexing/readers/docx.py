@@ -37,11 +37,11 @@
 #
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from llama_index.readers.file import DocxReader as LlamaIndexDocxReader
 
-from .base_reader import BaseReader, ChunksResult
+from .base_reader import BaseReader, ParsedDocument, ParsedSegment
 
 
 class DocxReader(BaseReader):
@@ -49,27 +49,23 @@ class DocxReader(BaseReader):
         super().__init__(*args, **kwargs)
         self.inner = LlamaIndexDocxReader()
 
-    def load_chunks(self, file_path: Path) -> ChunksResult:
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
         documents = self.inner.load_data(file_path)
         assert len(documents) == 1
         document = documents[0]  # single document contains all pages' contents
-        document.id_ = self.document_id
 
         document_text = document.text
 
         secrets = self._block_secrets([document_text])
         if secrets is not None:
-            return ChunksResult(secret_types=secrets)
+            parsed.secret_types = secrets
+            return
 
-        ret = ChunksResult()
-
-        anonymized_text = self._anonymize_pii(document_text)
+        anonymized_text = self._anonymize_pii(document_text, parsed)
         if anonymized_text is not None:
-            ret.pii_found = True
-            document.set_content(anonymized_text)
-
-        document.set_content(document_text)
+            parsed.pii_found = True
+            document_text = anonymized_text
 
-        self._add_document_metadata(document, file_path)
-        ret.chunks = self._chunks_in_document(document)
-        return ret
+        yield ParsedSegment(document_text, metadata=document.metadata)
@@ -35,7 +35,6 @@
 #  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
 #  DATA.
 
-import json
 import logging
 from datetime import date, datetime, time
 from pathlib import Path
@@ -44,159 +43,87 @@ from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 import pandas as pd
 from openpyxl import load_workbook
 from pyxlsb import open_workbook as open_xlsb_workbook
-from llama_index.core.node_parser.interface import MetadataAwareTextSplitter
-from llama_index.core.schema import Document, TextNode
 
-from .base_reader import BaseReader, ChunksResult
 from ....exceptions import DocumentParseError
+from .base_reader import ParsedDocument, ParsedSegment
+from .tabular import Row, TabularReader
 
 logger = logging.getLogger(__name__)
 
 
-class _ExcelSplitter(MetadataAwareTextSplitter):
-    """Custom splitter for Excel files that handles multiple sheets and converts rows to JSON."""
-
-    def split_text_metadata_aware(self, text: str, metadata_str: str) -> List[str]:
-        # metadata_str is kept as an argument to satisfy the interface, but it is not used
-        # because metadata is added to the chunks later.
-        return self.split_text(text)
-
-    def split_text(self, text: str) -> List[str]:
-        """
-        Expects text to be a JSON representation of the workbook:
-        {"sheets": [{"name": "Sheet1", "rows": [...]}, ...]}
-        Returns one JSON string per row with embedded sheet metadata.
-        """
-        try:
-            workbook_data = json.loads(text)
-            row_chunks: List[str] = []
-
-            for sheet_data in workbook_data.get("sheets", []):
-                sheet_name = sheet_data.get("name", "")
-                rows = sheet_data.get("rows", [])
-
-                for i, row in enumerate(rows):
-                    # Embed sheet metadata in the row JSON
-                    row_with_meta = {
-                        "__sheet_name__": sheet_name,
-                        "__row_number__": i + 1,
-                        **row,
-                    }
-                    row_chunks.append(json.dumps(row_with_meta, sort_keys=True))
-
-            return row_chunks
-        except Exception as e:
-            logger.error("Error splitting Excel text: %s", e)
-            raise DocumentParseError("Error splitting Excel text") from e
-
-
-class ExcelReader(BaseReader):
-    """Reader that creates a Document from Excel files and uses splitter for chunking."""
-
-    def load_chunks(self, file_path: Path) -> ChunksResult:
-        ret = ChunksResult()
+class ExcelReader(TabularReader):
+    """Reader that makes chunks of the rows of each sheet of an Excel workbook."""
 
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        found_rows = False
         try:
-            # Build workbook data structure by streaming rows
-            sheets_data: List[Dict[str, Any]] = []
-            for sheet_name, row_number, row_dict in self._iter_rows(file_path):
-                # Find or create sheet in sheets_data
-                sheet_entry = next(
-                    (s for s in sheets_data if s["name"] == sheet_name),
-                    None,
-                )
-                if sheet_entry is None:
-                    sheet_entry = {"name": sheet_name, "rows": []}
-                    sheets_data.append(sheet_entry)
-                sheet_entry["rows"].append(row_dict)
-
-            if not sheets_data or all(not s["rows"] for s in sheets_data):
-                logger.warning("No data rows found in Excel file %s", file_path)
-                return ret
-
-            # Create JSON representation of the workbook
-            workbook_data = {"sheets": sheets_data}
-            content = json.dumps(workbook_data)
-
-            # Check for secrets in the serialized content
-            secrets = self._block_secrets([content])
-            if secrets is not None:
-                ret.secret_types = secrets
-                return ret
-
-            # Optionally anonymize PII
-            anonymized_text = self._anonymize_pii(content)
-            if anonymized_text is not None:
-                ret.pii_found = True
-                content = anonymized_text
-
-            # Create document and use splitter (following CSV reader pattern)
-            document = Document(text=content)
-            document.id_ = self.document_id
-            self._add_document_metadata(document, file_path)
-
-            local_splitter = _ExcelSplitter()
-
-            try:
-                rows = local_splitter.get_nodes_from_documents([document])
-            except Exception as e:
-                logger.error("Error processing Excel file %s: %s", file_path, e)
-                return ret
-
-            # Extract embedded metadata and clean up the row JSON
-            for i, row in enumerate(rows):
-                try:
-                    assert isinstance(row, TextNode)
-                    row_data = json.loads(row.text)
-                    sheet_name = row_data.pop("__sheet_name__", "")
-                    row_number = row_data.pop("__row_number__", i + 1)
-
-                    # Store cleaned row JSON without metadata fields
-                    row.text = json.dumps(row_data, sort_keys=True)
-
-                    # Add metadata
-                    row.metadata["file_name"] = document.metadata["file_name"]
-                    row.metadata["document_id"] = document.metadata["document_id"]
-                    row.metadata["data_source_id"] = document.metadata["data_source_id"]
-                    row.metadata["chunk_number"] = i
-                    row.metadata["row_number"] = row_number
-                    row.metadata["sheet_name"] = sheet_name
-                    row.metadata["chunk_format"] = "json"
-                except Exception as e:
-                    logger.error("Error processing row %d: %s", i, e)
-
-            ret.chunks = rows
-            return ret
-
+            for segment in self._row_segments(
+                self._iter_numbered_rows(file_path), parsed
+            ):
+                found_rows = True
+                yield segment
+        except DocumentParseError:
+            raise
         except Exception as exc:
+            if found_rows:
+                # Ending the stream here would pass the rows read so far off as the whole file
+                raise DocumentParseError(
+                    f"Error reading Excel file {file_path}: {exc}"
+                ) from exc
             logger.error("Error reading Excel file %s: %s", file_path, exc)
-            return ret
+            return
+        if not found_rows and parsed.secret_types is None:
+            logger.warning("No data rows found in Excel file %s", file_path)
+
+    def _iter_numbered_rows(self, file_path: Path) -> Iterator[Row]:
+        sheet_row_counts: Dict[str, int] = {}
+        for sheet_name, _, row_dict in self._iter_rows(file_path):
+            # Rows are numbered among the data rows of their sheet
+            row_number = sheet_row_counts.get(sheet_name, 0) + 1
+            sheet_row_counts[sheet_name] = row_number
+            yield row_dict, {"row_number": row_number, "sheet_name": sheet_name}
 
     def _iter_rows(self, file_path: Path) -> Iterator[Tuple[str, int, Dict[str, str]]]:
         suffix = file_path.suffix.lower()
 
         if suffix == ".xlsb":
-            try:
-                yield from self._iter_xlsb_rows(file_path)
-                return
-            except Exception as exc:
-                logger.warning(
-                    "pyxlsb streaming failed for %s: %s. Falling back to pandas.",
-                    file_path,
-                    exc,
-                )
-
-        if suffix == ".xls":
-            try:
-                yield from self._iter_openpyxl_rows(file_path)
-                return
-            except Exception as exc:
-                logger.warning(
-                    "openpyxl streaming failed for %s: %s. Falling back to pandas.",
-                    file_path,
-                    exc,
-                )
+            yield from self._with_pandas_fallback(
+                "pyxlsb", self._iter_xlsb_rows(file_path), file_path
+            )
+            return
+
+        if suffix in (".xlsx", ".xlsm"):
+            yield from self._with_pandas_fallback(
+                "openpyxl", self._iter_openpyxl_rows(file_path), file_path
+            )
+            return
+
+        yield from self._iter_pandas_rows(file_path)
 
+    def _with_pandas_fallback(
+        self,
+        library: str,
+        rows: Iterator[Tuple[str, int, Dict[str, str]]],
+        file_path: Path,
+    ) -> Iterator[Tuple[str, int, Dict[str, str]]]:
+        """Streams `rows`, falling back to pandas if the streaming library fails before the first row."""
+        started = False
+        try:
+            for row in rows:
+                started = True
+                yield row
+            return
+        except Exception as exc:
+            if started:
+                raise
+            logger.warning(
+                "%s streaming failed for %s: %s. Falling back to pandas.",
+                library,
+                file_path,
+                exc,
+            )
         yield from self._iter_pandas_rows(file_path)
 
     def _iter_openpyxl_rows(
@@ -259,33 +186,38 @@ class ExcelReader(BaseReader):
         self, file_path: Path
     ) -> Iterator[Tuple[str, int, Dict[str, str]]]:
         try:
-            sheets = pd.read_excel(file_path, sheet_name=None, engine="calamine")
+            workbook = pd.ExcelFile(file_path, engine="calamine")
         except Exception as exc:
             logger.error("Error reading Excel file %s: %s", file_path, exc)
             return
 
-        if len(sheets) == 0:
-            logger.error("No sheets found in Excel file %s", file_path)
-            return
+        with workbook:
+            if len(workbook.sheet_names) == 0:
+                logger.error("No sheets found in Excel file %s", file_path)
+                return
 
-        for sheet_name, df in sheets.items():
-            if df.empty:
-                continue
+            # One sheet in memory at a time
+            for sheet_name in workbook.sheet_names:
+                df = workbook.parse(sheet_name)
+                if df.empty:
+                    continue
 
-            df = df.map(str)
-            headers = [str(column) for column in df.columns]
-            row_counter = 1  # headers come from the first row in pandas
+                df = df.map(str)
+                headers = [str(column) for column in df.columns]
+                row_counter = 1  # headers come from the first row in pandas
 
-            for record in df.itertuples(index=False, name=None):
-                row_counter += 1
-                values = [str(value) if value is not None else "" for value in record]
-                self._ensure_header_length(headers, len(values))
-                row_dict = self._build_row_dict(headers, values)
+                for record in df.itertuples(index=False, name=None):
+                    row_counter += 1
+                    values = [
+                        str(value) if value is not None else "" for value in record
+                    ]
+                    self._ensure_header_length(headers, len(values))
+                    row_dict = self._build_row_dict(headers, values)
 
-                if self._is_empty_row(list(row_dict.values())):
-                    continue
+                    if self._is_empty_row(list(row_dict.values())):
+                        continue
 
-                yield str(sheet_name), row_counter, row_dict
+                    yield str(sheet_name), row_counter, row_dict
 
     @staticmethod
     def _normalize_headers(values: Sequence[Any]) -> List[str]:
@@ -37,22 +37,22 @@
 #
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
-from llama_index.core.schema import TextNode
-
-from .base_reader import BaseReader, ChunksResult
-from .docling import load_chunks
+from .base_reader import BaseReader, ParsedDocument, ParsedSegment
+from .docling import iter_segments
 from .markdown import MdReader
 
 
 class ImagesReader(BaseReader):
+    loads_models = True
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.markdown_reader = MdReader(*args, **kwargs)
 
-    def load_chunks(self, file_path: Path) -> ChunksResult:
-        chunks: list[TextNode] = load_chunks(self.markdown_reader, file_path)
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
         # todo: what should we do if there are no chunks?
-        # todo: handle PII & secrets
-        return ChunksResult(chunks=chunks)
+        return iter_segments(self.markdown_reader, file_path, parsed)
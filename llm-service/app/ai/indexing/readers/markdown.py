@@ -37,13 +37,13 @@
 #
 
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Iterator, cast
 
 from llama_index.core.node_parser import MarkdownNodeParser
-from llama_index.core.schema import TextNode, Document, NodeRelationship
+from llama_index.core.schema import TextNode, Document
 from llama_index.readers.file import MarkdownReader
 
-from .base_reader import BaseReader, ChunksResult
+from .base_reader import BaseReader, ParsedDocument, ParsedSegment
 
 
 class MdReader(BaseReader):
@@ -51,38 +51,28 @@ class MdReader(BaseReader):
         super().__init__(*args, **kwargs)
         self.inner = MarkdownReader()
 
-    def load_chunks(self, file_path: Path) -> ChunksResult:
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
         with open(file_path, "r") as f:
             content = f.read()
 
         secrets = self._block_secrets([content])
         if secrets is not None:
-            return ChunksResult(secret_types=secrets)
+            parsed.secret_types = secrets
+            return
 
-        ret = ChunksResult()
-
-        anonymized_text = self._anonymize_pii(content)
+        anonymized_text = self._anonymize_pii(content, parsed)
         if anonymized_text is not None:
-            ret.pii_found = True
+            parsed.pii_found = True
             content = anonymized_text
 
-        document = Document(text=content)
-        document.id_ = self.document_id
-        self._add_document_metadata(document, file_path)
+        # Each section is split on its own, and its chunks keep the section's header path
         parser = MarkdownNodeParser()
-        nodes = parser.get_nodes_from_documents([document])
-        results: list[TextNode] = []
-        for node in nodes:
+        for node in parser.get_nodes_from_documents([Document(text=content)]):
             node = cast(TextNode, node)
             if node.text is None:
                 continue
-            texts_nodes: list[TextNode] = self._chunks_in_document(Document(text=node.text, metadata=node.metadata))
-            for text_node in texts_nodes:
-                self._add_document_metadata(text_node, file_path)
-                text_node.metadata["chunk_format"] = "markdown"
-                text_node.relationships.update(
-                    {NodeRelationship.SOURCE: document.as_related_node_info()}
-                )
-                results.append(text_node)
-        ret.chunks = results
-        return ret
+            yield ParsedSegment(
+                node.text, metadata={**node.metadata, "chunk_format": "markdown"}
+            )
@@ -37,20 +37,30 @@
 #
 import logging
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Iterator, List, Tuple
 
+import pypdf
 from docling_core.transforms.serializer.base import BaseSerializerProvider, BaseDocSerializer
 from docling_core.transforms.serializer.markdown import MarkdownDocSerializer
 from docling_core.types.doc.document import DoclingDocument
 from llama_index.core.schema import Document, TextNode
-from llama_index.readers.file import PDFReader as LlamaIndexPDFReader
 from typing_extensions import override
 
-from .base_reader import BaseReader, ChunksResult
+from .base_reader import (
+    BaseReader,
+    ParsedDocument,
+    ParsedSegment,
+    page_label_at,
+    stitch_shards,
+)
 from .markdown import MdReader
 
 logger = logging.getLogger(__name__)
 
+# Pages parsed together. Shards are the unit of parallelism when parsing in the reader pool,
+# and of streaming otherwise; chunks don't span them.
+PAGES_PER_SHARD = 50
+
 
 class PageTracker:
     def __init__(self, pages: List[Document]) -> None:
@@ -63,6 +73,7 @@ class PageTracker:
             self.page_start_index.append(start_of_page)
         self.document_text = "\n".join(self.page_contents)
         self.assert_correctness()
+        self._page_starts = list(zip(self.page_start_index, self.page_numbers))
 
     def assert_correctness(self) -> None:
         # Check computation. Add 1 to length because we're assuming the last page would have the new line
@@ -72,14 +83,12 @@ class PageTracker:
                 f"Start of page after last {self.page_start_index[-1]} does not match document text length {document_length + 1}"
             )
 
+    @property
+    def page_starts(self) -> List[Tuple[int, str]]:
+        return self._page_starts
+
     def _find_page_number(self, start_index: int) -> str:
-        last_good_page_number = ""
-        for j, page_start in enumerate(self.page_start_index):
-            if start_index >= page_start:
-                last_good_page_number = self.page_numbers[j]
-            else:
-                break
-        return last_good_page_number
+        return page_label_at(self.page_starts, start_index)
 
     def populate_chunk_page_numbers(self, chunks: List[TextNode]) -> None:
         for chunk in chunks:
@@ -101,34 +110,64 @@ class MarkdownSerializerProvider(BaseSerializerProvider):
 class PDFReader(BaseReader):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
-        self.inner = LlamaIndexPDFReader(return_full_document=False)
         self.markdown_reader = MdReader(*args, **kwargs)
 
-    def load_chunks(self, file_path: Path) -> ChunksResult:
-        ret = ChunksResult()
-
-        pages: list[Document] = self.inner.load_data(file_path)
+    def shards(self, file_path: Path) -> List[Tuple[int, Tuple[str, ...]]]:
+        """The first page of each shard, and the labels of its pages."""
+        page_labels = pypdf.PdfReader(file_path).page_labels
+        return [
+            (start, tuple(page_labels[start : start + PAGES_PER_SHARD]))
+            for start in range(0, len(page_labels), PAGES_PER_SHARD)
+        ]
+
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        yield from stitch_shards(
+            parsed,
+            (self.parse_shard(file_path, shard) for shard in self.shards(file_path)),
+        )
+
+    def iter_shard_segments(
+        self,
+        file_path: Path,
+        parsed: ParsedDocument,
+        shard: Tuple[int, Tuple[str, ...]],
+    ) -> Iterator[ParsedSegment]:
+        pages = self._load_pages(file_path, *shard)
         page_counter = PageTracker(pages)
 
         content = page_counter.document_text
 
         secrets = self._block_secrets([content])
         if secrets is not None:
-            ret.secret_types = secrets
-            return ret
-
-        anonymized_text = self._anonymize_pii(content)
-        if anonymized_text is not None:
-            ret.pii_found = True
-            content = anonymized_text
-
-        document = Document(text=content)
-        document.id_ = self.document_id
-        self._add_document_metadata(document, file_path)
-        chunks = self._chunks_in_document(document)
-
-        # TODO: check if PPI removal breaks the page numbers slightly because the text changes
-        page_counter.populate_chunk_page_numbers(chunks)
-
-        ret.chunks = chunks
-        return ret
+            parsed.secret_types = secrets
+            return
+
+        page_starts = page_counter.page_starts
+        anonymized = self._anonymize_pii_keeping_offsets(
+            content, [start for start, _ in page_starts], parsed
+        )
+        if anonymized is not None:
+            parsed.pii_found = True
+            content = anonymized.text
+            page_starts = [
+                (start, label)
+                for start, (_, label) in zip(anonymized.offsets, page_starts)
+            ]
+
+        yield ParsedSegment(content, page_starts=page_starts)
+
+    @staticmethod
+    def _load_pages(
+        file_path: Path, start: int, page_labels: Tuple[str, ...]
+    ) -> List[Document]:
+        """The pages from `start` with `page_labels`, the way llama-index's PDFReader loads them."""
+        pdf = pypdf.PdfReader(file_path)
+        return [
+            Document(
+                text=pdf.pages[page].extract_text(),
+                metadata={"page_label": label, "file_name": file_path.name},
+            )
+            for page, label in enumerate(page_labels, start)
+        ]
@@ -0,0 +1,156 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+Finds and anonymizes PII with presidio, in shards.
+
+spaCy's cost grows faster than the length of the text it's given, so text is cut into shards of
+at most about PII_SHARD_CHARS, on sentence ends where it can be, and the shards go through spaCy
+together with `nlp.pipe`. Offsets that must survive anonymization, like page starts, are made
+shard boundaries, so the same places can be found in the anonymized text.
+"""
+
+import bisect
+import functools
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine
+from presidio_anonymizer import AnonymizerEngine
+
+from ....config import settings
+
+PII_SHARD_CHARS = 10_000
+# Shards given to spaCy at once
+PII_BATCH_SIZE = 32
+
+_SENTENCE_END = re.compile(r"[.!?]\s|\n")
+
+
+@functools.cache
+def _get_analyzer() -> AnalyzerEngine:
+    """Cached analyzer engine to reuse compiled regex patterns."""
+    return AnalyzerEngine()
+
+
+@functools.cache
+def _get_anonymizer() -> AnonymizerEngine:
+    """Cached anonymizer engine to reuse compiled patterns."""
+    return AnonymizerEngine()  # type: ignore[no-untyped-call]
+
+
+@dataclass
+class AnonymizedText:
+    text: str
+    # Where each of the offsets given to `anonymize_pii` ended up in `text`
+    offsets: List[int]
+
+
+def anonymize_pii(text: str, offsets: Sequence[int] = ()) -> Optional[AnonymizedText]:
+    """
+    `text` with its PII replaced by the entity types, or None if it has none.
+
+    `offsets` are sorted offsets into `text`. No PII is found across them.
+    """
+    boundaries = list(shard_boundaries(text, offsets))
+    shards = [text[start:end] for start, end in zip(boundaries, boundaries[1:])]
+
+    analyzer = BatchAnalyzerEngine(_get_analyzer())
+    # TODO: support other languages
+    shard_results = analyzer.analyze_iterator(
+        shards,
+        language="en",
+        batch_size=PII_BATCH_SIZE,
+        n_process=min(settings.pii_processes, len(shards) // PII_BATCH_SIZE) or 1,
+    )
+    if not any(shard_results):
+        return None
+
+    anonymizer = _get_anonymizer()
+    anonymized_shards = [
+        (
+            anonymizer.anonymize(text=shard, analyzer_results=results).text  # type: ignore[arg-type]
+            if results
+            else shard
+        )
+        for shard, results in zip(shards, shard_results)
+    ]
+    anonymized_text = "".join(anonymized_shards)
+    if anonymized_text == text:
+        return None
+
+    anonymized_starts = [0]
+    for shard in anonymized_shards:
+        anonymized_starts.append(anonymized_starts[-1] + len(shard))
+    return AnonymizedText(
+        anonymized_text,
+        [
+            anonymized_starts[bisect.bisect_left(boundaries, offset)]
+            for offset in offsets
+        ],
+    )
+
+
+def shard_boundaries(text: str, offsets: Sequence[int] = ()) -> Iterator[int]:
+    """
+    Start of each shard of `text`, then its end.
+
+    Every one of `offsets` is a boundary; between them, shards end after the last sentence end,
+    or failing that the last whitespace, in the second half of PII_SHARD_CHARS.
+    """
+    yield 0
+    start = 0
+    for end in [*offsets, len(text)]:
+        while end - start > PII_SHARD_CHARS:
+            start = _shard_end(text, start)
+            yield start
+        if end > start:
+            yield end
+            start = end
+
+
+def _shard_end(text: str, start: int) -> int:
+    window_start = start + PII_SHARD_CHARS // 2
+    window_end = start + PII_SHARD_CHARS
+    sentence_end = None
+    for sentence_end in _SENTENCE_END.finditer(text, window_start, window_end):
+        pass
+    if sentence_end is not None:
+        return sentence_end.end()
+    whitespace = text.rfind(" ", window_start, window_end)
+    return whitespace + 1 if whitespace != -1 else window_end
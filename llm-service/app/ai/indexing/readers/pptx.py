@@ -37,11 +37,11 @@
 #
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from llama_index.readers.file import PptxReader as LlamaIndexPptxReader
 
-from .base_reader import BaseReader, ChunksResult
+from .base_reader import BaseReader, ParsedDocument, ParsedSegment
 
 
 class PptxReader(BaseReader):
@@ -49,26 +49,21 @@ class PptxReader(BaseReader):
         super().__init__(*args, **kwargs)
         self.inner = LlamaIndexPptxReader()
 
-    def load_chunks(self, file_path: Path) -> ChunksResult:
-        # TODO: This loop makes a lot of function calls;
-        #       if it's slow, we should try .pdf.PageTracker which consolidates contents to avoid that
-        ret = ChunksResult()
-        for i, document in enumerate(self.inner.load_data(file_path)):
-            document.id_ = self.document_id
-
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        # Each slide is scanned and chunked on its own, so chunks are yielded slide by slide.
+        for document in self.inner.load_data(file_path):
             document_text = document.text
 
             secrets = self._block_secrets([document_text])
             if secrets is not None:
-                return ChunksResult(secret_types=secrets)
+                parsed.secret_types = secrets
+                return
 
-            anonymized_text = self._anonymize_pii(document_text)
+            anonymized_text = self._anonymize_pii(document_text, parsed)
             if anonymized_text is not None:
-                ret.pii_found = True
+                parsed.pii_found = True
                 document_text = anonymized_text
 
-            document.set_content(document_text)
-
-            self._add_document_metadata(document, file_path)
-            ret.chunks.extend(self._chunks_in_document(document))
-        return ret
+            yield ParsedSegment(document_text, metadata=document.metadata)
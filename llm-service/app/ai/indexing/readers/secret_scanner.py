@@ -0,0 +1,102 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+Scans text for secrets with detect-secrets, in memory.
+
+This does what `SecretsCollection.scan_files` does for a file, without writing one: the text
+goes through detect-secrets' file transformers as an in-memory buffer, and then each of its
+lines through the plugins and filters. The plugins are loaded once per process, so reader
+workers each pay for that once.
+"""
+
+import functools
+import io
+from typing import Iterable, Iterator, List, Optional, Set
+
+from detect_secrets.core.plugins.util import get_mapping_from_secret_type_to_class
+from detect_secrets.core.scan import _process_line_based_plugins
+from detect_secrets.settings import get_settings
+from detect_secrets.transformers import get_transformed_file
+
+# Only the extension matters to detect-secrets: it picks the transformers and filters
+SCANNED_FILE_NAME = "document.txt"
+
+
+@functools.cache
+def _configure_plugins() -> None:
+    """Enables every plugin, as `detect_secrets.settings.default_settings` does, for good."""
+    plugin_types: Iterable[type] = get_mapping_from_secret_type_to_class().values()
+    get_settings().configure_plugins(
+        [{"name": plugin_type.__name__} for plugin_type in plugin_types]
+    )
+
+
+def find_secrets(texts: Iterable[str]) -> Optional[Set[str]]:
+    """
+    The types of secret on the first line of `texts` with any, or None if there are none.
+
+    Scanning stops at that line: a secret blocks the whole document, so the rest isn't needed.
+    """
+    _configure_plugins()
+    for text in texts:
+        for lines in _transformed_lines(text):
+            secret_types: Set[str] = set()
+            secret_line: Optional[int] = None
+            for secret in _process_line_based_plugins(
+                lines=list(enumerate(lines, start=1)), filename=SCANNED_FILE_NAME
+            ):
+                if secret_line is not None and secret.line_number != secret_line:
+                    break
+                secret_line = secret.line_number
+                secret_types.add(secret.type)
+            if secret_types:
+                return secret_types
+    return None
+
+
+def _transformed_lines(text: str) -> Iterator[List[str]]:
+    """The lines `detect_secrets.core.scan.scan_file` would scan if `text` were a file."""
+    buffer = io.StringIO(text)
+    buffer.name = SCANNED_FILE_NAME
+    lines = get_transformed_file(buffer)  # type: ignore[arg-type]
+    yield lines or text.splitlines(keepends=True)
+
+    # Like detect-secrets, the over-eager transformers only get a look if nothing was found
+    lines = get_transformed_file(buffer, use_eager_transformers=True)  # type: ignore[arg-type]
+    if lines:
+        yield lines
@@ -37,31 +37,27 @@
 #
 
 from pathlib import Path
+from typing import Iterator
 
-from llama_index.core.schema import Document
-
-from .base_reader import BaseReader, ChunksResult
+from .base_reader import BaseReader, ParsedDocument, ParsedSegment
 
 
 class SimpleFileReader(BaseReader):
-    def load_chunks(self, file_path: Path) -> ChunksResult:
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
 
         with open(file_path, "r") as f:
             content = f.read()
 
         secrets = self._block_secrets([content])
         if secrets is not None:
-            return ChunksResult(secret_types=secrets)
+            parsed.secret_types = secrets
+            return
 
-        ret = ChunksResult()
-        anonymized_text = self._anonymize_pii(content)
+        anonymized_text = self._anonymize_pii(content, parsed)
         if anonymized_text is not None:
-            ret.pii_found = True
+            parsed.pii_found = True
             content = anonymized_text
 
-        document = Document(text=content)
-        document.id_ = self.document_id
-        self._add_document_metadata(document, file_path)
-
-        ret.chunks = self._chunks_in_document(document)
-        return ret
+        yield ParsedSegment(content)
@@ -0,0 +1,227 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import itertools
+import json
+import logging
+import math
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from llama_index.core.utils import get_tokenizer
+
+from ....exceptions import DocumentParseError
+from .base_reader import BaseReader, ParsedDocument, ParsedSegment
+
+logger = logging.getLogger(__name__)
+
+# Rows scanned for secrets and PII together
+ROW_BATCH_SIZE = 1000
+
+# A row's values by column name, and its metadata: its `row_number`, and its `sheet_name` if the
+# document has sheets
+Row = Tuple[Dict[str, Any], Dict[str, Any]]
+
+T = TypeVar("T")
+
+
+class TabularReader(BaseReader):
+    """
+    Base for readers of tables, that make chunks of rows.
+
+    By default each row is a chunk of its values as JSON. With `rows_per_chunk` or
+    `tokens_per_chunk` in the reader config, consecutive rows of a sheet are packed into a chunk
+    as a table with a header row, and the chunk records the range of rows it holds.
+    """
+
+    config_fields = BaseReader.config_fields + (
+        "rows_per_chunk",
+        "tokens_per_chunk",
+        "columns",
+    )
+
+    def _row_segments(
+        self, rows: Iterable[Row], parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        rows = self._project(rows)
+        if self.config.rows_per_chunk == 1:
+            row_texts = (
+                (json.dumps(row, sort_keys=True), {**metadata, "chunk_format": "json"})
+                for row, metadata in rows
+            )
+            for text, metadata in self._scan_rows(row_texts, parsed):
+                yield ParsedSegment(text, metadata=metadata, split=False)
+            return
+
+        table_rows = (
+            (_table_line(row.values()), (tuple(row), metadata))
+            for row, metadata in rows
+        )
+        yield from self._row_group_segments(self._scan_rows(table_rows, parsed))
+
+    def _project(self, rows: Iterable[Row]) -> Iterator[Row]:
+        columns = self.config.columns
+        if columns is None:
+            yield from rows
+            return
+        found_rows = False
+        projected_rows = False
+        for row, metadata in rows:
+            found_rows = True
+            projected = {column: row[column] for column in columns if column in row}
+            if projected:
+                projected_rows = True
+                yield projected, metadata
+        if found_rows and not projected_rows:
+            # Most likely a misspelled column, which would otherwise index the document as empty
+            raise DocumentParseError(
+                f"None of the columns {', '.join(columns)} are in the document"
+            )
+
+    def _row_group_segments(
+        self, rows: Iterable[Tuple[str, Tuple[Tuple[str, ...], Dict[str, Any]]]]
+    ) -> Iterator[ParsedSegment]:
+        """Packs consecutive rows with the same sheet and columns into table segments."""
+        max_rows = self.config.rows_per_chunk or math.inf
+        max_tokens = self.config.tokens_per_chunk or math.inf
+        # Rows are only tokenized to keep chunks within a token budget
+        tokenizer = get_tokenizer() if self.config.tokens_per_chunk else None
+
+        group: List[str] = []
+        group_columns: Tuple[str, ...] = ()
+        group_metadata: List[Dict[str, Any]] = []
+        group_tokens = 0
+
+        def group_segment() -> ParsedSegment:
+            header = _table_line(group_columns)
+            separator = _table_line(["---"] * len(group_columns))
+            metadata = {
+                key: value
+                for key, value in group_metadata[0].items()
+                if key != "row_number"
+            }
+            metadata["row_start"] = group_metadata[0]["row_number"]
+            metadata["row_end"] = group_metadata[-1]["row_number"]
+            metadata["chunk_format"] = "table"
+            return ParsedSegment(
+                "\n".join([header, separator, *group]), metadata=metadata, split=False
+            )
+
+        for text, (columns, metadata) in rows:
+            row_tokens = len(tokenizer(text)) + 1 if tokenizer else 0
+            if group and (
+                columns != group_columns
+                or metadata.get("sheet_name") != group_metadata[0].get("sheet_name")
+                or len(group) >= max_rows
+                or group_tokens + row_tokens > max_tokens
+            ):
+                yield group_segment()
+                group = []
+                group_metadata = []
+            if not group:
+                group_columns = columns
+                # The header and separator lines are repeated in every chunk
+                group_tokens = (
+                    2 * len(tokenizer(_table_line(columns))) + 2 if tokenizer else 0
+                )
+            group.append(text)
+            group_metadata.append(metadata)
+            group_tokens += row_tokens
+
+        if group:
+            yield group_segment()
+
+    def _scan_rows(
+        self, rows: Iterable[Tuple[str, T]], parsed: ParsedDocument
+    ) -> Iterator[Tuple[str, T]]:
+        """
+        Rows, given as their text and anything else, with secrets and PII handled a batch at a time.
+
+        Only a batch of rows is held at once: each batch is scanned for secrets and PII before
+        its rows are yielded, and a secret stops the whole document.
+        """
+        row_iterator = iter(rows)
+        while batch := list(itertools.islice(row_iterator, ROW_BATCH_SIZE)):
+            texts = [text for text, _ in batch]
+
+            secrets = self._block_secrets(["\n".join(texts)])
+            if secrets is not None:
+                parsed.secret_types = secrets
+                return
+
+            anonymized_texts = self._anonymize_rows(texts, parsed)
+            if anonymized_texts is not None:
+                parsed.pii_found = True
+                texts = anonymized_texts
+
+            for text, (_, extra) in zip(texts, batch):
+                yield text, extra
+
+    def _anonymize_rows(
+        self, texts: List[str], parsed: ParsedDocument
+    ) -> Optional[List[str]]:
+        row_starts = list(
+            itertools.accumulate((len(text) + 1 for text in texts[:-1]), initial=0)
+        )
+        anonymized = self._anonymize_pii_keeping_offsets(
+            "\n".join(texts), row_starts, parsed
+        )
+        if anonymized is None:
+            return None
+        row_ends = [*anonymized.offsets[1:], len(anonymized.text)]
+        return [
+            anonymized.text[start:end].removesuffix("\n")
+            for start, end in zip(anonymized.offsets, row_ends)
+        ]
+
+
+def _table_line(values: Iterable[Any]) -> str:
+    return "| " + " | ".join(_cell_text(value) for value in values) + " |"
+
+
+def _cell_text(value: Any) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value).replace("|", "\\|").replace("\r", " ").replace("\n", " ")
@@ -0,0 +1,266 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+A llama-index key-value store backed by SQLite, for the summary docstores and index stores.
+
+Unlike the JSON stores, which rewrite every document on each persist, writes here are
+per-key upserts, and `transaction` makes a batch of them atomic, so a crash can't leave a
+half-written store behind.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from llama_index.core.storage.docstore.types import (
+    DEFAULT_PERSIST_FNAME as DEFAULT_DOC_STORE_FILENAME,
+)
+from llama_index.core.storage.index_store.types import (
+    DEFAULT_PERSIST_FNAME as DEFAULT_INDEX_STORE_FILENAME,
+)
+from llama_index.core.storage.kvstore.types import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_COLLECTION,
+    BaseKVStore,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILENAME = "summary_store.sqlite3"
+
+JSON_STORE_FILENAMES = (DEFAULT_DOC_STORE_FILENAME, DEFAULT_INDEX_STORE_FILENAME)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (collection, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class _ThreadConnections(threading.local):
+    def __init__(self) -> None:
+        # path -> (inode of the database file, connection)
+        self.connections: dict[str, tuple[int, sqlite3.Connection]] = {}
+        self.depths: dict[str, int] = {}
+
+
+# SQLite connections can't be shared between threads, so each thread gets its own, and
+# every store on the same path in that thread shares it: that's what lets `transaction`
+# cover writes made through the docstore and the index store alike.
+_local = _ThreadConnections()
+
+
+class SqliteKVStore(BaseKVStore):
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str) -> "SqliteKVStore":
+        return cls(os.path.join(persist_dir, DEFAULT_FILENAME))
+
+    def _connection(self, create: bool = True) -> Optional[sqlite3.Connection]:
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            inode = None
+        cached = _local.connections.get(self.path)
+        if cached is not None:
+            cached_inode, connection = cached
+            if cached_inode == inode:
+                return connection
+            # the database was deleted (and maybe recreated) under us
+            connection.close()
+            del _local.connections[self.path]
+            _local.depths.pop(self.path, None)
+        if inode is None and not create:
+            return None
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # with WAL, this only gives up durability of the last commits on power loss
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        _local.connections[self.path] = (os.stat(self.path).st_ino, connection)
+        return connection
+
+    def _writer(self) -> sqlite3.Connection:
+        connection = self._connection()
+        assert connection is not None
+        return connection
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[None]:
+        """Makes every write to this database from the current thread atomic; may be nested."""
+        connection = self._writer()
+        depth = _local.depths.get(self.path, 0)
+        if depth == 0:
+            connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        _local.depths[self.path] = depth + 1
+        try:
+            yield
+        except BaseException:
+            _local.depths[self.path] = depth
+            if depth == 0:
+                connection.execute("ROLLBACK")
+            raise
+        _local.depths[self.path] = depth
+        if depth == 0:
+            connection.execute("COMMIT")
+
+    def put(
+        self, key: str, val: dict[str, Any], collection: str = DEFAULT_COLLECTION
+    ) -> None:
+        self.put_all([(key, val)], collection=collection)
+
+    async def aput(
+        self, key: str, val: dict[str, Any], collection: str = DEFAULT_COLLECTION
+    ) -> None:
+        self.put(key, val, collection=collection)
+
+    def put_all(
+        self,
+        kv_pairs: List[Tuple[str, dict[str, Any]]],
+        collection: str = DEFAULT_COLLECTION,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        with self.transaction():
+            self._writer().executemany(
+                "INSERT INTO kv (collection, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (collection, key) DO UPDATE SET value = excluded.value",
+                [(collection, key, json.dumps(val)) for key, val in kv_pairs],
+            )
+
+    async def aput_all(
+        self,
+        kv_pairs: List[Tuple[str, dict[str, Any]]],
+        collection: str = DEFAULT_COLLECTION,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.put_all(kv_pairs, collection=collection, batch_size=batch_size)
+
+    def get(
+        self, key: str, collection: str = DEFAULT_COLLECTION
+    ) -> Optional[dict[str, Any]]:
+        connection = self._connection(create=False)
+        if connection is None:
+            return None
+        row = connection.execute(
+            "SELECT value FROM kv WHERE collection = ? AND key = ?", (collection, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def aget(
+        self, key: str, collection: str = DEFAULT_COLLECTION
+    ) -> Optional[dict[str, Any]]:
+        return self.get(key, collection=collection)
+
+    def get_all(
+        self, collection: str = DEFAULT_COLLECTION
+    ) -> Dict[str, dict[str, Any]]:
+        connection = self._connection(create=False)
+        if connection is None:
+            return {}
+        rows = connection.execute(
+            "SELECT key, value FROM kv WHERE collection = ?", (collection,)
+        )
+        return {key: json.loads(value) for key, value in rows}
+
+    async def aget_all(
+        self, collection: str = DEFAULT_COLLECTION
+    ) -> Dict[str, dict[str, Any]]:
+        return self.get_all(collection=collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        connection = self._connection(create=False)
+        if connection is None:
+            return False
+        cursor = connection.execute(
+            "DELETE FROM kv WHERE collection = ? AND key = ?", (collection, key)
+        )
+        return cursor.rowcount > 0
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection=collection)
+
+    def migrate_from_json(self, persist_dir: str) -> int:
+        """
+        Imports the JSON docstore and index store in `persist_dir`, unless already done.
+
+        Returns the number of entries imported. The JSON files are left in place.
+        """
+        with self.transaction(immediate=True):
+            connection = self._writer()
+            if connection.execute(
+                "SELECT 1 FROM meta WHERE key = 'migrated_from_json'"
+            ).fetchone():
+                return 0
+            imported = 0
+            for filename in JSON_STORE_FILENAMES:
+                try:
+                    with open(os.path.join(persist_dir, filename)) as f:
+                        collections: dict[str, dict[str, dict[str, Any]]] = json.load(f)
+                except FileNotFoundError:
+                    continue
+                for collection, values in collections.items():
+                    self.put_all(list(values.items()), collection=collection)
+                    imported += len(values)
+            connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (str(imported),),
+            )
+        logger.info("Imported %s summary store entries from %s", imported, persist_dir)
+        return imported
+
+
+def has_json_store(persist_dir: str) -> bool:
+    return any(
+        os.path.exists(os.path.join(persist_dir, filename))
+        for filename in JSON_STORE_FILENAMES
+    )
@@ -35,14 +35,17 @@
 #  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
 #  DATA.
 #
+import contextlib
 import logging
 import os
 import random
 import shutil
+from collections import defaultdict
+from dataclasses import dataclass
 from pathlib import Path
-from threading import Lock
-from typing import Any, Dict, Optional, cast, List
+from typing import Any, ContextManager, Dict, Optional, cast, List
 
+import numpy as np
 from llama_index.core import (
     DocumentSummaryIndex,
     StorageContext,
@@ -57,7 +60,6 @@ from llama_index.core.llms import LLM
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.response_synthesizers import ResponseMode
 from llama_index.core.schema import (
-    Document,
     NodeRelationship,
     TextNode,
     RelatedNodeInfo,
@@ -67,17 +69,31 @@ from llama_index.core.storage.index_store.keyval_index_store import KVIndexStore
 from llama_index.core.vector_stores import SimpleVectorStore
 from llama_index.core.vector_stores.types import BasePydanticVectorStore
 from llama_index.storage.kvstore.s3 import S3DBKVStore
-from qdrant_client.http.exceptions import UnexpectedResponse
 
 from app.services import models
+from app.services.caching import TtlCache
 from app.ai.vector_stores.vector_store import VectorStore
 from .base import BaseTextIndexer
-from .readers.base_reader import ReaderConfig, ChunksResult
+from .embedding_cache import embed_with_cache, model_key
+from .node_sampling import (
+    candidate_block_starts,
+    random_block_starts,
+    representative_blocks,
+)
+from .sqlite_kvstore import SqliteKVStore, has_json_store
+from .summary_locks import read_lock, write_lock
+from .summary_tree import (
+    SummaryTree,
+    SummaryTreeStore,
+    refresh_summary_tree,
+    summary_refresher,
+)
+from .readers.base_reader import ChunksResult, ParsedDocument, ReaderConfig
 from .readers.csv import CSVReader
 from .readers.excel import ExcelReader
 from ..vector_stores.vector_store_factory import VectorStoreFactory
 from ..vector_stores.qdrant import QdrantVectorStore
-from ...config import settings, ModelSource
+from ...config import settings, ModelSource, SummarySamplingMode
 from ...services.metadata_apis import data_sources_metadata_api
 from ...services.models.providers import get_provider_class
 
@@ -85,11 +101,54 @@ logger = logging.getLogger(__name__)
 
 SUMMARY_PROMPT = "Summarize the contents into less than 100 words."
 
-# Since we don't use anything fancy to store the summaries, it's possible that two threads
-# try to do a write operation at the same time and we end up with a race condition.
-# Basically filesystems aren't ACID, so don't pretend that they are.
-# We could have a lock per data source, but this is simpler.
-_write_lock = Lock()
+# Since we don't use anything fancy to store the summaries, concurrent writers would race.
+# Basically filesystems aren't ACID, so don't pretend that they are: every persist dir
+# (one per data source, plus the legacy global one) and every summary tree is guarded by
+# a reader/writer lock that is shared with the other worker processes; see `summary_locks`.
+# Always take a data source's lock before the global or tree one.
+
+
+@dataclass(frozen=True)
+class _LoadedIndex:
+    version: tuple[Any, ...]
+    index: DocumentSummaryIndex
+
+
+# Read-only copies of loaded summary indices, so queries don't deserialize the whole
+# docstore each time. Writers always load their own copy under the write lock and bump
+# the generation of the persist dir, which makes the next reader reload.
+# Another process writing to S3 can't bump our generation, so the TTL bounds how long
+# its changes go unseen; locally, the files' mtimes catch them.
+_loaded_indices: TtlCache[tuple[str, str, bool], _LoadedIndex] = TtlCache(
+    lambda: settings.summary_index_cache_ttl_seconds, maxsize=32
+)
+_generations: defaultdict[str, int] = defaultdict(int)
+
+# Data source summary trees, keyed by their lock name; see `_loaded_indices`.
+_loaded_trees: TtlCache[str, SummaryTree] = TtlCache(
+    lambda: settings.summary_index_cache_ttl_seconds, maxsize=256
+)
+
+
+def _index_version(persist_dir: str) -> tuple[Any, ...]:
+    if settings.is_s3_summary_storage_configured():
+        return (_generations[persist_dir],)
+    try:
+        with os.scandir(persist_dir) as entries:
+            mtimes = sorted(
+                (entry.name, entry.stat().st_mtime_ns)
+                for entry in entries
+                # SQLite's shared memory file changes on reads, too
+                if entry.is_file() and not entry.name.endswith("-shm")
+            )
+    except FileNotFoundError:
+        mtimes = []
+    return _generations[persist_dir], tuple(mtimes)
+
+
+def _mark_persisted(persist_dir: str) -> None:
+    """Called with the write lock of `persist_dir` held, after writing to it."""
+    _generations[persist_dir] += 1
 
 
 class SummaryIndexer(BaseTextIndexer):
@@ -114,9 +173,13 @@ class SummaryIndexer(BaseTextIndexer):
         )
 
     def __persist_dir(self) -> str:
+        return SummaryIndexer.__data_source_persist_dir(self.data_source_id)
+
+    @staticmethod
+    def __data_source_persist_dir(data_source_id: int) -> str:
         if settings.is_s3_summary_storage_configured():
-            return f"summaries/{self.data_source_id}"
-        return SummaryIndexer.__database_dir(self.data_source_id)
+            return f"summaries/{data_source_id}"
+        return SummaryIndexer.__database_dir(data_source_id)
 
     @staticmethod
     def __persist_root_dir() -> str:
@@ -136,15 +199,6 @@ class SummaryIndexer(BaseTextIndexer):
         data_source_id: int,
         embed_summaries: bool = True,
     ) -> Dict[str, Any]:
-        prompt_helper: Optional[PromptHelper] = None
-        model_source: ModelSource = get_provider_class().get_model_source()
-        if model_source == "CAII":
-            # if we're using CAII, let's be conservative and use a small context window to account for mistral's small context
-            prompt_helper = PromptHelper(context_window=3000)
-        else:
-            prompt_helper = PromptHelper(
-                context_window=min(llm.metadata.context_window, 10000)
-            )
         return {
             "llm": llm,
             "response_synthesizer": get_response_synthesizer(
@@ -152,7 +206,7 @@ class SummaryIndexer(BaseTextIndexer):
                 llm=llm,
                 use_async=True,
                 verbose=True,
-                prompt_helper=prompt_helper,
+                prompt_helper=SummaryIndexer.__prompt_helper(llm),
             ),
             "show_progress": True,
             "embed_model": embedding_model,
@@ -161,9 +215,20 @@ class SummaryIndexer(BaseTextIndexer):
             "data_source_id": data_source_id,
         }
 
+    @staticmethod
+    def __prompt_helper(llm: LLM) -> PromptHelper:
+        model_source: ModelSource = get_provider_class().get_model_source()
+        if model_source == "CAII":
+            # if we're using CAII, let's be conservative and use a small context window to account for mistral's small context
+            return PromptHelper(context_window=3000)
+        return PromptHelper(context_window=min(llm.metadata.context_window, 10000))
+
     def __init_summary_store(self, persist_dir: str) -> DocumentSummaryIndex:
         storage_context: Optional[StorageContext] = None
-        if settings.is_s3_summary_storage_configured():
+        if (
+            settings.is_s3_summary_storage_configured()
+            or settings.is_sqlite_summary_storage_configured()
+        ):
             storage_context = self.create_storage_context(
                 persist_dir, SimpleVectorStore()
             )
@@ -188,6 +253,37 @@ class SummaryIndexer(BaseTextIndexer):
             doc_summary_index = self.__init_summary_store(persist_dir)
             return doc_summary_index
 
+    def __loaded_summary_indexer(
+        self, persist_dir: str, embed_summaries: bool = True
+    ) -> DocumentSummaryIndex:
+        """
+        Cached, read-only version of `__summary_indexer`.
+
+        The returned index is shared across requests, so it must not be modified.
+        """
+        key = (persist_dir, model_key(self.embedding_model), embed_summaries)
+        loaded = _loaded_indices.get(key)
+        if loaded and loaded.version == _index_version(persist_dir):
+            return loaded.index
+        index: Optional[DocumentSummaryIndex] = None
+        with read_lock(persist_dir):
+            try:
+                index = SummaryIndexer.__summary_indexer_with_config(
+                    persist_dir=persist_dir,
+                    index_configuration=self.__index_kwargs(embed_summaries),
+                    summary_vector_store=self.summary_vector_store,
+                )
+                version = _index_version(persist_dir)
+            except (ValueError, FileNotFoundError):
+                pass
+        if index is None:
+            # creating the empty store is a write
+            with write_lock(persist_dir):
+                index = self.__summary_indexer(persist_dir, embed_summaries)
+                version = _index_version(persist_dir)
+        _loaded_indices.set(key, _LoadedIndex(version, index))
+        return index
+
     @staticmethod
     def __summary_indexer_with_config(
         persist_dir: str,
@@ -218,6 +314,12 @@ class SummaryIndexer(BaseTextIndexer):
             )
             index_store = KVIndexStore(s3_store)
             doc_store = KVDocumentStore(s3_store)
+        elif settings.is_sqlite_summary_storage_configured():
+            sqlite_store = SqliteKVStore.from_persist_dir(persist_dir)
+            if not os.path.exists(sqlite_store.path) and has_json_store(persist_dir):
+                sqlite_store.migrate_from_json(persist_dir)
+            index_store = KVIndexStore(sqlite_store)
+            doc_store = KVDocumentStore(sqlite_store)
         else:
             index_store = None
             doc_store = None
@@ -229,8 +331,25 @@ class SummaryIndexer(BaseTextIndexer):
             vector_store=vector_store,
         )
 
+    @staticmethod
+    def __transaction(persist_dir: str) -> ContextManager[None]:
+        """Makes the writes to the summary store in `persist_dir` atomic, where it supports that."""
+        if settings.is_sqlite_summary_storage_configured():
+            return SqliteKVStore.from_persist_dir(persist_dir).transaction()
+        return contextlib.nullcontext()
+
     @classmethod
     def get_all_data_source_summaries(cls) -> dict[str, str]:
+        results = cls.__legacy_data_source_summaries()
+        for data_source_id, tree in SummaryTreeStore().all().items():
+            if tree.summary is not None:
+                results[str(data_source_id)] = tree.summary
+            else:
+                results.pop(str(data_source_id), None)
+        return results
+
+    @classmethod
+    def __legacy_data_source_summaries(cls) -> dict[str, str]:
         root_dir = cls.__persist_root_dir()
         try:
             storage_context = SummaryIndexer.create_storage_context(
@@ -274,23 +393,19 @@ class SummaryIndexer(BaseTextIndexer):
         return results
 
     def index_file(self, file_path: Path, document_id: str) -> None:
-        logger.debug(f"Creating summary for file {file_path}")
-
-        reader_cls = self._get_reader_class(file_path)
+        logger.debug(f"Parsing file: {file_path}")
+        self.index_parsed_document(self.parse_file(file_path, document_id), document_id)
 
-        reader = reader_cls(
-            splitter=self.splitter,
-            document_id=document_id,
-            data_source_id=self.data_source_id,
-            config=self.reader_config,
-        )
+    def index_parsed_document(self, parsed: ParsedDocument, document_id: str) -> None:
+        file_path = parsed.file_name
+        logger.debug(f"Creating summary for file {file_path}")
 
-        logger.debug(f"Parsing file: {file_path}")
+        reader = self._get_reader(Path(file_path), document_id)
 
-        chunks: ChunksResult = reader.load_chunks(file_path)
+        chunks: ChunksResult = reader.chunk(parsed)
         nodes: List[TextNode] = chunks.chunks
 
-        is_tabular_document = reader_cls in (ExcelReader, CSVReader)
+        is_tabular_document = isinstance(reader, (ExcelReader, CSVReader))
         use_qdrant_safe_batches = isinstance(
             self.summary_vector_store, QdrantVectorStore
         )
@@ -301,7 +416,13 @@ class SummaryIndexer(BaseTextIndexer):
             max_samples = 1000
         sample_block_size = 20
 
-        nodes = self.sample_nodes(nodes, max_samples, sample_block_size)
+        nodes = self.sample_nodes(
+            nodes,
+            max_samples,
+            sample_block_size,
+            seed=settings.summary_sampling_seed,
+            mode=settings.summary_sampling_mode,
+        )
         logger.debug(
             "Using %s nodes from %s total nodes (tabular=%s, qdrant_safe=%s)",
             len(nodes),
@@ -314,8 +435,8 @@ class SummaryIndexer(BaseTextIndexer):
             logger.warning(f"No chunks found for file {file_path}")
             return
 
-        with _write_lock:
-            persist_dir = self.__persist_dir()
+        persist_dir = self.__persist_dir()
+        with write_lock(persist_dir):
             summary_store: DocumentSummaryIndex = self.__summary_indexer(persist_dir)
             if self.summary_vector_store.flat_metadata:
                 nodes = [self._flatten_metadata(node) for node in nodes]
@@ -324,10 +445,12 @@ class SummaryIndexer(BaseTextIndexer):
                 batch_size = 256
             else:
                 batch_size = 1000
-            self._insert_summary_nodes(summary_store, nodes, batch_size=batch_size)
-            summary_store.storage_context.persist(persist_dir=persist_dir)
+            with self.__transaction(persist_dir):
+                self._insert_summary_nodes(summary_store, nodes, batch_size=batch_size)
+                summary_store.storage_context.persist(persist_dir=persist_dir)
+            _mark_persisted(persist_dir)
 
-            self.__update_global_summary_store(summary_store, added_node_id=document_id)
+            self.__update_summary_tree(summary_store, added_document_id=document_id)
 
         logger.debug(f"Summary for file {file_path} created")
 
@@ -343,79 +466,59 @@ class SummaryIndexer(BaseTextIndexer):
                 continue
             summary_store.insert_nodes(batch)
 
-    def __update_global_summary_store(
+    def __update_summary_tree(
         self,
         summary_store: DocumentSummaryIndex,
-        added_node_id: Optional[str] = None,
-        deleted_node_id: Optional[str] = None,
+        added_document_id: Optional[str] = None,
+        deleted_document_id: Optional[str] = None,
     ) -> None:
-        # Llama index doesn't seem to support updating the summary when we add more documents.
-        # So what we do instead is re-load all the summaries for the documents already associated with the data source
-        # and re-index it with the addition/removal.
-        global_persist_dir = self.__persist_root_dir()
-        global_summary_store = self.__summary_indexer(
-            global_persist_dir,
-            embed_summaries=False,
+        """Called with the data source's write lock held, after updating `summary_store`."""
+        store = SummaryTreeStore()
+        lock_name = store.lock_name(self.data_source_id)
+        with write_lock(lock_name):
+            tree = store.get(self.data_source_id)
+            if tree is None:
+                # First change since the tree was introduced: build it from every document.
+                tree = SummaryTree()
+                for document_id in summary_store.index_struct.doc_id_to_summary_id:
+                    tree.upsert_document(
+                        document_id, summary_store.get_document_summary(document_id)
+                    )
+            elif added_document_id:
+                tree.upsert_document(
+                    added_document_id,
+                    summary_store.get_document_summary(added_document_id),
+                )
+            if deleted_document_id:
+                tree.delete_document(deleted_document_id)
+            store.put(self.data_source_id, tree)
+            _loaded_trees.invalidate(lock_name)
+        summary_refresher().schedule(
+            self.data_source_id, lambda: self.__refresh_summary_tree(store)
         )
-        data_source_node = Document(doc_id=str(self.data_source_id))
 
-        summary_id = global_summary_store.index_struct.doc_id_to_summary_id.get(
-            str(self.data_source_id)
+    def __refresh_summary_tree(self, store: SummaryTreeStore) -> None:
+        synthesizer = get_response_synthesizer(
+            response_mode=ResponseMode.TREE_SUMMARIZE,
+            llm=self.llm,
+            prompt_helper=SummaryIndexer.__prompt_helper(self.llm),
         )
 
-        new_nodes = []
-        if summary_id:
-            document_ids = global_summary_store.index_struct.summary_id_to_node_ids.get(
-                summary_id
-            )
-            if document_ids:
-                # Reload the summary for each existing node id, which correspond to full documents
-                summaries = [
-                    summary_store.get_document_summary(document_id)
-                    for document_id in document_ids
-                ]
-
-                new_nodes = [
-                    Document(
-                        doc_id=document_id,
-                        text=document_summary,
-                        relationships={
-                            NodeRelationship.SOURCE: data_source_node.as_related_node_info()
-                        },
-                    )
-                    for document_id, document_summary in zip(document_ids, summaries)
-                ]
-
-        if added_node_id:
-            new_nodes.append(
-                Document(
-                    doc_id=added_node_id,
-                    text=summary_store.get_document_summary(added_node_id),
-                    relationships={
-                        NodeRelationship.SOURCE: data_source_node.as_related_node_info()
-                    },
-                )
+        def summarize(texts: list[str]) -> str:
+            return str(
+                synthesizer.get_response(query_str=SUMMARY_PROMPT, text_chunks=texts)
             )
 
-        if deleted_node_id:
-            new_nodes = [node for node in new_nodes if node.id_ != deleted_node_id]
-
-        # Delete first so that we don't accumulate trash in the summary store.
-        try:
-            global_summary_store.delete_ref_doc(
-                str(self.data_source_id), delete_from_docstore=True
-            )
-        except (KeyError, UnexpectedResponse):
-            # UnexpectedResponse is raised when the collection doesn't exist, which is fine, since it might be a new index.
-            pass
-        global_summary_store.insert_nodes(new_nodes)
-        global_summary_store.storage_context.persist(persist_dir=global_persist_dir)
+        refresh_summary_tree(store, self.data_source_id, summarize)
+        _loaded_trees.invalidate(store.lock_name(self.data_source_id))
 
     def sample_nodes(
         self,
         nodes: List[TextNode],
         max_number_to_sample: int = 1000,
         sample_block_size: int = 20,
+        seed: Optional[int] = None,
+        mode: SummarySamplingMode = "random",
     ) -> List[TextNode]:
         """
         Sample max_number_to_sample in contiguous blocks of sample_block_size if we have more than max_number_to_sample nodes.
@@ -425,6 +528,9 @@ class SummaryIndexer(BaseTextIndexer):
             nodes: List of TextNode objects to sample from
             max_number_to_sample: max number of nodes to sample
             sample_block_size: how big the contiguous blocks should be
+            seed: makes the random sampling reproducible
+            mode: "random" picks blocks uniformly; "representative" picks blocks whose embeddings
+                are far apart, and may pick fewer blocks if the document repeats itself
 
         Returns:
             A list of sampled TextNode objects, or the original list if it has 1000 or fewer nodes
@@ -435,32 +541,25 @@ class SummaryIndexer(BaseTextIndexer):
         num_blocks = max_number_to_sample // sample_block_size
         block_size = sample_block_size
 
-        # Calculate the maximum valid starting index for a block
-        max_block_start_index = len(nodes) - block_size
-
-        # Randomly select starting indices for blocks, ensuring they're at least block_size apart
-        # to avoid overlapping blocks
-        available_indices = list(range(max_block_start_index + 1))
-        block_start_indices: list[int] = []
-
-        # Try to get num_blocks non-overlapping blocks
-        while len(block_start_indices) < num_blocks and available_indices:
-            # Randomly select an index from available indices
-            if not available_indices:
-                break
-            idx = random.choice(available_indices)
-            block_start_indices.append(idx)
-
-            # Remove this index and all indices that would create overlapping blocks
-            # (i.e., all indices within block_size of the selected index)
-            for i in range(
-                max(0, idx - block_size + 1), min(len(nodes), idx + block_size)
-            ):
-                if i in available_indices:
-                    available_indices.remove(i)
-
-        # Sort the indices to maintain order
-        block_start_indices.sort()
+        if mode == "representative":
+            try:
+                block_start_indices = self.__representative_block_starts(
+                    nodes, block_size, num_blocks
+                )
+                return [
+                    node
+                    for start_idx in block_start_indices
+                    for node in nodes[start_idx : start_idx + block_size]
+                ]
+            except Exception:
+                logger.exception(
+                    "Failed to pick representative blocks, sampling randomly instead"
+                )
+
+        sample = random.sample if seed is None else random.Random(seed).sample
+        block_start_indices = random_block_starts(
+            len(nodes), block_size, num_blocks, sample
+        )
 
         # Extract blocks of block_size contiguous nodes
         sampled_nodes = []
@@ -477,58 +576,100 @@ class SummaryIndexer(BaseTextIndexer):
         else:
             return sampled_nodes
 
+    def __representative_block_starts(
+        self, nodes: List[TextNode], block_size: int, num_blocks: int
+    ) -> list[int]:
+        candidates = candidate_block_starts(len(nodes), block_size)
+        # One embedding per candidate block, of its middle node. These go through the
+        # embedding cache, so chunks the embedding indexer has already seen are free.
+        texts = [nodes[start + block_size // 2].get_content() for start in candidates]
+        embeddings = np.array(embed_with_cache(self.embedding_model, texts))
+        return [candidates[i] for i in representative_blocks(embeddings, num_blocks)]
+
     def get_summary(self, document_id: str) -> Optional[str]:
-        with _write_lock:
-            persist_dir = self.__persist_dir()
-            summary_store = self.__summary_indexer(persist_dir)
-            if document_id not in summary_store.index_struct.doc_id_to_summary_id:
-                return None
-            return summary_store.get_document_summary(document_id)
+        persist_dir = self.__persist_dir()
+        summary_store = self.__loaded_summary_indexer(persist_dir)
+        if document_id not in summary_store.index_struct.doc_id_to_summary_id:
+            return None
+        return summary_store.get_document_summary(document_id)
 
     def get_full_summary(self) -> Optional[str]:
-        with _write_lock:
-            global_persist_dir = self.__persist_root_dir()
-            global_summary_store = self.__summary_indexer(global_persist_dir)
-
-            document_id = str(self.data_source_id)
-            if (
-                document_id
-                not in global_summary_store.index_struct.doc_id_to_summary_id
-            ):
-                return None
-            return global_summary_store.get_document_summary(document_id)
+        store = SummaryTreeStore()
+        tree = self.__loaded_summary_tree(store)
+        if tree is None:
+            return self.__legacy_full_summary()
+        if tree.dirty:
+            refresher = summary_refresher()
+            if tree.summary is None:
+                # Nothing to show yet, so don't make the caller wait out the debounce.
+                refresher.cancel(self.data_source_id)
+                self.__refresh_summary_tree(store)
+                tree = self.__loaded_summary_tree(store)
+            elif not refresher.is_pending(self.data_source_id):
+                # e.g. the process that scheduled the refresh exited before running it
+                refresher.schedule(
+                    self.data_source_id, lambda: self.__refresh_summary_tree(store)
+                )
+        return tree.summary if tree is not None else None
+
+    def __loaded_summary_tree(self, store: SummaryTreeStore) -> Optional[SummaryTree]:
+        lock_name = store.lock_name(self.data_source_id)
+        tree = _loaded_trees.get(lock_name)
+        if tree is None:
+            with read_lock(lock_name):
+                tree = store.get(self.data_source_id)
+            if tree is not None:
+                _loaded_trees.set(lock_name, tree)
+        return tree
+
+    def __legacy_full_summary(self) -> Optional[str]:
+        global_persist_dir = self.__persist_root_dir()
+        global_summary_store = self.__loaded_summary_indexer(global_persist_dir)
+
+        document_id = str(self.data_source_id)
+        if document_id not in global_summary_store.index_struct.doc_id_to_summary_id:
+            return None
+        return global_summary_store.get_document_summary(document_id)
 
     def as_query_engine(self) -> BaseQueryEngine:
         persist_dir = self.__persist_dir()
-        return self.__summary_indexer(persist_dir).as_query_engine(self.llm)
+        return self.__loaded_summary_indexer(persist_dir).as_query_engine(self.llm)
 
     def delete_document(self, document_id: str) -> None:
-        with _write_lock:
-            persist_dir = self.__persist_dir()
+        persist_dir = self.__persist_dir()
+        with write_lock(persist_dir):
             summary_store = self.__summary_indexer(persist_dir)
 
-            self.__update_global_summary_store(
-                summary_store, deleted_node_id=document_id
-            )
-
-            summary_store.delete_ref_doc(document_id, delete_from_docstore=True)
-            summary_store.storage_context.persist(persist_dir=persist_dir)
+            with self.__transaction(persist_dir):
+                summary_store.delete_ref_doc(document_id, delete_from_docstore=True)
+                summary_store.storage_context.persist(persist_dir=persist_dir)
+            _mark_persisted(persist_dir)
             summary_store.vector_store.delete(document_id)
 
+            self.__update_summary_tree(summary_store, deleted_document_id=document_id)
+
     def delete_data_source(self) -> None:
-        with _write_lock:
-            SummaryIndexer.delete_data_source_by_id(self.data_source_id)
+        SummaryIndexer.delete_data_source_by_id(self.data_source_id)
 
     @staticmethod
     def delete_data_source_by_id(data_source_id: int) -> None:
-        with _write_lock:
+        persist_dir = SummaryIndexer.__data_source_persist_dir(data_source_id)
+        with write_lock(persist_dir):
             vector_store = VectorStoreFactory.for_summaries(data_source_id)
             vector_store.delete()
             # TODO: figure out a less explosive way to do this.
             shutil.rmtree(
                 SummaryIndexer.__database_dir(data_source_id), ignore_errors=True
             )
-            global_persist_dir: str = SummaryIndexer.__persist_root_dir()
+            _mark_persisted(persist_dir)
+            summary_refresher().cancel(data_source_id)
+            tree_store = SummaryTreeStore()
+            tree_lock_name = tree_store.lock_name(data_source_id)
+            with write_lock(tree_lock_name):
+                tree_store.delete(data_source_id)
+                _loaded_trees.invalidate(tree_lock_name)
+        global_persist_dir: str = SummaryIndexer.__persist_root_dir()
+        with write_lock(global_persist_dir):
             try:
                 configuration: Dict[str, Any] = SummaryIndexer.__index_configuration(
                     models.LLM.get_noop(),
@@ -551,11 +692,14 @@ class SummaryIndexer(BaseTextIndexer):
                 global_summary_store.storage_context.persist(
                     persist_dir=global_persist_dir
                 )
+                _mark_persisted(global_persist_dir)
             except Exception as e:
                 logger.debug(f"Error deleting data source {data_source_id}: {e}")
 
     @staticmethod
-    def get_summary_indexer(data_source_id: int) -> Optional["SummaryIndexer"]:
+    def get_summary_indexer(
+        data_source_id: int, reader_config: Optional[ReaderConfig] = None
+    ) -> Optional["SummaryIndexer"]:
         datasource = data_sources_metadata_api.get_metadata(data_source_id)
         if not datasource.summarization_model:
             return None
@@ -564,4 +708,5 @@ class SummaryIndexer(BaseTextIndexer):
             splitter=SentenceSplitter(chunk_size=2048),
             embedding_model=models.Embedding.get(datasource.embedding_model),
             llm=models.LLM.get(datasource.summarization_model),
+            reader_config=reader_config,
         )
@@ -0,0 +1,288 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+Locks guarding the persisted summary stores.
+
+Every persist dir gets an in-process reader/writer lock, and a lock shared with the
+other worker processes: an `flock` on a sibling file when the stores are on local disk,
+or a lease object written with conditional puts when they are on S3. S3 has no shared
+read lock, so on S3 only writers exclude each other.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReadWriteLock:
+    """Writer-preferring reader/writer lock; not re-entrant."""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+_locks: dict[str, ReadWriteLock] = {}
+_locks_lock = threading.Lock()
+
+
+def _local_lock(persist_dir: str) -> ReadWriteLock:
+    with _locks_lock:
+        return _locks.setdefault(persist_dir, ReadWriteLock())
+
+
+@contextmanager
+def _file_lock(persist_dir: str, exclusive: bool) -> Iterator[None]:
+    # next to the directory rather than inside it, so deleting the store doesn't drop the lock
+    lock_path = os.path.normpath(persist_dir) + ".lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class S3Lease:
+    """
+    Exclusive lease on an S3 key, shared by every process using the bucket.
+
+    Acquired by creating the key with `If-None-Match: *`; renewed in the background with
+    `If-Match` on our own ETag, so a lost lease is noticed. A lease whose holder stopped
+    renewing it is taken over once it expires.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        ttl_seconds: Optional[float] = None,
+        poll_seconds: float = 1.0,
+        s3_client: Any = None,
+    ) -> None:
+        self.key = key
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else settings.summary_lock_lease_seconds
+        )
+        self.poll_seconds = poll_seconds
+        self._s3 = s3_client or boto3.session.Session().client("s3")
+        self._bucket = settings.document_bucket
+        self._owner = f"{os.getpid()}-{uuid.uuid4()}"
+        self._etag: Optional[str] = None
+        self._stop_renewing = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "S3Lease":
+        self.acquire()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+    def _body(self) -> bytes:
+        return json.dumps(
+            {"owner": self._owner, "expires_at": time.time() + self.ttl_seconds}
+        ).encode("utf-8")
+
+    def acquire(self) -> None:
+        while True:
+            try:
+                response = self._s3.put_object(
+                    Bucket=self._bucket,
+                    Key=self.key,
+                    Body=self._body(),
+                    IfNoneMatch="*",
+                )
+                break
+            except ClientError as e:
+                if not _is_precondition_failure(e):
+                    raise
+            if self._take_over_expired():
+                return
+            time.sleep(self.poll_seconds)
+        self._acquired(response["ETag"])
+
+    def _take_over_expired(self) -> bool:
+        try:
+            current = self._s3.get_object(Bucket=self._bucket, Key=self.key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return False
+            raise
+        lease = json.loads(current["Body"].read())
+        if lease["expires_at"] > time.time():
+            return False
+        logger.warning(
+            "Taking over expired summary store lease %s from %s",
+            self.key,
+            lease["owner"],
+        )
+        try:
+            response = self._s3.put_object(
+                Bucket=self._bucket,
+                Key=self.key,
+                Body=self._body(),
+                IfMatch=current["ETag"],
+            )
+        except ClientError as e:
+            if _is_precondition_failure(e):
+                return False
+            raise
+        self._acquired(response["ETag"])
+        return True
+
+    def _acquired(self, etag: str) -> None:
+        self._etag = etag
+        self._stop_renewing.clear()
+        self._renewer = threading.Thread(
+            target=self._renew, name=f"lease-{self.key}", daemon=True
+        )
+        self._renewer.start()
+
+    def _renew(self) -> None:
+        while not self._stop_renewing.wait(self.ttl_seconds / 3):
+            try:
+                response = self._s3.put_object(
+                    Bucket=self._bucket,
+                    Key=self.key,
+                    Body=self._body(),
+                    IfMatch=self._etag,
+                )
+                self._etag = response["ETag"]
+            except ClientError:
+                logger.exception("Lost summary store lease %s", self.key)
+                return
+
+    def release(self) -> None:
+        self._stop_renewing.set()
+        if self._renewer:
+            self._renewer.join()
+            self._renewer = None
+        try:
+            current = self._s3.get_object(Bucket=self._bucket, Key=self.key)
+            if current["ETag"] == self._etag:
+                self._s3.delete_object(Bucket=self._bucket, Key=self.key)
+        except ClientError:
+            # the lease expires on its own
+            logger.warning(
+                "Failed to release summary store lease %s", self.key, exc_info=True
+            )
+        self._etag = None
+
+
+def _is_precondition_failure(error: ClientError) -> bool:
+    return error.response["Error"]["Code"] in (
+        "PreconditionFailed",
+        "ConditionalRequestConflict",
+    )
+
+
+def _lease_key(persist_dir: str) -> str:
+    key = f"locks/{persist_dir}.lock"
+    if settings.document_bucket_prefix:
+        return f"{settings.document_bucket_prefix}/{key}"
+    return key
+
+
+@contextmanager
+def read_lock(persist_dir: str) -> Iterator[None]:
+    with _local_lock(persist_dir).read():
+        if settings.is_s3_summary_storage_configured():
+            yield
+            return
+        with _file_lock(persist_dir, exclusive=False):
+            yield
+
+
+@contextmanager
+def write_lock(persist_dir: str) -> Iterator[None]:
+    with _local_lock(persist_dir).write():
+        if settings.is_s3_summary_storage_configured():
+            with S3Lease(_lease_key(persist_dir)):
+                yield
+            return
+        with _file_lock(persist_dir, exclusive=True):
+            yield
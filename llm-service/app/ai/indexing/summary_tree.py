@@ -0,0 +1,422 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""
+Incrementally maintained data source summaries.
+
+A data source's summary is the root of a tree whose leaves are its documents' summaries
+and whose inner nodes each summarize at most `FAN_OUT` children. Adding or removing a
+document only marks the path to the root dirty, and a refresh recomputes just the dirty
+nodes, so keeping the summary current costs O(log n) LLM calls per document instead of
+re-summarizing every document.
+
+Refreshes are debounced and run in the background, so a bulk upload triggers one.
+"""
+
+import copy
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from typing import Callable, Optional
+
+from llama_index.storage.kvstore.s3 import S3DBKVStore
+from pydantic import BaseModel, Field
+
+from .summary_locks import read_lock, write_lock
+from ...config import settings
+
+logger = logging.getLogger(__name__)
+
+FAN_OUT = 8
+
+# Continuous uploads keep pushing the debounced refresh back; this bounds how far.
+_MAX_DELAY_FACTOR = 6
+
+Summarize = Callable[[list[str]], str]
+
+
+class SummaryTreeNode(BaseModel):
+    height: int
+    parent: Optional[str] = None
+    children: list[str] = Field(default_factory=list)
+    summary: Optional[str] = None
+    # bumped whenever the node's children, or anything below them, change
+    revision: int = 0
+
+
+class SummaryTree(BaseModel):
+    fan_out: int = FAN_OUT
+    root: Optional[str] = None
+    nodes: dict[str, SummaryTreeNode] = Field(default_factory=dict)
+    dirty: set[str] = Field(default_factory=set)
+
+    @property
+    def summary(self) -> Optional[str]:
+        if self.root is None:
+            return None
+        return self.nodes[self.root].summary
+
+    def document_ids(self) -> list[str]:
+        return [
+            node_id.removeprefix("doc:")
+            for node_id, node in self.nodes.items()
+            if node.height == 0
+        ]
+
+    def upsert_document(self, document_id: str, summary: str) -> None:
+        node_id = f"doc:{document_id}"
+        node = self.nodes.get(node_id)
+        if node is not None:
+            if node.summary != summary:
+                node.summary = summary
+                self._mark_dirty(node.parent)
+            return
+        self.nodes[node_id] = SummaryTreeNode(height=0, summary=summary)
+        self._attach(node_id)
+
+    def delete_document(self, document_id: str) -> None:
+        node_id = f"doc:{document_id}"
+        if node_id in self.nodes:
+            self._detach(node_id)
+            self._collapse_root()
+
+    def _new_group(self, height: int, children: list[str]) -> str:
+        group_id = f"group:{uuid.uuid4()}"
+        self.nodes[group_id] = SummaryTreeNode(height=height, children=children)
+        for child in children:
+            self.nodes[child].parent = group_id
+        self._mark_dirty(group_id)
+        return group_id
+
+    def _attach(self, node_id: str) -> None:
+        height = self.nodes[node_id].height + 1
+        if self.root is None:
+            self.root = self._new_group(height, [node_id])
+            return
+
+        parent_id = next(
+            (
+                candidate_id
+                for candidate_id, candidate in self.nodes.items()
+                if candidate.height == height and len(candidate.children) < self.fan_out
+            ),
+            None,
+        )
+        if parent_id is not None:
+            self.nodes[parent_id].children.append(node_id)
+            self.nodes[node_id].parent = parent_id
+            self._mark_dirty(parent_id)
+            return
+
+        root_height = self.nodes[self.root].height
+        if root_height < height:
+            self.root = self._new_group(height, [self.root, node_id])
+        elif root_height == height:
+            # the whole level is full: grow the tree by one level
+            group_id = self._new_group(height, [node_id])
+            self.root = self._new_group(height + 1, [self.root, group_id])
+        else:
+            self._attach(self._new_group(height, [node_id]))
+
+    def _detach(self, node_id: str) -> None:
+        node = self.nodes.pop(node_id)
+        self.dirty.discard(node_id)
+        if node.parent is None:
+            self.root = None
+            return
+        parent = self.nodes[node.parent]
+        parent.children.remove(node_id)
+        if parent.children:
+            self._mark_dirty(node.parent)
+        else:
+            self._detach(node.parent)
+
+    def _collapse_root(self) -> None:
+        while self.root is not None:
+            root = self.nodes[self.root]
+            if root.height <= 1 or len(root.children) != 1:
+                return
+            child_id = root.children[0]
+            del self.nodes[self.root]
+            self.dirty.discard(self.root)
+            self.nodes[child_id].parent = None
+            self.root = child_id
+
+    def _mark_dirty(self, node_id: Optional[str]) -> None:
+        while node_id is not None:
+            node = self.nodes[node_id]
+            node.revision += 1
+            self.dirty.add(node_id)
+            node_id = node.parent
+
+    def compute(self, summarize: Summarize) -> dict[str, tuple[int, Optional[str]]]:
+        """
+        Summaries of the dirty nodes, computed bottom-up without modifying the tree.
+
+        Returns the revision each summary was computed at, for `apply`.
+        """
+        nodes = copy.deepcopy(self.nodes)
+        results: dict[str, tuple[int, Optional[str]]] = {}
+        for node_id in sorted(
+            (node_id for node_id in self.dirty if node_id in nodes),
+            key=lambda node_id: nodes[node_id].height,
+        ):
+            node = nodes[node_id]
+            texts = [
+                summary for child in node.children if (summary := nodes[child].summary)
+            ]
+            if not texts:
+                node.summary = None
+            elif len(texts) == 1:
+                node.summary = texts[0]
+            else:
+                node.summary = summarize(texts)
+            results[node_id] = (node.revision, node.summary)
+        return results
+
+    def apply(self, results: dict[str, tuple[int, Optional[str]]]) -> None:
+        """Stores computed summaries, skipping nodes that changed since they were computed."""
+        for node_id, (revision, summary) in results.items():
+            node = self.nodes.get(node_id)
+            if node is None or node.revision != revision:
+                continue
+            node.summary = summary
+            self.dirty.discard(node_id)
+
+
+class SummaryTreeStore:
+    """One tree per data source: JSON files locally, or a collection in the S3 KV store."""
+
+    _COLLECTION = "summary_trees"
+
+    def __init__(self) -> None:
+        self._local_dir = os.path.join(settings.rag_databases_dir, "summary_trees")
+        self._s3: Optional[S3DBKVStore] = None
+        if settings.is_s3_summary_storage_configured():
+            self._s3 = S3DBKVStore.from_s3_location(
+                settings.document_bucket,
+                f"{settings.document_bucket_prefix}/summaries/summary_trees",
+            )
+
+    def lock_name(self, data_source_id: int) -> str:
+        if self._s3 is not None:
+            return f"summaries/summary_trees/{data_source_id}"
+        return os.path.join(self._local_dir, str(data_source_id))
+
+    def get(self, data_source_id: int) -> Optional[SummaryTree]:
+        if self._s3 is not None:
+            data = self._s3.get(str(data_source_id), collection=self._COLLECTION)
+            return SummaryTree.model_validate(data) if data is not None else None
+        try:
+            with open(self.lock_name(data_source_id) + ".json") as f:
+                return SummaryTree.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def put(self, data_source_id: int, tree: SummaryTree) -> None:
+        if self._s3 is not None:
+            self._s3.put(
+                str(data_source_id),
+                tree.model_dump(mode="json"),
+                collection=self._COLLECTION,
+            )
+            return
+        path = self.lock_name(data_source_id) + ".json"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{uuid.uuid4()}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(tree.model_dump_json())
+        os.replace(temporary_path, path)
+
+    def delete(self, data_source_id: int) -> None:
+        if self._s3 is not None:
+            self._s3.delete(str(data_source_id), collection=self._COLLECTION)
+            return
+        try:
+            os.remove(self.lock_name(data_source_id) + ".json")
+        except FileNotFoundError:
+            pass
+
+    def all(self) -> dict[int, SummaryTree]:
+        if self._s3 is not None:
+            return {
+                int(key): SummaryTree.model_validate(data)
+                for key, data in self._s3.get_all(collection=self._COLLECTION).items()
+            }
+        try:
+            names = os.listdir(self._local_dir)
+        except FileNotFoundError:
+            return {}
+        trees: dict[int, SummaryTree] = {}
+        for name in names:
+            stem, extension = os.path.splitext(name)
+            if extension != ".json":
+                continue
+            try:
+                data_source_id = int(stem)
+            except ValueError:
+                continue
+            tree = self.get(data_source_id)
+            if tree is not None:
+                trees[data_source_id] = tree
+        return trees
+
+
+def refresh_summary_tree(
+    store: SummaryTreeStore, data_source_id: int, summarize: Summarize
+) -> None:
+    """
+    Recomputes the dirty part of a data source's tree.
+
+    The LLM calls run without holding the tree's lock; summaries of nodes that changed
+    in the meantime are dropped, and those nodes stay dirty for the next refresh.
+    """
+    lock_name = store.lock_name(data_source_id)
+    with read_lock(lock_name):
+        tree = store.get(data_source_id)
+    if tree is None or not tree.dirty:
+        return
+    results = tree.compute(summarize)
+    with write_lock(lock_name):
+        tree = store.get(data_source_id)
+        if tree is None:
+            return
+        tree.apply(results)
+        store.put(data_source_id, tree)
+
+
+@dataclass
+class _Pending:
+    first_scheduled_at: float
+    due_at: float
+    refresh: Callable[[], None]
+
+
+class SummaryRefresher:
+    """Runs the latest scheduled refresh of each data source once it has been quiet for a while."""
+
+    def __init__(self, debounce_seconds: Callable[[], float]) -> None:
+        self._debounce_seconds = debounce_seconds
+        self._condition = threading.Condition()
+        self._pending: dict[int, _Pending] = {}
+        self._running: set[int] = set()
+        self._worker: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="summary-refresh"
+        )
+
+    def schedule(self, data_source_id: int, refresh: Callable[[], None]) -> None:
+        debounce_seconds = self._debounce_seconds()
+        now = time.monotonic()
+        with self._condition:
+            pending = self._pending.get(data_source_id)
+            first_scheduled_at = pending.first_scheduled_at if pending else now
+            self._pending[data_source_id] = _Pending(
+                first_scheduled_at=first_scheduled_at,
+                due_at=min(
+                    now + debounce_seconds,
+                    first_scheduled_at + debounce_seconds * _MAX_DELAY_FACTOR,
+                ),
+                refresh=refresh,
+            )
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="summary-refresher", daemon=True
+                )
+                self._worker.start()
+            self._condition.notify_all()
+
+    def cancel(self, data_source_id: int) -> None:
+        with self._condition:
+            self._pending.pop(data_source_id, None)
+
+    def is_pending(self, data_source_id: int) -> bool:
+        with self._condition:
+            return data_source_id in self._pending or data_source_id in self._running
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                due = self._due()
+                while not due:
+                    self._condition.wait(timeout=self._next_wait())
+                    due = self._due()
+                for data_source_id, _ in due:
+                    del self._pending[data_source_id]
+                    self._running.add(data_source_id)
+            for data_source_id, pending in due:
+                self._executor.submit(self._refresh, data_source_id, pending)
+
+    def _due(self) -> list[tuple[int, _Pending]]:
+        now = time.monotonic()
+        return [
+            (data_source_id, pending)
+            for data_source_id, pending in self._pending.items()
+            if pending.due_at <= now and data_source_id not in self._running
+        ]
+
+    def _next_wait(self) -> Optional[float]:
+        waiting = [
+            pending.due_at
+            for data_source_id, pending in self._pending.items()
+            if data_source_id not in self._running
+        ]
+        if not waiting:
+            return None
+        return max(0.0, min(waiting) - time.monotonic())
+
+    def _refresh(self, data_source_id: int, pending: _Pending) -> None:
+        try:
+            pending.refresh()
+        except Exception:
+            logger.exception(
+                "Failed to refresh the summary of data source %s", data_source_id
+            )
+        finally:
+            with self._condition:
+                self._running.discard(data_source_id)
+                self._condition.notify_all()
+
+
+@cache
+def summary_refresher() -> SummaryRefresher:
+    return SummaryRefresher(lambda: settings.global_summary_debounce_seconds)
@@ -52,7 +52,12 @@ from chromadb.api import ClientAPI
 from chromadb.api.models.Collection import Collection
 from chromadb.config import Settings
 
-from app.ai.vector_stores.vector_store import VectorStore
+from app.ai.vector_stores.client_pool import ClientPool
+from app.ai.vector_stores.vector_store import (
+    CollectionStats,
+    VectorStore,
+    collection_stats_cache,
+)
 from app.config import settings
 from app.services.metadata_apis import data_sources_metadata_api
 from app.services.models import Embedding
@@ -60,6 +65,22 @@ from app.services.models import Embedding
 logger = logging.getLogger(__name__)
 
 
+_pool: ClientPool[ClientAPI] = ClientPool("chromadb", lambda client: client.heartbeat())
+
+
+def _shared_chroma_client() -> ClientAPI:
+    config = (
+        settings.chromadb_host,
+        settings.chromadb_port,
+        settings.chromadb_token,
+        settings.chromadb_tenant,
+        settings.chromadb_database,
+        settings.chromadb_server_ssl_cert_path,
+        settings.chromadb_enable_anonymized_telemetry,
+    )
+    return _pool.client(config, _new_chroma_client)
+
+
 def _new_chroma_client() -> ClientAPI:
     # Note: chromadb.HttpClient requires host and port; ssl, token, database, and tenant are optional depending on server setup
     # We default to HTTP client to support external ChromaDB servers.
@@ -126,7 +147,8 @@ class ChromaVectorStore(VectorStore, ABC):
         collection_name: str,
         client: Optional[ClientAPI] = None,
     ):
-        self._client = client or _new_chroma_client()
+        self._uses_shared_client = client is None
+        self._client = client or _shared_chroma_client()
         self.collection_name = collection_name
         self.data_source_id = data_source_id
 
@@ -155,11 +177,28 @@ class ChromaVectorStore(VectorStore, ABC):
             )
             return None
 
+    def dimension(self) -> Optional[int]:
+        if not self.exists():
+            return None
+        collection = self._client.get_collection(self.collection_name)
+        # Chroma does not record the dimension of a collection; look at a stored vector
+        results = collection.peek(limit=1)
+        embeddings = results.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        return len(embeddings[0])
+
+    def stats_key(self) -> str:
+        return f"chromadb:{id(self._client)}:{self.collection_name}"
+
     def delete(self) -> None:
         if not self.exists():
             return None
         try:
             self._client.delete_collection(self.collection_name)
+            collection_stats_cache.set(self.stats_key(), CollectionStats(exists=False))
+            if self._uses_shared_client:
+                _pool.evict(self._pool_key())
         except Exception as exc:
             logger.exception("Failed to delete collection %s", self.collection_name)
             raise fastapi.exceptions.HTTPException(
@@ -175,6 +214,7 @@ class ChromaVectorStore(VectorStore, ABC):
                 embed_model=Embedding.get_noop(),
             )
             index.delete_ref_doc(document_id)
+            collection_stats_cache.invalidate(self.stats_key())
         except Exception as exc:
             logger.error(
                 "Failed to delete document %s from %s",
@@ -185,6 +225,13 @@ class ChromaVectorStore(VectorStore, ABC):
                 500, "Failed to delete document"
             ) from exc
 
+    def document_node_ids(self, document_id: str) -> set[str]:
+        if not self.exists():
+            return set()
+        collection = self._client.get_collection(self.collection_name)
+        results = collection.get(where={"document_id": document_id}, include=[])
+        return set(results["ids"])
+
     def exists(self) -> bool:
         try:
             self._client.get_collection(self.collection_name)
@@ -193,6 +240,14 @@ class ChromaVectorStore(VectorStore, ABC):
             return False
 
     def llama_vector_store(self) -> BasePydanticVectorStore:
+        if self._uses_shared_client:
+            return _pool.vector_store(self._pool_key(), self._new_llama_vector_store)
+        return self._new_llama_vector_store()
+
+    def _pool_key(self) -> tuple[int, str]:
+        return id(self._client), self.collection_name
+
+    def _new_llama_vector_store(self) -> LlamaIndexChromaVectorStore:
         chroma_collection: Collection = self._client.get_or_create_collection(
             self.collection_name
         )
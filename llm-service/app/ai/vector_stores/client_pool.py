@@ -0,0 +1,162 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+C = TypeVar("C")
+W = TypeVar("W")
+
+# The pool of each backend, for as long as it is in use
+_pools: "weakref.WeakValueDictionary[str, ClientPool[Any]]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+class PoolStats(BaseModel):
+    backend: str
+    clients: int
+    cached_vector_stores: int
+    client_requests: int
+    client_reuses: int
+    healthy: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class ClientPool(Generic[C]):
+    """
+    Process-wide clients for one vector database backend.
+
+    Holds one shared, thread-safe client, built from the backend's current configuration, and the
+    llama-index vector store wrapper for each collection, so the chat hot path does not set up
+    connections. When the configuration changes, for instance when a credential is rotated, the
+    old client is closed and the wrappers built on it are dropped. Wrappers must be evicted when
+    their collection is deleted.
+    """
+
+    def __init__(self, backend: str, health_check: Callable[[C], Any]):
+        self.backend = backend
+        self._health_check = health_check
+        self._lock = threading.Lock()
+        self._config: Optional[Hashable] = None
+        self._client: Optional[C] = None
+        self._wrappers: dict[Hashable, Any] = {}
+        self._client_requests = 0
+        self._client_reuses = 0
+        _pools[backend] = self
+
+    def client(self, config: Hashable, create: Callable[[], C]) -> C:
+        """The shared client for `config`, the settings the client is built from."""
+        with self._lock:
+            self._client_requests += 1
+            if self._client is not None and self._config == config:
+                self._client_reuses += 1
+                return self._client
+            replaced, client = self._client, create()
+            self._client, self._config = client, config
+            self._wrappers.clear()
+        if replaced is not None:
+            _close(self.backend, replaced)
+        return client
+
+    def vector_store(self, collection: Hashable, create: Callable[[], W]) -> W:
+        """The llama-index vector store wrapper for `collection`, built on a shared client."""
+        with self._lock:
+            wrapper = self._wrappers.get(collection)
+        if wrapper is None:
+            wrapper = create()
+            with self._lock:
+                wrapper = self._wrappers.setdefault(collection, wrapper)
+        return wrapper  # type: ignore[no-any-return]
+
+    def evict(self, collection: Hashable) -> None:
+        with self._lock:
+            self._wrappers.pop(collection, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            client, self._client, self._config = self._client, None, None
+            self._wrappers.clear()
+        if client is not None:
+            _close(self.backend, client)
+
+    def stats(self, check_health: bool = True) -> PoolStats:
+        with self._lock:
+            clients = [] if self._client is None else [self._client]
+            stats = PoolStats(
+                backend=self.backend,
+                clients=len(clients),
+                cached_vector_stores=len(self._wrappers),
+                client_requests=self._client_requests,
+                client_reuses=self._client_reuses,
+            )
+        if check_health and clients:
+            try:
+                for client in clients:
+                    self._health_check(client)
+                stats.healthy = True
+            except Exception as e:
+                logger.warning("%s health check failed: %s", self.backend, e)
+                stats.healthy = False
+                stats.error = str(e)
+        return stats
+
+
+def _close(backend: str, client: Any) -> None:
+    close = getattr(client, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception as e:
+        logger.warning("Failed to close a replaced %s client: %s", backend, e)
+
+
+def pool_stats(check_health: bool = True) -> list[PoolStats]:
+    """Stats for the pools of every backend that has been used in this process."""
+    return [
+        pool.stats(check_health)
+        for pool in list(_pools.values())
+        if pool.stats(check_health=False).clients
+    ]
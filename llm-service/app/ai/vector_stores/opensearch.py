@@ -42,6 +42,7 @@ from typing import Optional, List
 
 import fastapi.exceptions
 import opensearchpy
+import opensearchpy.helpers
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.schema import BaseNode, TextNode
 from llama_index.core.vector_stores.types import BasePydanticVectorStore
@@ -51,7 +52,12 @@ from llama_index.vector_stores.opensearch import (
 )
 from opensearchpy.client import OpenSearch as OpensearchClient
 
-from app.ai.vector_stores.vector_store import VectorStore
+from app.ai.vector_stores.client_pool import ClientPool
+from app.ai.vector_stores.vector_store import (
+    CollectionStats,
+    VectorStore,
+    collection_stats_cache,
+)
 from app.config import settings
 from app.services.metadata_apis import data_sources_metadata_api
 from app.services.models import Embedding
@@ -59,16 +65,33 @@ from app.services.models import Embedding
 logger = logging.getLogger(__name__)
 
 
-def _new_opensearch_client(dim: int, index: str) -> OpensearchVectorClient:
+_pool: ClientPool[OpensearchClient] = ClientPool(
+    "opensearch", lambda client: client.cluster.health()
+)
+
+
+def _new_opensearch_client(
+    dim: int, index: str, os_client: OpensearchClient
+) -> OpensearchVectorClient:
     return OpensearchVectorClient(
         endpoint=settings.opensearch_endpoint,
         index=index,
         dim=dim,
         http_auth=(settings.opensearch_username, settings.opensearch_password),
+        os_client=os_client,
     )
 
 
 def _get_low_level_client() -> OpensearchClient:
+    config = (
+        settings.opensearch_endpoint,
+        settings.opensearch_username,
+        settings.opensearch_password,
+    )
+    return _pool.client(config, _new_low_level_client)
+
+
+def _new_low_level_client() -> OpensearchClient:
     os_client = OpensearchClient(
         settings.opensearch_endpoint,
         http_auth=(settings.opensearch_username, settings.opensearch_password),
@@ -120,6 +143,17 @@ class OpenSearch(VectorStore, ABC):
             # Return 0 if index doesn't exist yet
             return 0
 
+    def dimension(self) -> Optional[int]:
+        if not self.exists():
+            return None
+        mappings = self._low_level_client.indices.get_mapping(index=self.table_name)
+        properties = mappings[self.table_name]["mappings"].get("properties", {})
+        dimension = properties.get("embedding", {}).get("dimension")
+        return int(dimension) if dimension is not None else None
+
+    def stats_key(self) -> str:
+        return f"opensearch:{id(self._low_level_client)}:{self.table_name}"
+
     def delete(self) -> None:
         if not self.exists():
             return None
@@ -128,11 +162,29 @@ class OpenSearch(VectorStore, ABC):
             os_client.indices.delete(index=self.table_name)
         except opensearchpy.exceptions.NotFoundError:
             raise fastapi.exceptions.HTTPException(404, "Index not found")
+        finally:
+            _pool.evict(self._pool_key())
+            collection_stats_cache.set(self.stats_key(), CollectionStats(exists=False))
 
     def delete_document(self, document_id: str) -> None:
         if not self.exists():
             return None
         self._get_client().delete_by_doc_id(document_id)
+        collection_stats_cache.invalidate(self.stats_key())
+
+    def document_node_ids(self, document_id: str) -> set[str]:
+        if not self.exists():
+            return set()
+        query = {
+            "query": {"term": {"metadata.doc_id.keyword": {"value": document_id}}},
+            "_source": False,
+        }
+        return {
+            hit["_id"]
+            for hit in opensearchpy.helpers.scan(
+                self._low_level_client, index=self.table_name, query=query, size=1000
+            )
+        }
 
     def llama_vector_store(self) -> BasePydanticVectorStore:
         return OpensearchVectorStore(
@@ -154,11 +206,18 @@ class OpenSearch(VectorStore, ABC):
             )
 
     def _get_client(self) -> OpensearchVectorClient:
-        return _new_opensearch_client(
-            dim=self._find_dim(self.data_source_id),
-            index=self.table_name,
+        return _pool.vector_store(
+            self._pool_key(),
+            lambda: _new_opensearch_client(
+                dim=self._find_dim(self.data_source_id),
+                index=self.table_name,
+                os_client=self._low_level_client,
+            ),
         )
 
+    def _pool_key(self) -> tuple[int, str]:
+        return id(self._low_level_client), self.table_name
+
     def exists(self) -> bool:
         os_client = self._low_level_client
         return bool(os_client.indices.exists(index=self.table_name))
@@ -36,18 +36,35 @@
 #  DATA.
 #
 import logging
+import re
 from typing import Optional, cast
 
 import qdrant_client
+from grpc import RpcError
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.indices import VectorStoreIndex
 from llama_index.core.vector_stores.types import BasePydanticVectorStore
 from llama_index.vector_stores.qdrant import (
     QdrantVectorStore as LlamaIndexQdrantVectorStore,
 )
-from qdrant_client.http.models import CountResult, Record
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (
+    CollectionInfo,
+    CollectionParamsDiff,
+    CountResult,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    MatchValue,
+    PayloadSchemaType,
+    Record,
+    VectorParams,
+    VectorParamsDiff,
+)
 
-from .vector_store import VectorStore
+from .client_pool import ClientPool
+from .vector_store import CollectionStats, VectorStore, collection_stats_cache
 from ...config import settings
 from ...services import models
 from ...services.metadata_apis import data_sources_metadata_api
@@ -55,6 +72,32 @@ from ...services.metadata_apis import data_sources_metadata_api
 logger = logging.getLogger(__name__)
 
 
+_pool: ClientPool[qdrant_client.QdrantClient] = ClientPool(
+    "qdrant", lambda client: client.get_collections()
+)
+
+# Payload fields that deletes (llama-index's delete_ref_doc uses doc_id), document lookups and
+# filtered retrieval filter on
+PAYLOAD_INDEXES = {
+    "doc_id": PayloadSchemaType.KEYWORD,
+    "document_id": PayloadSchemaType.KEYWORD,
+    "data_source_id": PayloadSchemaType.INTEGER,
+}
+
+_CHUNK_COLLECTION = re.compile(r"index_(\d+)")
+
+
+def _shared_qdrant_client() -> qdrant_client.QdrantClient:
+    config = (
+        settings.qdrant_host,
+        settings.qdrant_port,
+        settings.qdrant_grpc_port,
+        settings.qdrant_timeout,
+        settings.cdsw_apiv2_key,
+    )
+    return _pool.client(config, _new_qdrant_client)
+
+
 def _new_qdrant_client() -> qdrant_client.QdrantClient:
     auth_token: str | None = settings.cdsw_apiv2_key
 
@@ -105,7 +148,8 @@ class QdrantVectorStore(VectorStore):
         data_source_id: int,
         client: Optional[qdrant_client.QdrantClient] = None,
     ):
-        self.client = client or _new_qdrant_client()
+        self._uses_shared_client = client is None
+        self.client = client or _shared_qdrant_client()
         self.table_name = table_name
         self.data_source_id = data_source_id
 
@@ -122,9 +166,24 @@ class QdrantVectorStore(VectorStore):
         document_count: CountResult = self.client.count(self.table_name)
         return document_count.count
 
+    def dimension(self) -> Optional[int]:
+        if not self.exists():
+            return None
+        vectors = self.client.get_collection(self.table_name).config.params.vectors
+        if isinstance(vectors, dict):
+            # named vectors
+            return next((params.size for params in vectors.values()), None)
+        return vectors.size if vectors else None
+
+    def stats_key(self) -> str:
+        return f"qdrant:{id(self.client)}:{self.table_name}"
+
     def delete(self) -> None:
         if self.exists():
             self.client.delete_collection(self.table_name)
+        collection_stats_cache.set(self.stats_key(), CollectionStats(exists=False))
+        if self._uses_shared_client:
+            _pool.evict(self._pool_key())
 
     def delete_document(self, document_id: str) -> None:
         if self.exists():
@@ -133,19 +192,117 @@ class QdrantVectorStore(VectorStore):
                 embed_model=models.Embedding.get_noop(),
             )
             index.delete_ref_doc(document_id)
+            collection_stats_cache.invalidate(self.stats_key())
+
+    def document_node_ids(self, document_id: str) -> set[str]:
+        if not self.exists():
+            return set()
+        document_filter = Filter(
+            must=[
+                FieldCondition(key="document_id", match=MatchValue(value=document_id))
+            ]
+        )
+        node_ids: set[str] = set()
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                self.table_name,
+                scroll_filter=document_filter,
+                limit=1000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            node_ids.update(str(record.id) for record in records)
+            if offset is None:
+                return node_ids
 
     def exists(self) -> bool:
         return self.client.collection_exists(self.table_name)
 
+    def prepare_for_write(self, dimension: int) -> None:
+        """
+        Creates the collection with the configured schema, instead of leaving it to llama-index.
+
+        llama-index would create it on the first write, with the default HNSW settings, and the
+        payload in memory and unindexed.
+        """
+        if self.exists():
+            return
+        try:
+            self.client.create_collection(
+                self.table_name,
+                # The unnamed cosine vector llama-index would create
+                vectors_config=VectorParams(
+                    size=dimension,
+                    distance=Distance.COSINE,
+                    on_disk=settings.qdrant_on_disk_vectors,
+                ),
+                hnsw_config=_hnsw_config(),
+                on_disk_payload=settings.qdrant_on_disk_payload,
+            )
+        except (RpcError, UnexpectedResponse, ValueError) as e:
+            # Another writer created it first
+            if "already exists" not in str(e):
+                raise
+        self._create_payload_indexes(self.client.get_collection(self.table_name))
+        if self._uses_shared_client:
+            # A wrapper made before the collection existed would try to create it again
+            _pool.evict(self._pool_key())
+
+    def apply_schema(self) -> None:
+        """Brings an existing collection to the schema `prepare_for_write` creates collections with."""
+        info = self.client.get_collection(self.table_name)
+        hnsw_config = info.config.hnsw_config
+        vectors = info.config.params.vectors
+        if (
+            hnsw_config.m != settings.qdrant_hnsw_m
+            or hnsw_config.ef_construct != settings.qdrant_hnsw_ef_construct
+            or bool(info.config.params.on_disk_payload)
+            != settings.qdrant_on_disk_payload
+            or (
+                isinstance(vectors, VectorParams)
+                and bool(vectors.on_disk) != settings.qdrant_on_disk_vectors
+            )
+        ):
+            logger.info("Applying the collection schema to %s", self.table_name)
+            self.client.update_collection(
+                self.table_name,
+                hnsw_config=_hnsw_config(),
+                collection_params=CollectionParamsDiff(
+                    on_disk_payload=settings.qdrant_on_disk_payload
+                ),
+                vectors_config=(
+                    {"": VectorParamsDiff(on_disk=settings.qdrant_on_disk_vectors)}
+                    if isinstance(vectors, VectorParams)
+                    else None
+                ),
+            )
+        self._create_payload_indexes(info)
+
+    def _create_payload_indexes(self, info: CollectionInfo) -> None:
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name not in (info.payload_schema or {}):
+                self.client.create_payload_index(
+                    self.table_name, field_name=field_name, field_schema=field_schema
+                )
+
     def llama_vector_store(self) -> BasePydanticVectorStore:
-        vector_store = LlamaIndexQdrantVectorStore(
+        if self._uses_shared_client:
+            return _pool.vector_store(self._pool_key(), self._new_llama_vector_store)
+        return self._new_llama_vector_store()
+
+    def _pool_key(self) -> tuple[int, str]:
+        return id(self.client), self.table_name
+
+    def _new_llama_vector_store(self) -> LlamaIndexQdrantVectorStore:
+        return LlamaIndexQdrantVectorStore(
             collection_name=self.table_name,
             client=self.client,
             parallel=4,
             batch_size=64,
             max_retries=3,
         )
-        return vector_store
 
     def visualize(
         self, user_query: Optional[str] = None
@@ -167,3 +324,36 @@ class QdrantVectorStore(VectorStore):
                     embeddings.append(cast(list[float], record.vector))
 
         return self.visualize_embeddings(embeddings, filenames, user_query)
+
+
+def _hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(
+        m=settings.qdrant_hnsw_m, ef_construct=settings.qdrant_hnsw_ef_construct
+    )
+
+
+def migrate_chunk_collections(
+    client: Optional[qdrant_client.QdrantClient] = None,
+) -> None:
+    """
+    Applies the collection schema to existing chunk collections.
+
+    Collections that were created by llama-index, or with other settings, are updated in place;
+    Qdrant rebuilds their indexes in the background.
+    """
+    try:
+        client = client or _shared_qdrant_client()
+        collections = client.get_collections().collections
+    except Exception as e:
+        logger.warning("Not migrating Qdrant collections: %s", e)
+        return
+    for collection in collections:
+        match = _CHUNK_COLLECTION.fullmatch(collection.name)
+        if match is None:
+            continue
+        try:
+            QdrantVectorStore(
+                collection.name, data_source_id=int(match.group(1)), client=client
+            ).apply_schema()
+        except Exception:
+            logger.exception("Failed to migrate Qdrant collection %s", collection.name)
@@ -37,16 +37,34 @@
 #
 import logging
 from abc import abstractmethod, ABCMeta
-from typing import Optional, List, cast
+from dataclasses import dataclass
+from typing import Optional, List, cast, Collection
 
 import umap
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.schema import BaseNode
 from llama_index.core.vector_stores.types import BasePydanticVectorStore
 
+from ...config import settings
+from ...services.caching import TtlCache
+
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class CollectionStats:
+    exists: bool
+    size: Optional[int] = None
+    dimension: Optional[int] = None
+
+
+# Keyed by VectorStore.stats_key(). Write paths keep this up to date in this process;
+# the TTL bounds staleness from writes made elsewhere.
+collection_stats_cache: TtlCache[str, CollectionStats] = TtlCache(
+    lambda: settings.collection_stats_ttl_seconds
+)
+
+
 class VectorStore(metaclass=ABCMeta):
     """RAG Studio Vector Store functionality. Implementations of this should house the vectors for a single document collection."""
 
@@ -61,6 +79,35 @@ class VectorStore(metaclass=ABCMeta):
         If the collection does not exist, return None
         """
 
+    @abstractmethod
+    def dimension(self) -> Optional[int]:
+        """
+        Dimension of the stored vectors; None if the collection does not exist or it cannot be determined
+        """
+
+    @abstractmethod
+    def stats_key(self) -> str:
+        """Identifies the collection in the collection stats cache"""
+
+    def stats(self) -> CollectionStats:
+        """Existence, size and vector dimension of the collection, cached for a short time"""
+        return collection_stats_cache.get_or_load(self.stats_key(), self._load_stats)
+
+    def refresh_stats(self) -> CollectionStats:
+        """Reload the cached stats, after this collection has been written to"""
+        stats = self._load_stats()
+        collection_stats_cache.set(self.stats_key(), stats)
+        return stats
+
+    def _load_stats(self) -> CollectionStats:
+        size = self.size()
+        if size is None:
+            return CollectionStats(exists=False)
+        return CollectionStats(exists=True, size=size, dimension=self.dimension())
+
+    def prepare_for_write(self, dimension: int) -> None:
+        """Set up the collection for vectors of `dimension`, before nodes are first added to it"""
+
     @abstractmethod
     def delete(self) -> None:
         """Delete the vector store"""
@@ -69,6 +116,20 @@ class VectorStore(metaclass=ABCMeta):
     def delete_document(self, document_id: str) -> None:
         """Delete a single document from the vector store"""
 
+    @abstractmethod
+    def document_node_ids(self, document_id: str) -> set[str]:
+        """IDs of the nodes currently stored for a single document"""
+
+    def delete_nodes(self, node_ids: Collection[str]) -> None:
+        """Delete individual nodes from the vector store"""
+        if not node_ids or not self.exists():
+            return
+        vector_store = self.llama_vector_store()
+        ids = list(node_ids)
+        for start in range(0, len(ids), 1000):
+            vector_store.delete_nodes(ids[start : start + 1000])
+        collection_stats_cache.invalidate(self.stats_key())
+
     @abstractmethod
     def llama_vector_store(self) -> BasePydanticVectorStore:
         """Access the underlying llama-index vector store implementation"""
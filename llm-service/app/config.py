@@ -47,7 +47,7 @@ simply the field name in all capital letters.
 import logging
 import os.path
 from enum import Enum
-from typing import cast, Optional, Literal
+from typing import cast, get_args, Optional, Literal
 
 from chromadb.config import DEFAULT_TENANT, DEFAULT_DATABASE
 
@@ -55,10 +55,12 @@ from chromadb.config import DEFAULT_TENANT, DEFAULT_DATABASE
 logger = logging.getLogger(__name__)
 
 
-SummaryStorageProviderType = Literal["Local", "S3"]
+SummaryStorageProviderType = Literal["Local", "S3", "SQLite"]
 ChatStoreProviderType = Literal["Local", "S3"]
+ParsedDocumentCacheProviderType = Literal["Local", "S3"]
 VectorDbProviderType = Literal["QDRANT", "OPENSEARCH", "CHROMADB"]
 MetadataDbProviderType = Literal["H2", "PostgreSQL"]
+SummarySamplingMode = Literal["random", "representative"]
 
 
 class ModelSource(str, Enum):
@@ -83,6 +85,118 @@ class _Settings:
     def rag_databases_dir(self) -> str:
         return os.environ.get("RAG_DATABASES_DIR", os.path.join("..", "databases"))
 
+    @property
+    def embedding_cache_enabled(self) -> bool:
+        return os.environ.get("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+    @property
+    def embedding_cache_max_entries(self) -> int:
+        return int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+    @property
+    def embedding_target_latency_seconds(self) -> float:
+        return float(os.environ.get("EMBEDDING_TARGET_LATENCY_SECONDS", "10"))
+
+    @property
+    def embedding_max_concurrency(self) -> int:
+        return int(os.environ.get("EMBEDDING_MAX_CONCURRENCY", "32"))
+
+    @property
+    def collection_stats_ttl_seconds(self) -> float:
+        return float(os.environ.get("COLLECTION_STATS_TTL_SECONDS", "30"))
+
+    @property
+    def retrieval_source_timeout_seconds(self) -> float:
+        return float(os.environ.get("RETRIEVAL_SOURCE_TIMEOUT_SECONDS", "30"))
+
+    @property
+    def retrieval_max_concurrency(self) -> int:
+        return int(os.environ.get("RETRIEVAL_MAX_CONCURRENCY", "16"))
+
+    @property
+    def retrieval_max_queued(self) -> int:
+        return int(os.environ.get("RETRIEVAL_MAX_QUEUED", "16"))
+
+    @property
+    def query_embedding_cache_size(self) -> int:
+        return int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+    @property
+    def metadata_cache_ttl_seconds(self) -> float:
+        return float(os.environ.get("METADATA_CACHE_TTL_SECONDS", "30"))
+
+    @property
+    def metadata_cache_stale_seconds(self) -> float:
+        return float(os.environ.get("METADATA_CACHE_STALE_SECONDS", "300"))
+
+    @property
+    def session_metadata_ttl_seconds(self) -> float:
+        return float(os.environ.get("SESSION_METADATA_TTL_SECONDS", "5"))
+
+    @property
+    def summary_index_cache_ttl_seconds(self) -> float:
+        return float(os.environ.get("SUMMARY_INDEX_CACHE_TTL_SECONDS", "300"))
+
+    @property
+    def summary_lock_lease_seconds(self) -> float:
+        return float(os.environ.get("SUMMARY_LOCK_LEASE_SECONDS", "120"))
+
+    @property
+    def global_summary_debounce_seconds(self) -> float:
+        return float(os.environ.get("GLOBAL_SUMMARY_DEBOUNCE_SECONDS", "10"))
+
+    @property
+    def summary_sampling_mode(self) -> SummarySamplingMode:
+        mode = os.environ.get("SUMMARY_SAMPLING_MODE", "random")
+        if mode not in get_args(SummarySamplingMode):
+            raise ValueError(f"Unknown SUMMARY_SAMPLING_MODE: {mode}")
+        return cast(SummarySamplingMode, mode)
+
+    @property
+    def summary_sampling_seed(self) -> Optional[int]:
+        seed = os.environ.get("SUMMARY_SAMPLING_SEED")
+        return int(seed) if seed else None
+
+    @property
+    def parsed_document_handoff_seconds(self) -> float:
+        return float(os.environ.get("PARSED_DOCUMENT_HANDOFF_SECONDS", "300"))
+
+    @property
+    def parsed_document_handoff_max_bytes(self) -> int:
+        return int(os.environ.get("PARSED_DOCUMENT_HANDOFF_MAX_BYTES", str(16 * 1024**2)))
+
+    @property
+    def reader_processes(self) -> int:
+        # Docling and image documents don't count against this: they are parsed by the
+        # DOCLING_PROCESSES workers, each of which keeps a full set of Docling's layout,
+        # table and OCR models loaded, a few GB of memory apiece
+        default = max(1, (os.cpu_count() or 2) // 2)
+        return int(os.environ.get("READER_PROCESSES", str(default)))
+
+    @property
+    def reader_process_max_documents(self) -> int:
+        return int(os.environ.get("READER_PROCESS_MAX_DOCUMENTS", "20"))
+
+    @property
+    def reader_process_max_memory_mb(self) -> int:
+        return int(os.environ.get("READER_PROCESS_MAX_MEMORY_MB", "0"))
+
+    @property
+    def docling_processes(self) -> int:
+        return int(os.environ.get("DOCLING_PROCESSES", "1"))
+
+    @property
+    def docling_converters(self) -> int:
+        return int(os.environ.get("DOCLING_CONVERTERS", "1"))
+
+    @property
+    def docling_page_batch_size(self) -> int:
+        return int(os.environ.get("DOCLING_PAGE_BATCH_SIZE", "20"))
+
+    @property
+    def pii_processes(self) -> int:
+        return int(os.environ.get("PII_PROCESSES", "1"))
+
     @property
     def tools_dir(self) -> str:
         return os.path.join("..", "tools")
@@ -123,6 +237,26 @@ class _Settings:
     def qdrant_grpc_port(self) -> int:
         return int(os.environ.get("QDRANT_GRPC_PORT", "6334"))
 
+    @property
+    def qdrant_hnsw_m(self) -> int:
+        return int(os.environ.get("QDRANT_HNSW_M", "16"))
+
+    @property
+    def qdrant_hnsw_ef_construct(self) -> int:
+        return int(os.environ.get("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+
+    @property
+    def qdrant_on_disk_payload(self) -> bool:
+        return os.environ.get("QDRANT_ON_DISK_PAYLOAD", "true").lower() == "true"
+
+    @property
+    def qdrant_on_disk_vectors(self) -> bool:
+        return os.environ.get("QDRANT_ON_DISK_VECTORS", "false").lower() == "true"
+
+    @property
+    def qdrant_migrate_collections(self) -> bool:
+        return os.environ.get("QDRANT_MIGRATE_COLLECTIONS", "true").lower() == "true"
+
     @property
     def advanced_pdf_parsing(self) -> bool:
         return os.environ.get("USE_ENHANCED_PDF_PROCESSING", "false").lower() == "true"
@@ -208,6 +342,17 @@ class _Settings:
             os.environ.get("CHAT_STORE_PROVIDER", "Local"),
         )
 
+    @property
+    def parsed_document_cache_provider(self) -> ParsedDocumentCacheProviderType:
+        return cast(
+            ParsedDocumentCacheProviderType,
+            os.environ.get("PARSED_DOCUMENT_CACHE_PROVIDER", "Local"),
+        )
+
+    @property
+    def parsed_document_cache_max_bytes(self) -> int:
+        return int(os.environ.get("PARSED_DOCUMENT_CACHE_MAX_BYTES", str(2 * 1024**3)))
+
     @property
     def document_bucket(self) -> str:
         return os.environ.get("S3_RAG_DOCUMENT_BUCKET", "")
@@ -222,9 +367,17 @@ class _Settings:
     def is_s3_summary_storage_configured(self) -> bool:
         return self.summary_storage_provider == "S3" and self._is_s3_configured()
 
+    def is_sqlite_summary_storage_configured(self) -> bool:
+        return self.summary_storage_provider == "SQLite"
+
     def is_s3_chat_store_configured(self) -> bool:
         return self.chat_store_provider == "S3" and self._is_s3_configured()
 
+    def is_s3_parsed_document_cache_configured(self) -> bool:
+        return (
+            self.parsed_document_cache_provider == "S3" and self._is_s3_configured()
+        )
+
     @property
     def azure_openai_api_key(self) -> Optional[str]:
         return os.environ.get("AZURE_OPENAI_API_KEY")
@@ -55,6 +55,7 @@ except Exception as e:
 
 import functools
 import os
+import threading
 import time
 from collections.abc import Awaitable, Callable
 from contextlib import asynccontextmanager
@@ -65,8 +66,11 @@ from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from uvicorn.logging import DefaultFormatter
 
+from .ai.indexing.reader_pool import shutdown_reader_pool
+from .ai.vector_stores.qdrant import migrate_chunk_collections
 from .config import settings
 from .routers import index
+from .services import models
 
 _APP_PKG_NAME = __name__.split(".", maxsplit=1)[0]
 
@@ -154,7 +158,19 @@ def initialize_logging() -> None:
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     initialize_logging()
+    # resolve the model provider and build model clients without delaying startup
+    threading.Thread(target=models.warm_up, name="model-warm-up", daemon=True).start()
+    # bring chunk collections made before the current schema up to date; like
+    # VectorStoreFactory, any provider other than OpenSearch and ChromaDB is Qdrant
+    if (
+        settings.vector_db_provider not in ("OPENSEARCH", "CHROMADB")
+        and settings.qdrant_migrate_collections
+    ):
+        threading.Thread(
+            target=migrate_chunk_collections, name="qdrant-migration", daemon=True
+        ).start()
     yield
+    shutdown_reader_pool()
 
 
 ###################################
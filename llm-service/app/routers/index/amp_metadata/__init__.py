@@ -58,6 +58,7 @@ from ....services.amp_metadata import (
     ValidationResult,
 )
 from ....services.amp_update import does_amp_need_updating
+from ....services import models
 from ....services.models.providers import CAIIModelProvider
 from ....services.utils import has_admin_rights, get_project_environment
 
@@ -152,6 +153,7 @@ def update_configuration(
         updated_env = config_to_env(config)
         env_to_save = existing_env | updated_env
         update_project_environment(env_to_save)
+        models.invalidate()
 
         return build_configuration(get_project_environment(), application_config)
 
@@ -188,10 +190,12 @@ def save_auth_token(auth_token: Annotated[str, Body(embed=True)]) -> str:
         A success message
     """
     save_cdp_token(auth_token)
+    models.invalidate()
     try:
         CAIIModelProvider.list_llm_models()
     except Exception:
         os.remove("cdp_token")
+        models.invalidate()
         raise fastapi.HTTPException(
             status_code=400,
             detail="Invalid auth token",
@@ -30,17 +30,20 @@
 import logging
 import tempfile
 from http import HTTPStatus
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi_utils.cbv import cbv
 from llama_index.core.llms import LLM
 from llama_index.core.node_parser import SentenceSplitter
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from .... import exceptions
 from ....ai.indexing.base import NotSupportedFileExtensionError
+from ....ai.indexing import ingestion
 from ....ai.indexing.embedding_indexer import EmbeddingIndexer
+from ....ai.indexing.parsed_document_cache import purge_parsed_documents
+from ....ai.indexing.readers.base_reader import ReaderConfig
 from ....ai.indexing.summary_indexer import SummaryIndexer
 from ....ai.vector_stores.vector_store import VectorStore
 from ....ai.vector_stores.vector_store_factory import VectorStoreFactory
@@ -56,15 +59,26 @@ router = APIRouter(prefix="/data_sources/{data_source_id}", tags=["Data Sources"
 SUMMARIZATION_DISABLED = "Summarization disabled. Please specify a summarization model in the knowledge base to enable."
 
 
-class SummarizeDocumentRequest(BaseModel):
-    s3_bucket_name: str
-    s3_document_key: str
-    original_filename: str
-
-
 class RagIndexDocumentConfiguration(BaseModel):
     chunk_size: int = 512  # this is llama-index's default
     chunk_overlap: int = 10  # percentage of tokens in a chunk (chunk_size)
+    # CSV and Excel documents: rows and tokens packed into one chunk (0 is no limit), and the
+    # columns to keep
+    rows_per_chunk: int = 1
+    tokens_per_chunk: int = 0
+    columns: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def _check_reader_config(self) -> "RagIndexDocumentConfiguration":
+        self.reader_config()
+        return self
+
+    def reader_config(self) -> ReaderConfig:
+        return ReaderConfig(
+            rows_per_chunk=self.rows_per_chunk,
+            tokens_per_chunk=self.tokens_per_chunk,
+            columns=tuple(self.columns) if self.columns else None,
+        )
 
 
 class RagIndexDocumentRequest(BaseModel):
@@ -74,6 +88,14 @@ class RagIndexDocumentRequest(BaseModel):
     configuration: RagIndexDocumentConfiguration = RagIndexDocumentConfiguration()
 
 
+class SummarizeDocumentRequest(BaseModel):
+    s3_bucket_name: str
+    s3_document_key: str
+    original_filename: str
+    # The configuration the document is indexed with, so that the document is parsed the same way
+    configuration: RagIndexDocumentConfiguration = RagIndexDocumentConfiguration()
+
+
 class ChunkContentsResponse(BaseModel):
     text: str
     metadata: Dict[str, Any]
@@ -86,7 +108,9 @@ class DataSourceController:
     )
 
     @staticmethod
-    def _get_summary_indexer(data_source_id: int) -> Optional[SummaryIndexer]:
+    def _get_summary_indexer(
+        data_source_id: int, reader_config: Optional[ReaderConfig] = None
+    ) -> Optional[SummaryIndexer]:
         datasource = data_sources_metadata_api.get_metadata(data_source_id)
         if not datasource.summarization_model:
             return None
@@ -95,6 +119,7 @@ class DataSourceController:
             splitter=SentenceSplitter(chunk_size=2048),
             embedding_model=models.Embedding.get(datasource.embedding_model),
             llm=models.LLM.get(datasource.summarization_model),
+            reader_config=reader_config,
         )
 
     @router.delete(
@@ -104,6 +129,17 @@ class DataSourceController:
     def delete(self, data_source_id: int) -> None:
         self.chunks_vector_store.delete()
         SummaryIndexer.delete_data_source_by_id(data_source_id)
+        purge_parsed_documents(data_source_id)
+        data_sources_metadata_api.invalidate(data_source_id)
+
+    @router.post(
+        "/metadata/invalidate",
+        summary="Drops the cached data source metadata. Called by the backend when the data source changes.",
+        response_model=None,
+    )
+    @exceptions.propagates
+    def invalidate_metadata(self, data_source_id: int) -> None:
+        data_sources_metadata_api.invalidate(data_source_id)
 
     @router.get(
         "/chunks/{chunk_id}",
@@ -124,6 +160,7 @@ class DataSourceController:
     @exceptions.propagates
     def delete_document(self, data_source_id: int, doc_id: str) -> None:
         self.chunks_vector_store.delete_document(doc_id)
+        purge_parsed_documents(data_source_id, doc_id)
         summary_indexer = self._get_summary_indexer(data_source_id)
         if summary_indexer:
             try:
@@ -150,57 +187,82 @@ class DataSourceController:
     def _download_and_index(
         self, datasource: RagDataSource, doc_id: str, request: RagIndexDocumentRequest
     ) -> None:
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            logger.debug("created temporary directory %s", tmpdirname)
-            doc_storage = document_storage.from_environment()
-            file_path = doc_storage.download(
-                tmpdirname,
-                request.s3_bucket_name,
-                request.s3_document_key,
-                request.original_filename,
-            )
-            llm: Optional[LLM] = None
-            if datasource.summarization_model:
-                llm = models.LLM.get(datasource.summarization_model)
-            indexer = EmbeddingIndexer(
-                datasource.id,
-                splitter=SentenceSplitter(
-                    chunk_size=request.configuration.chunk_size,
-                    chunk_overlap=int(
-                        request.configuration.chunk_overlap
-                        * 0.01
-                        * request.configuration.chunk_size
-                    ),
+        llm: Optional[LLM] = None
+        if datasource.summarization_model:
+            llm = models.LLM.get(datasource.summarization_model)
+        indexer = EmbeddingIndexer(
+            datasource.id,
+            splitter=SentenceSplitter(
+                chunk_size=request.configuration.chunk_size,
+                chunk_overlap=int(
+                    request.configuration.chunk_overlap
+                    * 0.01
+                    * request.configuration.chunk_size
                 ),
-                embedding_model=models.Embedding.get(datasource.embedding_model),
-                llm=llm,
-                chunks_vector_store=self.chunks_vector_store,
-            )
-            write_mlflow_run_json(
-                f"datasource_{datasource.name}_{datasource.id}",
-                f"doc_{doc_id}",
-                {
-                    "params": {
-                        "data_source_id": str(datasource.id),
-                        "embedding_model": datasource.embedding_model,
-                        "summarization_model": datasource.summarization_model,
-                        "chunk_size": str(request.configuration.chunk_size),
-                        "chunk_overlap": str(request.configuration.chunk_overlap),
-                        "file_name": request.original_filename,
-                        "file_size_bytes": str(file_path.stat().st_size),
-                    }
-                },
-            )
+            ),
+            embedding_model=models.Embedding.get(datasource.embedding_model),
+            llm=llm,
+            chunks_vector_store=self.chunks_vector_store,
+            reader_config=request.configuration.reader_config(),
+        )
 
-            # Delete to avoid duplicates
-            self.chunks_vector_store.delete_document(doc_id)
-            try:
-                indexer.index_file(file_path, doc_id)
-            except NotSupportedFileExtensionError as e:
-                raise HTTPException(
-                    status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
-                    detail=f"Unsupported file extension: {e.file_extension}",
+        # Chunks that are already indexed are kept; the indexer removes the ones that no longer exist
+        try:
+            if datasource.summarization_model:
+                # The summary request for this document needs the same parse
+                file_size_bytes = ingestion.index_stored_file(
+                    indexer,
+                    doc_id,
+                    request.s3_bucket_name,
+                    request.s3_document_key,
+                    request.original_filename,
+                )
+                self._write_mlflow_run(datasource, doc_id, request, file_size_bytes)
+                return
+
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                logger.debug("created temporary directory %s", tmpdirname)
+                doc_storage = document_storage.from_environment()
+                file_path = doc_storage.download(
+                    tmpdirname,
+                    request.s3_bucket_name,
+                    request.s3_document_key,
+                    request.original_filename,
+                )
+                self._write_mlflow_run(
+                    datasource, doc_id, request, file_path.stat().st_size
                 )
+                indexer.index_file(file_path, doc_id)
+        except NotSupportedFileExtensionError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported file extension: {e.file_extension}",
+            )
+
+    @staticmethod
+    def _write_mlflow_run(
+        datasource: RagDataSource,
+        doc_id: str,
+        request: RagIndexDocumentRequest,
+        file_size_bytes: int,
+    ) -> None:
+        write_mlflow_run_json(
+            f"datasource_{datasource.name}_{datasource.id}",
+            f"doc_{doc_id}",
+            {
+                "params": {
+                    "data_source_id": str(datasource.id),
+                    "embedding_model": datasource.embedding_model,
+                    "summarization_model": datasource.summarization_model,
+                    "chunk_size": str(request.configuration.chunk_size),
+                    "chunk_overlap": str(request.configuration.chunk_overlap),
+                    "rows_per_chunk": str(request.configuration.rows_per_chunk),
+                    "tokens_per_chunk": str(request.configuration.tokens_per_chunk),
+                    "file_name": request.original_filename,
+                    "file_size_bytes": str(file_size_bytes),
+                }
+            },
+        )
 
     @router.get(
         "/documents/{doc_id}/summary",
@@ -229,40 +291,42 @@ class DataSourceController:
         doc_id: str,
         request: SummarizeDocumentRequest,
     ) -> str:
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            logger.debug("created temporary directory %s", tmpdirname)
-            doc_storage = document_storage.from_environment()
-            file_path = doc_storage.download(
-                tmpdirname,
+        indexer = self._get_summary_indexer(
+            data_source_id, request.configuration.reader_config()
+        )
+        if not indexer:
+            return SUMMARIZATION_DISABLED
+
+        try:
+            # Reuses the parse from the index request for this document, if it came first
+            parsed_file = ingestion.parse_stored_file(
+                indexer,
+                doc_id,
                 request.s3_bucket_name,
                 request.s3_document_key,
                 request.original_filename,
             )
+        except NotSupportedFileExtensionError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported file extension: {e.file_extension}",
+            )
 
-            indexer = self._get_summary_indexer(data_source_id)
-            if not indexer:
-                return SUMMARIZATION_DISABLED
-            # Delete to avoid duplicates
-            try:
-                indexer.delete_document(doc_id)
-            except Exception as e:
-                # ignore, since it might just be because the summary index doesn't exist yet
-                logger.info("Failed to delete document %s: %s", doc_id, e)
+        # Delete to avoid duplicates
+        try:
+            indexer.delete_document(doc_id)
+        except Exception as e:
+            # ignore, since it might just be because the summary index doesn't exist yet
+            logger.info("Failed to delete document %s: %s", doc_id, e)
 
-            try:
-                indexer.index_file(file_path, doc_id)
-                summary = indexer.get_summary(doc_id)
-                if summary is None:
-                    raise HTTPException(
-                        status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
-                        detail="No content to summarize.",
-                    )
-                return summary
-            except NotSupportedFileExtensionError as e:
-                raise HTTPException(
-                    status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
-                    detail=f"Unsupported file extension: {e.file_extension}",
-                )
+        indexer.index_parsed_document(parsed_file.document, doc_id)
+        summary = indexer.get_summary(doc_id)
+        if summary is None:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail="No content to summarize.",
+            )
+        return summary
 
     @router.get(
         "/size",
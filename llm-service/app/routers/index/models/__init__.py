@@ -43,6 +43,7 @@ import app.services.models
 from app.config import ModelSource
 from .... import exceptions
 from ....services import models
+from ....ai.indexing.embedding_controller import OperatingPoint, operating_points
 from ....services.caii.caii import describe_endpoint, build_model_response
 from ....services.caii.types import ModelResponse
 
@@ -61,6 +62,15 @@ def get_llm_embedding_models() -> List[ModelResponse]:
     return models.Embedding.list_available()
 
 
+@router.get(
+    "/embeddings/operating_points",
+    summary="Get the batch size and concurrency learned for each embedding model.",
+)
+@exceptions.propagates
+def get_embedding_operating_points() -> List[OperatingPoint]:
+    return operating_points()
+
+
 @router.get("/reranking", summary="Get reranking models.")
 @exceptions.propagates
 def get_reranking_models() -> List[ModelResponse]:
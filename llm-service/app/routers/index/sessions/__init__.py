@@ -183,9 +183,20 @@ def clear_chat_history(session_id: int) -> str:
 @exceptions.propagates
 def delete_session(session_id: int) -> str:
     get_chat_history_manager().delete_chat_history(session_id=session_id)
+    session_metadata_api.invalidate(session_id)
     return "Chat history deleted."
 
 
+@router.post(
+    "/metadata/invalidate",
+    summary="Drops the cached session metadata. Called by the backend when the session changes.",
+)
+@exceptions.propagates
+def invalidate_session_metadata(session_id: int) -> str:
+    session_metadata_api.invalidate(session_id)
+    return "Session metadata invalidated."
+
+
 class ChatResponseRating(BaseModel):
     rating: bool
 
@@ -0,0 +1,187 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Callable, Generic, Hashable, Optional, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+Seconds = Union[float, Callable[[], float]]
+
+
+def _seconds(value: Seconds) -> float:
+    return value() if callable(value) else value
+
+
+@cache
+def _refresh_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+class TtlCache(Generic[K, V]):
+    """
+    Thread-safe mapping whose entries expire `ttl_seconds` after they were set.
+
+    `ttl_seconds` may be a callable, so that a setting can be read each time an entry is set.
+    Once `maxsize` entries are stored, the least recently used one is dropped.
+    """
+
+    def __init__(self, ttl_seconds: Seconds, maxsize: int = 1024):
+        self._ttl_seconds = ttl_seconds
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        ttl_seconds = _seconds(self._ttl_seconds)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: K, load: Callable[[], V]) -> V:
+        value = self.get(key)
+        if value is None:
+            value = load()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class StaleWhileRevalidateCache(Generic[K, V]):
+    """
+    Thread-safe mapping whose entries are fresh for `fresh_seconds` after they were loaded.
+
+    For a further `stale_seconds` an entry is still returned, but a reload is started in the
+    background; a failed reload keeps the stale entry. Past that, the entry is loaded inline.
+    Loads that overlap an `invalidate` or `clear` are returned but not stored.
+    """
+
+    def __init__(
+        self, fresh_seconds: Seconds, stale_seconds: Seconds, maxsize: int = 1024
+    ):
+        self._fresh_seconds = fresh_seconds
+        self._stale_seconds = stale_seconds
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._refreshing: set[K] = set()
+        self._generation = 0
+
+    def get_or_load(self, key: K, load: Callable[[], V]) -> V:
+        fresh_seconds = _seconds(self._fresh_seconds)
+        stale_seconds = _seconds(self._stale_seconds)
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                loaded_at, value = entry
+                age = time.monotonic() - loaded_at
+                if age < fresh_seconds + stale_seconds:
+                    self._entries.move_to_end(key)
+                    if age >= fresh_seconds and key not in self._refreshing:
+                        self._refreshing.add(key)
+                        _refresh_executor().submit(self._refresh, key, load, generation)
+                    return value
+                del self._entries[key]
+
+        value = load()
+        self._store(key, value, generation)
+        return value
+
+    def _refresh(self, key: K, load: Callable[[], V], generation: int) -> None:
+        try:
+            self._store(key, load(), generation)
+        except Exception:
+            logger.warning("Background refresh of %s failed", key, exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key: K, value: V, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[K], bool]) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
@@ -87,6 +87,7 @@ class CaiiEmbeddingModel(BaseEmbedding):
         headers = build_auth_headers()
         headers["Content-Type"] = "application/json"
         response = self.http_client.post(url=self.endpoint.url, content=body, headers=headers)
+        response.raise_for_status()
         res = response.content
         json_response = res.decode("utf-8")
         structured_response = json.loads(json_response)
@@ -87,7 +87,7 @@ def chat(
 
     total_data_sources_size: int = sum(
         map(
-            lambda ds_id: VectorStoreFactory.for_chunks(ds_id).size() or 0,
+            lambda ds_id: VectorStoreFactory.for_chunks(ds_id).stats().size or 0,
             session.get_all_data_source_ids(),
         )
     )
@@ -35,10 +35,12 @@
 #  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
 #  DATA.
 #
+import json
 import time
 import uuid
 from typing import Optional, Generator
 
+from llama_index.core.base.base_retriever import BaseRetriever
 from llama_index.core.base.llms.types import ChatResponse, ChatMessage
 from llama_index.core.chat_engine.types import (
     AgentChatResponse,
@@ -58,10 +60,12 @@ from app.services.chat_history.chat_history_manager import (
 from app.services.metadata_apis.session_metadata_api import Session
 from app.services.mlflow import record_direct_llm_mlflow_run
 from app.services.query import querier
+from app.services.query.chat_events import ChatEvent
 from app.services.query.chat_engine import (
     FlexibleContextChatEngine,
     build_flexible_chat_engine,
 )
+from app.services.query.multi_retriever import MultiSourceRetriever
 from app.services.query.querier import (
     build_retriever,
 )
@@ -89,7 +93,7 @@ def stream_chat(
     response_id = str(uuid.uuid4())
     total_data_sources_size: int = sum(
         map(
-            lambda ds_id: VectorStoreFactory.for_chunks(ds_id).size() or 0,
+            lambda ds_id: VectorStoreFactory.for_chunks(ds_id).stats().size or 0,
             session.get_all_data_source_ids(),
         )
     )
@@ -99,7 +103,7 @@ def stream_chat(
         # put a poison pill in the queue to stop the tool events stream
         return _stream_direct_llm_chat(session, response_id, query, user_name)
 
-    condensed_question, streaming_chat_response = build_streamer(
+    condensed_question, streaming_chat_response, retriever = build_streamer(
         query, query_configuration, session
     )
 
@@ -111,6 +115,27 @@ def stream_chat(
         user_name,
         condensed_question=condensed_question,
         streaming_chat_response=streaming_chat_response,
+        retriever=retriever,
+    )
+
+
+def _source_timings_event(
+    retriever: Optional[BaseRetriever],
+) -> Optional[ChatResponse]:
+    if not isinstance(retriever, MultiSourceRetriever):
+        return None
+    timings = retriever.drain_source_timings()
+    if not timings:
+        return None
+    return ChatResponse(
+        message=ChatMessage(content=""),
+        additional_kwargs={
+            "chat_event": ChatEvent(
+                type="retrieval",
+                name="source_timings",
+                data=json.dumps([timing.model_dump() for timing in timings]),
+            ),
+        },
     )
 
 
@@ -122,13 +147,22 @@ def _run_streaming_chat(
     user_name: Optional[str],
     streaming_chat_response: StreamingAgentChatResponse,
     condensed_question: Optional[str] = None,
+    retriever: Optional[BaseRetriever] = None,
 ) -> Generator[ChatResponse, None, None]:
+    # plain RAG has already retrieved by now; tool calling retrieves mid-stream,
+    # so its timings are reported once the stream is done
+    if timings_event := _source_timings_event(retriever):
+        yield timings_event
+
     response: ChatResponse = ChatResponse(message=ChatMessage(content=query))
     if streaming_chat_response.chat_stream:
         for response in streaming_chat_response.chat_stream:
             response.additional_kwargs["response_id"] = response_id
             yield response
 
+    if timings_event := _source_timings_event(retriever):
+        yield timings_event
+
     chat_response = AgentChatResponse(
         response=response.message.content or "",
         sources=streaming_chat_response.sources,
@@ -150,7 +184,7 @@ def build_streamer(
     query: str,
     query_configuration: QueryConfiguration,
     session: Session,
-) -> tuple[str | None, StreamingAgentChatResponse]:
+) -> tuple[str | None, StreamingAgentChatResponse, Optional[BaseRetriever]]:
     llm = models.LLM.get(model_name=query_configuration.model_name)
 
     retriever = build_retriever(
@@ -179,7 +213,7 @@ def build_streamer(
         chat_messages,
         session=session,
     )
-    return condensed_question, streaming_chat_response
+    return condensed_question, streaming_chat_response, retriever
 
 
 def _stream_direct_llm_chat(
@@ -36,10 +36,13 @@
 #  DATA.
 #
 
-import requests
 from pydantic import BaseModel
 
 from app.config import settings
+from app.services.metadata_apis.http_client import (
+    DEFAULT_TIMEOUT_SECONDS,
+    metadata_api_session,
+)
 from app.services.utils import raise_for_http_error, body_to_json
 
 
@@ -56,7 +59,9 @@ class MetadataMetrics(BaseModel):
 def get_metadata_metrics() -> MetadataMetrics:
     headers = {"Authorization": f"Bearer {settings.cdsw_apiv2_key}"}
 
-    response = requests.get(url_template(), headers=headers, verify=False)
+    response = metadata_api_session().get(
+        url_template(), headers=headers, verify=False, timeout=DEFAULT_TIMEOUT_SECONDS
+    )
     raise_for_http_error(response)
     data = body_to_json(response)
     return MetadataMetrics(
@@ -35,15 +35,25 @@
 #  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
 #  DATA.
 #
+import dataclasses
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
-
-import requests
+from typing import Iterable, Optional
 
 from app.config import settings
+from app.services.caching import StaleWhileRevalidateCache
+from app.services.metadata_apis.http_client import (
+    DEFAULT_TIMEOUT_SECONDS,
+    metadata_api_session,
+)
 from app.services.utils import raise_for_http_error, body_to_json
 
+logger = logging.getLogger(__name__)
+
+_BULK_FETCH_CONCURRENCY = 8
+
 
 @dataclass
 class RagDataSource:
@@ -66,10 +76,71 @@ def url_template() -> str:
     return settings.metadata_api_url + "/api/v1/rag/dataSources/{}"
 
 
+data_source_cache: StaleWhileRevalidateCache[int, RagDataSource] = (
+    StaleWhileRevalidateCache(
+        lambda: settings.metadata_cache_ttl_seconds,
+        lambda: settings.metadata_cache_stale_seconds,
+    )
+)
+
+
 def get_metadata(data_source_id: int) -> RagDataSource:
+    data_source = data_source_cache.get_or_load(
+        data_source_id, lambda: _fetch_metadata(data_source_id)
+    )
+    # callers get their own copy, so they can't modify the cached one
+    return dataclasses.replace(data_source)
+
+
+def get_metadata_bulk(data_source_ids: Iterable[int]) -> dict[int, RagDataSource]:
+    """
+    Returns the metadata of many data sources, fetching the uncached ones concurrently.
+
+    Data sources that can't be fetched are logged and left out.
+    """
+    unique_ids = list(dict.fromkeys(data_source_ids))
+    if not unique_ids:
+        return {}
+
+    def fetch(data_source_id: int) -> Optional[RagDataSource]:
+        try:
+            return get_metadata(data_source_id)
+        except Exception:
+            logger.warning(
+                "Failed to fetch metadata for data source %s",
+                data_source_id,
+                exc_info=True,
+            )
+            return None
+
+    with ThreadPoolExecutor(
+        max_workers=min(_BULK_FETCH_CONCURRENCY, len(unique_ids))
+    ) as executor:
+        fetched = list(executor.map(fetch, unique_ids))
+    return {
+        data_source_id: data_source
+        for data_source_id, data_source in zip(unique_ids, fetched)
+        if data_source is not None
+    }
+
+
+def invalidate(data_source_id: Optional[int] = None) -> None:
+    """Drops the cached metadata of `data_source_id`, or of every data source if it is None."""
+    if data_source_id is None:
+        data_source_cache.clear()
+    else:
+        data_source_cache.invalidate(data_source_id)
+
+
+def _fetch_metadata(data_source_id: int) -> RagDataSource:
     headers = {"Authorization": f"Bearer {settings.cdsw_apiv2_key}"}
 
-    response = requests.get(url_template().format(data_source_id), headers=headers, verify=False)
+    response = metadata_api_session().get(
+        url_template().format(data_source_id),
+        headers=headers,
+        verify=False,
+        timeout=DEFAULT_TIMEOUT_SECONDS,
+    )
     raise_for_http_error(response)
     data = body_to_json(response)
     return RagDataSource(
@@ -39,10 +39,14 @@ import dataclasses
 import json
 from typing import List, Any, Optional
 
-import requests
 from pydantic import BaseModel, ConfigDict, Field, alias_generators
 
 from app.config import settings
+from app.services.caching import StaleWhileRevalidateCache
+from app.services.metadata_apis.http_client import (
+    DEFAULT_TIMEOUT_SECONDS,
+    metadata_api_session,
+)
 from app.services.utils import raise_for_http_error, body_to_json
 
 
@@ -104,11 +108,38 @@ def url_template() -> str:
     return settings.metadata_api_url + "/api/v1/rag/sessions/{}"
 
 
+# Sessions are edited directly through the UI, so they are never served stale and only
+# cached long enough to cover the repeated lookups made while handling one request.
+session_cache: StaleWhileRevalidateCache[tuple[int, Optional[str]], Session] = (
+    StaleWhileRevalidateCache(lambda: settings.session_metadata_ttl_seconds, 0)
+)
+
+
 def get_session(session_id: int, user_name: Optional[str]) -> Session:
+    session = session_cache.get_or_load(
+        (session_id, user_name), lambda: _fetch_session(session_id, user_name)
+    )
+    # callers get their own copy, so they can't modify the cached one
+    return session.model_copy(deep=True)
+
+
+def invalidate(session_id: Optional[int] = None) -> None:
+    """Drops the cached copies of `session_id` for every user, or of every session if it is None."""
+    if session_id is None:
+        session_cache.clear()
+    else:
+        session_cache.invalidate_where(lambda key: key[0] == session_id)
+
+
+def _fetch_session(session_id: int, user_name: Optional[str]) -> Session:
     headers = {"remote-user": user_name} if user_name else {}
     headers["Authorization"] = f"Bearer {settings.cdsw_apiv2_key}"
 
-    response = requests.get(url_template().format(session_id), headers=headers)
+    response = metadata_api_session().get(
+        url_template().format(session_id),
+        headers=headers,
+        timeout=DEFAULT_TIMEOUT_SECONDS,
+    )
     raise_for_http_error(response)
     data = body_to_json(response)
     return session_from_java_response(data)
@@ -160,12 +191,13 @@ def update_session(session: Session, user_name: Optional[str]) -> Session:
         "Authorization": f"Bearer {settings.cdsw_apiv2_key}",
     }
 
-    response = requests.post(
+    response = metadata_api_session().post(
         url_template().format(updatable_session.id),
         data=json.dumps(updatable_session.__dict__, default=str),
         headers=headers,
         timeout=10,
         verify=False,
     )
+    invalidate(session.id)
     raise_for_http_error(response)
     return session_from_java_response(body_to_json(response))
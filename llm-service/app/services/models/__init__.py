@@ -35,13 +35,21 @@
 #  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
 #  DATA.
 #
+from ._registry import invalidate, warm_up
 from .embedding import Embedding
 from .llm import LLM
 from .providers import get_provider_class
 from .reranking import Reranking
 from ...config import ModelSource
 
-__all__ = ["Embedding", "LLM", "Reranking", "get_model_source"]
+__all__ = [
+    "Embedding",
+    "LLM",
+    "Reranking",
+    "get_model_source",
+    "invalidate",
+    "warm_up",
+]
 
 
 def get_model_source() -> ModelSource:
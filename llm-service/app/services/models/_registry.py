@@ -0,0 +1,117 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional, TypeVar, cast
+
+from .providers import get_provider_class, refresh_provider_class
+from .providers._model_provider import _ModelProvider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Each client, and when it stops being reused (None for never)
+_clients: dict[tuple[Hashable, ...], tuple[Any, Optional[float]]] = {}
+_lock = threading.Lock()
+
+
+def get_client(key: tuple[Hashable, ...], create: Callable[[], T]) -> T:
+    """
+    Return the long-lived model client for `key`, creating it on first use.
+
+    Clients are keyed by the resolved model provider as well as `key`, so switching providers never
+    returns a client built for the previous one. They are rebuilt once the provider's client TTL
+    has passed.
+    """
+    provider = get_provider_class()
+    full_key = (provider, *key)
+    now = time.monotonic()
+    with _lock:
+        entry = _clients.get(full_key)
+    if entry is not None and (entry[1] is None or now < entry[1]):
+        return cast(T, entry[0])
+    # built outside the lock, since this may involve network calls
+    client = create()
+    ttl = provider.get_client_ttl_seconds()
+    with _lock:
+        current = _clients.get(full_key)
+        if current is not None and current is not entry:
+            # another thread got there first
+            return cast(T, current[0])
+        _clients[full_key] = (client, None if ttl is None else now + ttl)
+    return client
+
+
+def invalidate() -> None:
+    """Forget the resolved model provider, cached model listings and all model clients."""
+    with _lock:
+        _clients.clear()
+    for ModelProviderSubcls in _ModelProvider.__subclasses__():
+        for method_name in (
+            "list_llm_models",
+            "list_embedding_models",
+            "list_reranking_models",
+            "get_llm_model",
+            "get_embedding_model",
+            "get_reranking_model",
+        ):
+            cache_clear = getattr(
+                getattr(ModelProviderSubcls, method_name), "cache_clear", None
+            )
+            if cache_clear is not None:
+                cache_clear()
+    refresh_provider_class()
+
+
+def warm_up() -> None:
+    """Resolve the model provider and create clients for the default models ahead of the first request."""
+    # imported here to avoid a circular import; the model types use this module
+    from . import Embedding, LLM
+
+    try:
+        model_provider = get_provider_class()
+        logger.info(
+            'warming up models for provider "%s"', model_provider.get_model_source()
+        )
+        LLM.get()
+        Embedding.get()
+    except Exception:
+        logger.exception("Failed to warm up models")
@@ -40,7 +40,7 @@ from typing import Optional
 from fastapi import HTTPException
 from llama_index.core.base.embeddings.base import BaseEmbedding
 
-from . import _model_type, _noop
+from . import _model_type, _noop, _registry
 from .providers import get_provider_class
 from ..caii.types import ModelResponse
 
@@ -51,7 +51,10 @@ class Embedding(_model_type.ModelType[BaseEmbedding]):
         if model_name is None:
             model_name = cls.list_available()[0].model_id
 
-        return get_provider_class().get_embedding_model(model_name)
+        return _registry.get_client(
+            ("embedding", model_name),
+            lambda: get_provider_class().get_embedding_model(model_name),
+        )
 
     @staticmethod
     def get_noop() -> BaseEmbedding:
@@ -40,7 +40,7 @@ from fastapi import HTTPException
 from llama_index.core import llms
 from llama_index.core.base.llms.types import ChatMessage, MessageRole
 
-from . import _model_type, _noop
+from . import _model_type, _noop, _registry
 from .providers import get_provider_class
 from ..caii.types import ModelResponse
 
@@ -51,7 +51,9 @@ class LLM(_model_type.ModelType[llms.LLM]):
         if not model_name:
             model_name = cls.list_available()[0].model_id
 
-        return get_provider_class().get_llm_model(model_name)
+        return _registry.get_client(
+            ("llm", model_name), lambda: get_provider_class().get_llm_model(model_name)
+        )
 
     @staticmethod
     def get_noop() -> llms.LLM:
@@ -36,6 +36,8 @@
 #  DATA.
 #
 import logging
+import threading
+from typing import Optional
 
 from app.config import settings
 from .azure import AzureModelProvider
@@ -52,10 +54,33 @@ __all__ = [
     "CAIIModelProvider",
     "OpenAiModelProvider",
     "get_provider_class",
+    "refresh_provider_class",
 ]
 
+_provider_class: Optional[type[_ModelProvider]] = None
+_provider_class_lock = threading.Lock()
+
 
 def get_provider_class() -> type[_ModelProvider]:
+    """Return the ModelProvider subclass to use, resolving it on first use."""
+    global _provider_class
+    provider_class = _provider_class
+    if provider_class is None:
+        with _provider_class_lock:
+            if _provider_class is None:
+                _provider_class = _resolve_provider_class()
+            provider_class = _provider_class
+    return provider_class
+
+
+def refresh_provider_class() -> None:
+    """Forget the resolved ModelProvider subclass, so it is resolved again on next use."""
+    global _provider_class
+    with _provider_class_lock:
+        _provider_class = None
+
+
+def _resolve_provider_class() -> type[_ModelProvider]:
     """Return the ModelProvider subclass for the given provider name."""
     model_providers: list[type[_ModelProvider]] = sorted(
         _ModelProvider.__subclasses__(),
@@ -37,6 +37,7 @@
 #
 import abc
 import os
+from typing import Optional
 
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.llms import LLM
@@ -74,6 +75,11 @@ class _ModelProvider(abc.ABC):
         """
         raise NotImplementedError
 
+    @staticmethod
+    def get_client_ttl_seconds() -> Optional[float]:
+        """Return how long a model client may be reused, or None if it never goes stale."""
+        return None
+
     @staticmethod
     @abc.abstractmethod
     def list_llm_models() -> list[ModelResponse]:
@@ -73,6 +73,12 @@ class CAIIModelProvider(_ModelProvider):
     def get_priority() -> int:
         return 4
 
+    @staticmethod
+    def get_client_ttl_seconds() -> Optional[float]:
+        # clients are built with the access token of the moment, so they are rebuilt to pick up a
+        # rotated one
+        return 300
+
     @staticmethod
     @timed_lru_cache(maxsize=1, seconds=300)
     def list_llm_models() -> list[ModelResponse]:
@@ -89,7 +95,6 @@ class CAIIModelProvider(_ModelProvider):
         return get_caii_reranking_models()
 
     @staticmethod
-    @timed_lru_cache(maxsize=32, seconds=300)
     def get_llm_model(name: str) -> LLM:
         endpoint = describe_endpoint(endpoint_name=name)
         return get_caii_llm_model(
@@ -99,12 +104,10 @@ class CAIIModelProvider(_ModelProvider):
         )
 
     @staticmethod
-    @timed_lru_cache(maxsize=32, seconds=300)
     def get_embedding_model(name: str) -> BaseEmbedding:
         return get_caii_embedding_model(model_name=name)
 
     @staticmethod
-    @timed_lru_cache(maxsize=32, seconds=300)
     def get_reranking_model(name: str, top_n: int) -> BaseNodePostprocessor:
         return get_caii_reranking_model(name, top_n)
 
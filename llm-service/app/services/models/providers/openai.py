@@ -35,6 +35,7 @@
 #  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
 #  DATA.
 #
+import functools
 import os
 from typing import Optional
 
@@ -95,7 +96,9 @@ class OpenAiModelProvider(_ModelProvider):
         return []
 
     @staticmethod
+    @functools.cache
     def _http_client() -> Optional[httpx.Client]:
+        """Connection-pooled client shared by all OpenAI models."""
         if os.path.exists("/etc/ssl/certs/ca-certificates.crt"):
             return httpx.Client(verify="/etc/ssl/certs/ca-certificates.crt")
         else:
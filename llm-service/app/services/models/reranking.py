@@ -41,7 +41,7 @@ from fastapi import HTTPException
 from llama_index.core.postprocessor.types import BaseNodePostprocessor
 from llama_index.core.schema import NodeWithScore, TextNode
 
-from . import _model_type
+from . import _model_type, _registry
 from .providers import get_provider_class
 from ..caii.types import ModelResponse
 from ..query.simple_reranker import SimpleReranker
@@ -57,7 +57,12 @@ class Reranking(_model_type.ModelType[BaseNodePostprocessor]):
         if not model_name:
             return SimpleReranker(top_n=top_n)
 
-        return get_provider_class().get_reranking_model(name=model_name, top_n=top_n)
+        return _registry.get_client(
+            ("reranking", model_name, top_n),
+            lambda: get_provider_class().get_reranking_model(
+                name=model_name, top_n=top_n
+            ),
+        )
 
     @staticmethod
     def get_noop() -> BaseNodePostprocessor:
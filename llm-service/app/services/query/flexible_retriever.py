@@ -49,6 +49,7 @@ from llama_index.core.schema import NodeWithScore
 from app.ai.indexing.summary_indexer import SummaryIndexer
 from app.services.metadata_apis.data_sources_metadata_api import get_metadata
 from app.services.query.query_configuration import QueryConfiguration
+from app.services.query.query_embeddings import embed_query
 
 logger = logging.getLogger(__name__)
 
@@ -71,6 +72,8 @@ class FlexibleRetriever(BaseRetriever):
 
     def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
         summarization_model = get_metadata(self.data_source_id).summarization_model
+        # a no-op cache hit when MultiSourceRetriever already embedded the query for this model
+        query_bundle = embed_query(self.embedding_model, query_bundle)
 
         base_retriever = VectorIndexRetriever(
             index=self.index,
@@ -88,7 +91,7 @@ class FlexibleRetriever(BaseRetriever):
 
         if summarization_model is not None and self.configuration.use_summary_filter:
             # add a filter to the retriever with the resulting document ids.
-            doc_ids = self._filter_doc_ids_by_summary(query_bundle.query_str)
+            doc_ids = self._filter_doc_ids_by_summary(query_bundle)
             if doc_ids:
                 simple_retriever = VectorIndexRetriever(
                     index=self.index,
@@ -104,7 +107,7 @@ class FlexibleRetriever(BaseRetriever):
             )
         return result_nodes
 
-    def _filter_doc_ids_by_summary(self, query_str: str) -> list[str] | None:
+    def _filter_doc_ids_by_summary(self, query_bundle: QueryBundle) -> list[str] | None:
         try:
             # first query the summary index to get documents to filter by (assuming summarization is enabled)
             summary_engine = SummaryIndexer(
@@ -113,9 +116,8 @@ class FlexibleRetriever(BaseRetriever):
                 embedding_model=self.embedding_model,
                 llm=self.llm,
             ).as_query_engine()
-            summaries: list[NodeWithScore] = summary_engine.retrieve(
-                QueryBundle(query_str)
-            )
+            # the summary index embeds with the same model, so the query vector carries over
+            summaries: list[NodeWithScore] = summary_engine.retrieve(query_bundle)
 
             def document_ids(node: NodeWithScore) -> str:
                 return cast(str, node.metadata["document_id"])
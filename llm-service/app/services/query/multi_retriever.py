@@ -35,24 +35,324 @@
 #  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
 #  DATA.
 #
-from typing import List
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import cache
+from typing import Any, Callable, List, Literal, TypeVar
 
 from llama_index.core import QueryBundle
 from llama_index.core.base.base_retriever import BaseRetriever
 from llama_index.core.schema import NodeWithScore
+from pydantic import BaseModel
 
+from app.ai.indexing.embedding_cache import model_key
+from app.config import settings
 from app.services.query.flexible_retriever import FlexibleRetriever
+from app.services.query.query_embeddings import embed_query
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SourceStatus = Literal["ok", "timeout", "overloaded", "error"]
+
+
+class SourceTiming(BaseModel):
+    data_source_id: int
+    seconds: float
+    status: SourceStatus
+    node_count: int = 0
+
+
+class RetrievalOverloadedError(Exception):
+    """The retrieval pool has no room for another call."""
+
+
+class _RetrievalPool:
+    """
+    Threads for retrieval calls, shared so concurrent chats can't spawn unbounded threads.
+
+    A call that outlives its deadline can't be stopped, and keeps its thread until it returns.
+    So that slow or hung sources can't make every later chat wait out its deadline in the
+    queue, calls that find the threads and the queue full are turned away at once, and queued
+    calls whose deadline has passed by the time a thread frees up are dropped without running.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="retrieval"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def submit(self, deadline: float, fn: Callable[..., T], *args: Any) -> Future[T]:
+        """
+        Runs `fn` on the pool, unless `deadline`, a `time.monotonic()`, passes first.
+
+        Raises RetrievalOverloadedError if the pool is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise RetrievalOverloadedError()
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(
+                context.run, _run_before, deadline, fn, *args
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+def _run_before(deadline: float, fn: Callable[..., T], *args: Any) -> T:
+    if time.monotonic() >= deadline:
+        raise TimeoutError("the deadline passed before a retrieval thread was free")
+    return fn(*args)
+
+
+@cache
+def _pool() -> _RetrievalPool:
+    return _RetrievalPool(
+        settings.retrieval_max_concurrency, settings.retrieval_max_queued
+    )
+
+
+def _timed_retrieve(
+    retriever: BaseRetriever, query_bundle: QueryBundle
+) -> tuple[list[NodeWithScore], float]:
+    start = time.perf_counter()
+    nodes = retriever.retrieve(query_bundle)
+    return nodes, time.perf_counter() - start
+
+
+async def _aretrieve_with(
+    retriever: BaseRetriever, query_bundle: QueryBundle, deadline: float
+) -> list[NodeWithScore]:
+    if type(retriever)._aretrieve is not BaseRetriever._aretrieve:
+        return await retriever.aretrieve(query_bundle)
+    # the default _aretrieve just calls _retrieve on the event loop, which would
+    # serialize the sources and defeat the deadline, so run it on the pool instead
+    return await asyncio.wrap_future(
+        _pool().submit(deadline, retriever.retrieve, query_bundle)
+    )
 
 
 class MultiSourceRetriever(BaseRetriever):
-    def __init__(self, retrievers: list[FlexibleRetriever]):
+    """
+    Queries every data source concurrently.
+
+    Each source gets ``RETRIEVAL_SOURCE_TIMEOUT_SECONDS`` to answer; sources that
+    time out, don't fit in the retrieval pool or fail are logged and left out, so the
+    answer is built from whatever came back in time.
+    """
+
+    def __init__(
+        self,
+        retrievers: list[FlexibleRetriever],
+        timeout_seconds: float | None = None,
+    ):
         super().__init__()
         self.retrievers = retrievers
+        self.timeout_seconds = (
+            timeout_seconds
+            if timeout_seconds is not None
+            else settings.retrieval_source_timeout_seconds
+        )
+        self._timings: list[SourceTiming] = []
+        self._timings_lock = threading.Lock()
+
+    def drain_source_timings(self) -> list[SourceTiming]:
+        """Timings recorded since the last call, oldest first."""
+        with self._timings_lock:
+            timings, self._timings = self._timings, []
+        return timings
+
+    def _record(self, timings: list[SourceTiming]) -> None:
+        with self._timings_lock:
+            self._timings.extend(timings)
 
     def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if len(self.retrievers) == 1:
+            return self._retrieve_inline(self.retrievers[0], query_bundle)
+
+        bundles = self._query_bundles(query_bundle)
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout_seconds
+        futures: list[Future[tuple[list[NodeWithScore], float]] | None] = [
+            self._submit(
+                deadline, retriever, bundles[model_key(retriever.embedding_model)]
+            )
+            for retriever in self.retrievers
+        ]
+        wait(
+            [future for future in futures if future is not None],
+            timeout=max(0.0, deadline - time.monotonic()),
+        )
+
         results: list[NodeWithScore] = []
+        timings: list[SourceTiming] = []
+        for retriever, future in zip(self.retrievers, futures):
+            if future is None:
+                timings.append(self._overloaded(retriever))
+                continue
+            if not future.done():
+                # only stops it if it is still queued
+                future.cancel()
+                timings.append(self._timed_out(retriever))
+                continue
+            try:
+                nodes, seconds = future.result()
+            except TimeoutError:
+                timings.append(self._timed_out(retriever))
+                continue
+            except Exception:
+                timings.append(self._failed(retriever, time.perf_counter() - start))
+                continue
+            results.extend(nodes)
+            timings.append(
+                SourceTiming(
+                    data_source_id=retriever.data_source_id,
+                    seconds=seconds,
+                    status="ok",
+                    node_count=len(nodes),
+                )
+            )
+        self._record(timings)
+        return results
+
+    @staticmethod
+    def _submit(
+        deadline: float, retriever: FlexibleRetriever, query_bundle: QueryBundle
+    ) -> Future[tuple[list[NodeWithScore], float]] | None:
+        """Queries `retriever` on the pool, or returns None if the pool is full."""
+        try:
+            return _pool().submit(deadline, _timed_retrieve, retriever, query_bundle)
+        except RetrievalOverloadedError:
+            return None
+
+    def _query_bundles(self, query_bundle: QueryBundle) -> dict[str, QueryBundle]:
+        """Embeds the query once per distinct embedding model among the sources."""
+        bundles: dict[str, QueryBundle] = {}
         for retriever in self.retrievers:
-            results.extend(retriever.retrieve(query_bundle))
+            key = model_key(retriever.embedding_model)
+            if key in bundles:
+                continue
+            try:
+                bundles[key] = embed_query(retriever.embedding_model, query_bundle)
+            except Exception:
+                # leave it to each source to retry and report the failure on its own
+                logger.warning("Failed to embed the query with %s", key, exc_info=True)
+                bundles[key] = query_bundle
+        return bundles
+
+    def _retrieve_inline(
+        self, retriever: FlexibleRetriever, query_bundle: QueryBundle
+    ) -> list[NodeWithScore]:
+        # a single source has no partial results to fall back on, so errors
+        # propagate as before; it still runs on the pool to get the same deadline
+        future = self._submit(
+            time.monotonic() + self.timeout_seconds, retriever, query_bundle
+        )
+        if future is None:
+            self._record([self._overloaded(retriever)])
+            return []
+        try:
+            nodes, seconds = future.result(timeout=self.timeout_seconds)
+        except (FutureTimeoutError, TimeoutError):
+            future.cancel()
+            self._record([self._timed_out(retriever)])
+            return []
+        self._record(
+            [
+                SourceTiming(
+                    data_source_id=retriever.data_source_id,
+                    seconds=seconds,
+                    status="ok",
+                    node_count=len(nodes),
+                )
+            ]
+        )
+        return nodes
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        bundles = await asyncio.to_thread(self._query_bundles, query_bundle)
+        deadline = time.monotonic() + self.timeout_seconds
+        outcomes = await asyncio.gather(
+            *(
+                self._aretrieve_one(
+                    retriever, bundles[model_key(retriever.embedding_model)], deadline
+                )
+                for retriever in self.retrievers
+            )
+        )
+        results: list[NodeWithScore] = []
+        timings: list[SourceTiming] = []
+        for nodes, timing in outcomes:
+            results.extend(nodes)
+            timings.append(timing)
+        self._record(timings)
         return results
 
+    async def _aretrieve_one(
+        self, retriever: FlexibleRetriever, query_bundle: QueryBundle, deadline: float
+    ) -> tuple[list[NodeWithScore], SourceTiming]:
+        start = time.perf_counter()
+        try:
+            nodes = await asyncio.wait_for(
+                _aretrieve_with(retriever, query_bundle, deadline),
+                timeout=max(0.0, deadline - time.monotonic()),
+            )
+        except (asyncio.TimeoutError, TimeoutError):
+            return [], self._timed_out(retriever)
+        except RetrievalOverloadedError:
+            return [], self._overloaded(retriever)
+        except Exception:
+            return [], self._failed(retriever, time.perf_counter() - start)
+        return nodes, SourceTiming(
+            data_source_id=retriever.data_source_id,
+            seconds=time.perf_counter() - start,
+            status="ok",
+            node_count=len(nodes),
+        )
+
+    def _timed_out(self, retriever: FlexibleRetriever) -> SourceTiming:
+        logger.warning(
+            "Retrieval from data source %s did not finish within %ss; continuing without it",
+            retriever.data_source_id,
+            self.timeout_seconds,
+        )
+        return SourceTiming(
+            data_source_id=retriever.data_source_id,
+            seconds=self.timeout_seconds,
+            status="timeout",
+        )
+
+    @staticmethod
+    def _overloaded(retriever: FlexibleRetriever) -> SourceTiming:
+        logger.warning(
+            "No room in the retrieval pool for data source %s; continuing without it",
+            retriever.data_source_id,
+        )
+        return SourceTiming(
+            data_source_id=retriever.data_source_id,
+            seconds=0.0,
+            status="overloaded",
+        )
 
+    @staticmethod
+    def _failed(retriever: FlexibleRetriever, seconds: float) -> SourceTiming:
+        logger.warning(
+            "Retrieval from data source %s failed; continuing without it",
+            retriever.data_source_id,
+            exc_info=True,
+        )
+        return SourceTiming(
+            data_source_id=retriever.data_source_id,
+            seconds=seconds,
+            status="error",
+        )
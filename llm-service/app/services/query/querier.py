@@ -52,6 +52,7 @@ from .agents.tool_calling_querier import (
 )
 from .flexible_retriever import FlexibleRetriever
 from .multi_retriever import MultiSourceRetriever
+from ..metadata_apis import data_sources_metadata_api
 from ..metadata_apis.session_metadata_api import Session
 from ...config import ModelSource
 from ..models import get_model_source
@@ -177,7 +178,7 @@ def get_nodes_from_output(
             for ds_id in extracted_data_source_ids:
                 node_ids = list(source_node_ids_w_score.keys())
                 qdrant_store = VectorStoreFactory.for_chunks(ds_id)
-                if not qdrant_store or not qdrant_store.size():
+                if not qdrant_store or not qdrant_store.stats().size:
                     continue
                 vector_store = qdrant_store.llama_vector_store()
                 extracted_source_nodes = vector_store.get_nodes(node_ids=node_ids)
@@ -265,13 +266,21 @@ def build_retriever(
     data_source_ids: list[int],
     llm: LLM,
 ) -> Optional[BaseRetriever]:
+    # warm the metadata cache for all sources at once; each retriever reads it per query
+    data_sources_metadata_api.get_metadata_bulk(
+        [
+            data_source_id
+            for data_source_id in data_source_ids
+            if data_source_id is not None
+        ]
+    )
     retrievers: list[FlexibleRetriever] = []
     for data_source_id in data_source_ids:
         if data_source_id is None:
             continue
 
         chunks = VectorStoreFactory.for_chunks(data_source_id)
-        if not chunks or not chunks.size():
+        if not chunks or not chunks.stats().size:
             continue
 
         embedding_model, vector_store = build_datasource_query_components(
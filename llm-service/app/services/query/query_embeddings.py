@@ -0,0 +1,75 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2025
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+from llama_index.core import QueryBundle
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+
+from app.ai.indexing.embedding_cache import model_key
+from app.config import settings
+from app.services.caching import TtlCache
+
+# Long enough to cover follow-up and suggested questions, short enough that a
+# model redeployed under the same name doesn't serve stale vectors for long.
+QUERY_EMBEDDING_TTL_SECONDS = 60 * 60
+
+query_embedding_cache: TtlCache[tuple[str, tuple[str, ...]], Embedding] = TtlCache(
+    QUERY_EMBEDDING_TTL_SECONDS, maxsize=settings.query_embedding_cache_size
+)
+
+
+def embed_query(
+    embedding_model: BaseEmbedding, query_bundle: QueryBundle
+) -> QueryBundle:
+    """
+    Return a copy of `query_bundle` carrying its embedding under `embedding_model`.
+
+    Vectors are cached per (embedding model, embedding strings), so each data source
+    sharing a model, and the summary-filter pass, reuse one embedding call.
+    """
+    embedding_strs = tuple(query_bundle.embedding_strs)
+    if not embedding_strs:
+        return query_bundle
+    embedding = query_embedding_cache.get_or_load(
+        (model_key(embedding_model), embedding_strs),
+        lambda: embedding_model.get_agg_embedding_from_queries(list(embedding_strs)),
+    )
+    return QueryBundle(
+        query_str=query_bundle.query_str,
+        image_path=query_bundle.image_path,
+        custom_embedding_strs=query_bundle.custom_embedding_strs,
+        embedding=embedding,
+    )
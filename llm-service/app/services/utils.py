@@ -44,6 +44,7 @@ from functools import lru_cache
 from typing import (
     Callable,
     Generator,
+    Iterable,
     List,
     Sequence,
     Tuple,
@@ -102,7 +103,7 @@ T = TypeVar("T")
 
 
 def batch_sequence(
-    sequence: Union[Sequence[T], Generator[T, None, None]], batch_size: int
+    sequence: Union[Sequence[T], Iterable[T]], batch_size: int
 ) -> Generator[List[T], None, None]:
     batch = []
     for val in sequence:
@@ -220,6 +221,7 @@ def timed_lru_cache(seconds: int, maxsize: int = 128) -> Callable[[C], C]:
                 cached_func.expiration = time.monotonic() + seconds  # type: ignore
             return cast(C, cached_func(*args, **kwargs))
 
+        wrapped_func.cache_clear = cached_func.cache_clear  # type: ignore
         return cast(C, wrapped_func)
 
     return wrapper_cache
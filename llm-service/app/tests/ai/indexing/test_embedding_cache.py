@@ -0,0 +1,112 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import os
+
+import pytest
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+
+from app.ai.indexing.embedding_cache import (
+    EmbeddingCache,
+    embed_with_cache,
+    get_embedding_cache,
+)
+
+
+class CountingEmbeddingModel(BaseEmbedding):
+    calls: int = 0
+    embedded: int = 0
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._get_text_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_text_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return [float(len(text)), 0.5]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        self.calls += 1
+        self.embedded += len(texts)
+        return [self._get_text_embedding(text) for text in texts]
+
+
+class TestEmbeddingCache:
+    @staticmethod
+    def test_only_embeds_uncached_texts() -> None:
+        model = CountingEmbeddingModel()
+        assert embed_with_cache(model, ["one", "two"]) == [[3.0, 0.5], [3.0, 0.5]]
+        assert model.embedded == 2
+
+        embeddings = embed_with_cache(model, ["two", "three", " one\n"])
+        assert embeddings == [[3.0, 0.5], [5.0, 0.5], [3.0, 0.5]]
+        assert model.embedded == 3
+
+        embed_with_cache(model, ["three", "one"])
+        assert model.calls == 2
+
+    @staticmethod
+    def test_keyed_by_model() -> None:
+        model = CountingEmbeddingModel()
+        other_model = CountingEmbeddingModel(model_name="other")
+        embed_with_cache(model, ["one"])
+        embed_with_cache(other_model, ["one"])
+        assert model.embedded == 1
+        assert other_model.embedded == 1
+
+    @staticmethod
+    def test_evicts_least_recently_used(databases_dir: str) -> None:
+        cache = EmbeddingCache(os.path.join(databases_dir, "lru.sqlite"), 10)
+        texts = [f"text {i}" for i in range(10)]
+        cache.put_many("model", texts, [[float(i)] for i in range(10)])
+        assert cache.get_many("model", ["text 0"]) == [[0.0]]
+
+        cache.put_many("model", ["new text"], [[1.0]])
+
+        assert len(cache) == 10
+        assert cache.get_many("model", ["text 0", "new text"]) == [[0.0], [1.0]]
+        assert cache.get_many("model", texts[1:]).count(None) == 1
+
+    @staticmethod
+    def test_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+        assert get_embedding_cache() is None
+        model = CountingEmbeddingModel()
+        embed_with_cache(model, ["one"])
+        embed_with_cache(model, ["one"])
+        assert model.embedded == 2
@@ -0,0 +1,144 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+from typing import Any, Optional
+
+import httpx
+import pytest
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+
+from app.ai.indexing import embedding_controller
+from app.ai.indexing.embedding_controller import (
+    get_controller,
+    operating_points,
+    save_operating_points,
+)
+
+
+def _http_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://embeddings")
+    return httpx.HTTPStatusError(
+        "error", request=request, response=httpx.Response(status_code, request=request)
+    )
+
+
+class FlakyEmbeddingModel(BaseEmbedding):
+    failures: list[Exception] = []
+    max_batch_size: Optional[int] = None
+    batch_sizes: list[int] = []
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return [0.1]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return [0.1]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return [0.1]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        self.batch_sizes.append(len(texts))
+        if self.failures:
+            raise self.failures.pop(0)
+        if self.max_batch_size is not None and len(texts) > self.max_batch_size:
+            raise _http_error(413)
+        return [[0.1] for _ in texts]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(embedding_controller, "_backoff_seconds", lambda attempt: 0)
+
+
+def _embed(model: BaseEmbedding, count: int) -> list[Embedding]:
+    return get_controller(model).embed(model, [f"text {i}" for i in range(count)])
+
+
+def test_throttling_halves_concurrency_and_retries() -> None:
+    model = FlakyEmbeddingModel(
+        model_name="flaky", failures=[_http_error(429), _http_error(429)]
+    )
+    assert len(_embed(model, 10)) == 10
+
+    point = get_controller(model).operating_point()
+    assert point.concurrency == 7
+    assert point.throttled == 2
+    assert point.requests == 1
+
+
+def test_timeouts_halve_batch_size() -> None:
+    model = FlakyEmbeddingModel(model_name="slow", failures=[httpx.ReadTimeout("slow")])
+    _embed(model, 10)
+
+    point = get_controller(model).operating_point()
+    assert point.batch_size == 50
+    assert point.timeouts == 1
+
+
+def test_oversized_batches_are_split() -> None:
+    model = FlakyEmbeddingModel(model_name="small", max_batch_size=30)
+    assert len(_embed(model, 100)) == 100
+
+    assert model.batch_sizes == [100, 50, 25, 25, 25, 25]
+    assert get_controller(model).batch_size == 25
+
+
+def test_other_errors_are_raised() -> None:
+    model = FlakyEmbeddingModel(model_name="broken", failures=[_http_error(401)])
+    with pytest.raises(httpx.HTTPStatusError):
+        _embed(model, 10)
+
+
+def test_grows_while_latency_is_low(monkeypatch: pytest.MonkeyPatch) -> None:
+    model = FlakyEmbeddingModel(model_name="fast")
+    for _ in range(15):
+        _embed(model, 10)
+
+    point = get_controller(model).operating_point()
+    assert point.concurrency == 16
+    assert point.batch_size == 116
+
+
+def test_operating_points_are_persisted(monkeypatch: pytest.MonkeyPatch) -> None:
+    model = FlakyEmbeddingModel(model_name="remembered", failures=[_http_error(429)])
+    _embed(model, 10)
+    save_operating_points()
+
+    monkeypatch.setattr(embedding_controller, "_registries", {})
+    points: dict[str, Any] = {point.model: point for point in operating_points()}
+    assert points["FlakyEmbeddingModel:remembered"].concurrency == 7
+    assert get_controller(model).concurrency == 7
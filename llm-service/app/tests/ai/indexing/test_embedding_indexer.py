@@ -0,0 +1,145 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import TextNode
+
+from app.ai.indexing.embedding_indexer import EmbeddingIndexer
+from app.ai.indexing.readers.base_reader import ChunksResult
+from app.ai.indexing.readers.csv import CSVReader
+from app.ai.vector_stores.qdrant import QdrantVectorStore
+
+from ....services import models
+
+
+def _index_csv(
+    indexer: EmbeddingIndexer, path: Path, document_id: str, content: str
+) -> None:
+    path.write_text(content)
+    indexer.index_file(path, document_id)
+
+
+def test_reindex_only_replaces_changed_chunks(tmp_path: Path) -> None:
+    data_source_id = 1
+    document_id = str(uuid.uuid4())
+    other_document_id = str(uuid.uuid4())
+    vector_store = QdrantVectorStore.for_chunks(data_source_id)
+    indexer = EmbeddingIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=100, chunk_overlap=0),
+        embedding_model=models.Embedding.get("dummy_model"),
+        chunks_vector_store=vector_store,
+        llm=None,
+    )
+    path = tmp_path / "people.csv"
+
+    _index_csv(indexer, path, document_id, "name,age\nJohn,25\nJane,30\nJim,35")
+    _index_csv(indexer, path, other_document_id, "name,age\nJill,40")
+    original_ids = vector_store.document_node_ids(document_id)
+    assert len(original_ids) == 3
+
+    _index_csv(indexer, path, document_id, "name,age\nJohn,25\nJane,30\nJim,35")
+    assert vector_store.document_node_ids(document_id) == original_ids
+
+    _index_csv(indexer, path, document_id, "name,age\nJohn,25\nJane,31")
+    updated_ids = vector_store.document_node_ids(document_id)
+    assert len(updated_ids) == 2
+    assert len(updated_ids & original_ids) == 1
+    assert vector_store.size() == 3
+    assert len(vector_store.document_node_ids(other_document_id)) == 1
+
+
+def test_indexing_updates_collection_stats(tmp_path: Path) -> None:
+    data_source_id = 2
+    document_id = str(uuid.uuid4())
+    vector_store = QdrantVectorStore.for_chunks(data_source_id)
+    indexer = EmbeddingIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=100, chunk_overlap=0),
+        embedding_model=models.Embedding.get("dummy_model"),
+        chunks_vector_store=vector_store,
+        llm=None,
+    )
+    assert not vector_store.stats().exists
+
+    _index_csv(indexer, tmp_path / "people.csv", document_id, "name,age\nJohn,25")
+    stats = vector_store.stats()
+    assert stats.exists
+    assert stats.size == 1
+    assert stats.dimension == 1024
+
+    vector_store.delete()
+    assert not vector_store.stats().exists
+
+
+def test_failed_reindex_keeps_only_the_previous_version(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    data_source_id = 3
+    document_id = str(uuid.uuid4())
+    vector_store = QdrantVectorStore.for_chunks(data_source_id)
+    indexer = EmbeddingIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=100, chunk_overlap=0),
+        embedding_model=models.Embedding.get("dummy_model"),
+        chunks_vector_store=vector_store,
+        llm=None,
+    )
+    path = tmp_path / "people.csv"
+    _index_csv(indexer, path, document_id, "name,age\nJohn,25\nJane,30")
+    original_ids = vector_store.document_node_ids(document_id)
+
+    iter_chunks = CSVReader.iter_chunks
+
+    def fail_after_all_rows(
+        self: CSVReader, file_path: Path, result: ChunksResult
+    ) -> Iterator[TextNode]:
+        yield from iter_chunks(self, file_path, result)
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(CSVReader, "iter_chunks", fail_after_all_rows)
+    # enough rows for some of them to be upserted before the failure
+    rows = "".join(f"Person {i},{i}\n" for i in range(3000))
+    with pytest.raises(RuntimeError):
+        _index_csv(indexer, path, document_id, "name,age\n" + rows)
+
+    assert vector_store.document_node_ids(document_id) == original_ids
@@ -0,0 +1,195 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import uuid
+from pathlib import Path
+
+import pytest
+from llama_index.core.node_parser import SentenceSplitter
+
+from app.ai.indexing.embedding_indexer import EmbeddingIndexer
+from app.ai.indexing.ingestion import index_stored_file, parse_stored_file
+from app.ai.indexing.readers.base_reader import (
+    ChunksResult,
+    ParsedDocument,
+    ReaderConfig,
+)
+from app.ai.indexing.readers.csv import CSVReader
+from app.ai.indexing.readers.markdown import MdReader
+from app.ai.indexing.summary_indexer import SummaryIndexer
+from app.ai.vector_stores.qdrant import QdrantVectorStore
+
+from ....services import models
+from ...conftest import BotoObject
+
+
+@pytest.mark.parametrize(
+    "reader_cls, file_name, content",
+    [
+        (
+            MdReader,
+            "notes.md",
+            "# Title\n\nSome text. " * 40 + "\n\n## Section\n\nMore text. " * 40,
+        ),
+        (CSVReader, "people.csv", "name,age\nJohn,25\nJane,30\nJim,35"),
+    ],
+)
+def test_chunking_a_parse_matches_streaming(
+    tmp_path: Path, reader_cls: type[MdReader | CSVReader], file_name: str, content: str
+) -> None:
+    path = tmp_path / file_name
+    path.write_text(content)
+    reader = reader_cls(
+        splitter=SentenceSplitter(chunk_size=64, chunk_overlap=0),
+        document_id="document",
+        data_source_id=1,
+    )
+
+    chunked = reader.chunk(reader.parse(path)).chunks
+    streamed = list(reader.iter_chunks(path, ChunksResult()))
+
+    assert len(chunked) > 1
+    assert [(c.text, c.metadata) for c in chunked] == [
+        (c.text, c.metadata) for c in streamed
+    ]
+
+
+def test_embedding_and_summary_indexers_share_a_parse(
+    s3_object: BotoObject, test_file: Path
+) -> None:
+    data_source_id = 1
+    document_id = str(uuid.uuid4())
+    embedding_indexer = EmbeddingIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=100, chunk_overlap=0),
+        embedding_model=models.Embedding.get("dummy_model"),
+        chunks_vector_store=QdrantVectorStore.for_chunks(data_source_id),
+        llm=None,
+    )
+    summary_indexer = SummaryIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=2048),
+        llm=models.LLM.get("dummy_model"),
+        embedding_model=models.Embedding.get("dummy_model"),
+    )
+
+    parsed_file = parse_stored_file(
+        embedding_indexer, document_id, s3_object.bucket_name, s3_object.key, "test.txt"
+    )
+    test_file.unlink()
+
+    assert (
+        parse_stored_file(
+            summary_indexer,
+            document_id,
+            s3_object.bucket_name,
+            s3_object.key,
+            "test.txt",
+        )
+        is parsed_file
+    )
+    assert parsed_file.size_bytes > 0
+    summary_indexer.index_parsed_document(parsed_file.document, document_id)
+    assert summary_indexer.get_summary(document_id)
+
+
+@pytest.mark.parametrize("max_bytes, handed_off", [(2 * 1024**2, True), (0, False)])
+def test_only_small_files_are_handed_off(
+    monkeypatch: pytest.MonkeyPatch,
+    s3_object: BotoObject,
+    test_file: Path,
+    max_bytes: int,
+    handed_off: bool,
+) -> None:
+    monkeypatch.setenv("PARSED_DOCUMENT_HANDOFF_MAX_BYTES", str(max_bytes))
+    data_source_id = 1
+    document_id = str(uuid.uuid4())
+    chunks_vector_store = QdrantVectorStore.for_chunks(data_source_id)
+    embedding_indexer = EmbeddingIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=100, chunk_overlap=0),
+        embedding_model=models.Embedding.get("dummy_model"),
+        chunks_vector_store=chunks_vector_store,
+        llm=None,
+    )
+
+    size_bytes = index_stored_file(
+        embedding_indexer, document_id, s3_object.bucket_name, s3_object.key, "test.txt"
+    )
+
+    assert size_bytes == test_file.stat().st_size
+    assert chunks_vector_store.size()
+
+    summary_indexer = SummaryIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=2048),
+        llm=models.LLM.get("dummy_model"),
+        embedding_model=models.Embedding.get("dummy_model"),
+    )
+    parses: list[str] = []
+    parse_file = summary_indexer.parse_file
+
+    def counting_parse_file(file_path: Path, doc_id: str) -> ParsedDocument:
+        parses.append(doc_id)
+        return parse_file(file_path, doc_id)
+
+    monkeypatch.setattr(summary_indexer, "parse_file", counting_parse_file)
+    parse_stored_file(
+        summary_indexer, document_id, s3_object.bucket_name, s3_object.key, "test.txt"
+    )
+    assert (not parses) is handed_off
+
+
+def test_reader_config_only_keys_the_readers_that_use_it() -> None:
+    default = SummaryIndexer(
+        1,
+        splitter=SentenceSplitter(chunk_size=2048),
+        llm=models.LLM.get("dummy_model"),
+        embedding_model=models.Embedding.get("dummy_model"),
+    )
+    packed = SummaryIndexer(
+        1,
+        splitter=SentenceSplitter(chunk_size=2048),
+        llm=models.LLM.get("dummy_model"),
+        embedding_model=models.Embedding.get("dummy_model"),
+        reader_config=ReaderConfig(rows_per_chunk=10, columns=("name",)),
+    )
+
+    assert packed.parser_key(Path("notes.txt")) == default.parser_key(Path("notes.txt"))
+    assert packed.parser_key(Path("people.csv")) != default.parser_key(
+        Path("people.csv")
+    )
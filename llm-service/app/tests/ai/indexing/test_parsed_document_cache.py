@@ -0,0 +1,270 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import os
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Set
+
+import pytest
+from llama_index.core.node_parser import SentenceSplitter
+
+from app.ai.indexing.parsed_document_cache import (
+    STALE_TEMPORARY_FILE_SECONDS,
+    LocalCacheEntries,
+    ParsedDocumentCache,
+)
+from app.ai.indexing.readers.base_reader import (
+    BaseReader,
+    ParsedDocument,
+    ParsedSegment,
+    ReaderConfig,
+)
+
+
+class CountingReader(BaseReader):
+    """
+    Yields a segment per line, and records a secret for lines starting with "secret", and PII
+    for lines starting with "pii".
+    """
+
+    def __init__(
+        self,
+        cache: ParsedDocumentCache,
+        config: Optional[ReaderConfig] = None,
+        document_id: str = "document",
+        data_source_id: int = 1,
+    ):
+        super().__init__(
+            splitter=SentenceSplitter(chunk_size=64, chunk_overlap=0),
+            document_id=document_id,
+            data_source_id=data_source_id,
+            config=config,
+            cache=cache,
+        )
+        self.parses = 0
+
+    def iter_segments(
+        self, file_path: Path, parsed: ParsedDocument
+    ) -> Iterator[ParsedSegment]:
+        self.parses += 1
+        secret_types: Set[str] = set()
+        for number, line in enumerate(file_path.read_text().splitlines()):
+            if line.startswith("secret"):
+                secret_types.add("Secret Keyword")
+            if line.startswith("pii"):
+                parsed.pii_found = True
+            yield ParsedSegment(
+                text=line,
+                metadata={"line_number": number},
+                page_starts=[(0, str(number))],
+            )
+        parsed.secret_types = secret_types or None
+
+
+class NewerCountingReader(CountingReader):
+    parser_version = 2
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ParsedDocumentCache:
+    return ParsedDocumentCache(
+        LocalCacheEntries(str(tmp_path / "cache")), max_bytes=1024**2
+    )
+
+
+def test_second_parse_comes_from_the_cache(
+    tmp_path: Path, cache: ParsedDocumentCache
+) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_text("first line\nsecond line")
+    reader = CountingReader(cache)
+
+    parsed = reader.parse(path)
+    again = reader.parse(path)
+
+    assert reader.parses == 1
+    assert again == parsed
+    assert again.segments[1] == ParsedSegment(
+        text="second line", metadata={"line_number": 1}, page_starts=[(0, "1")]
+    )
+
+    renamed = tmp_path / "renamed.txt"
+    path.rename(renamed)
+    assert reader.parse(renamed).file_name == "renamed.txt"
+    assert reader.parses == 1
+
+
+def test_cache_is_keyed_by_content_config_and_version(
+    tmp_path: Path, cache: ParsedDocumentCache
+) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_text("first line")
+    reader = CountingReader(cache)
+    reader.parse(path)
+
+    path.write_text("changed line")
+    assert reader.parse(path).segments[0].text == "changed line"
+    assert reader.parses == 2
+
+    CountingReader(cache, ReaderConfig(anonymize_pii=True)).parse(path)
+    assert reader.parses == 2
+
+    newer_reader = NewerCountingReader(cache)
+    newer_reader.parse(path)
+    assert newer_reader.parses == 1
+
+
+def test_cache_ignores_config_the_reader_does_not_use(
+    tmp_path: Path, cache: ParsedDocumentCache
+) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_text("first line")
+    reader = CountingReader(cache)
+    tabular_reader = CountingReader(cache, ReaderConfig(rows_per_chunk=10))
+
+    assert cache.entry_name(tabular_reader, path) == cache.entry_name(reader, path)
+
+
+def test_cached_findings(tmp_path: Path, cache: ParsedDocumentCache) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_text("pii = John Smith")
+    reader = CountingReader(cache)
+    reader.parse(path)
+
+    parsed = reader.parse(path)
+
+    assert reader.parses == 1
+    assert parsed.pii_found
+
+
+def test_parses_with_secrets_are_not_cached(
+    tmp_path: Path, cache: ParsedDocumentCache
+) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_text("first line\nsecret = hunter2")
+    reader = CountingReader(cache)
+    reader.parse(path)
+
+    parsed = reader.parse(path)
+
+    assert reader.parses == 2
+    assert parsed.secret_types == {"Secret Keyword"}
+    assert cache.entries.list() == []
+
+
+def test_abandoned_parse_is_not_cached(
+    tmp_path: Path, cache: ParsedDocumentCache
+) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_text("first line\nsecond line")
+    reader = CountingReader(cache)
+
+    segments = cache.segments(reader, path, ParsedDocument(file_name=path.name))
+    next(segments)
+    segments.close()
+
+    assert os.listdir(tmp_path / "cache") == []
+    reader.parse(path)
+    assert reader.parses == 2
+
+
+def test_evicts_least_recently_used(tmp_path: Path) -> None:
+    entries = LocalCacheEntries(str(tmp_path / "cache"))
+    cache = ParsedDocumentCache(entries, max_bytes=1024**2)
+    reader = CountingReader(cache)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.txt"
+        path.write_text(f"line {i}")
+        reader.parse(path)
+        paths.append(path)
+    names = [cache.entry_name(reader, path) for path in paths]
+    for age, name in enumerate(reversed(names)):
+        os.utime(os.path.join(entries.directory, name), (1000 - age, 1000 - age))
+    used = entries.open(names[0])
+    assert used is not None
+    used.close()
+    cache.max_bytes = sum(entry.size for entry in entries.list()) - 1
+
+    cache.evict()
+
+    assert sorted(entry.name for entry in entries.list()) == sorted(
+        [names[0], names[2]]
+    )
+
+
+def test_purges_the_entries_of_deleted_documents(
+    tmp_path: Path, cache: ParsedDocumentCache
+) -> None:
+    readers = {
+        (data_source_id, document_id): CountingReader(
+            cache, document_id=document_id, data_source_id=data_source_id
+        )
+        for data_source_id, document_id in [(1, "a"), (1, "b"), (2, "c")]
+    }
+    names = {}
+    for (data_source_id, document_id), reader in readers.items():
+        path = tmp_path / f"{document_id}.txt"
+        path.write_text(f"text of {document_id}")
+        reader.parse(path)
+        names[document_id] = cache.entry_name(reader, path)
+
+    def cached() -> set[str]:
+        return {entry.name for entry in cache.entries.list()}
+
+    cache.purge(1, "a")
+    assert cached() == {names["b"], names["c"]}
+
+    cache.purge(1)
+    assert cached() == {names["c"]}
+
+
+def test_evicts_stale_temporary_files(tmp_path: Path) -> None:
+    entries = LocalCacheEntries(str(tmp_path / "cache"))
+    cache = ParsedDocumentCache(entries, max_bytes=1024**2)
+    os.makedirs(entries.directory)
+    stale = Path(entries.directory, "stale.tmp")
+    fresh = Path(entries.directory, "fresh.tmp")
+    stale.touch()
+    fresh.touch()
+    long_ago = time.time() - STALE_TEMPORARY_FILE_SECONDS - 60
+    os.utime(stale, (long_ago, long_ago))
+
+    cache.evict()
+
+    assert sorted(os.listdir(entries.directory)) == ["fresh.tmp"]
@@ -0,0 +1,137 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from llama_index.core.node_parser import SentenceSplitter
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app.ai.indexing.reader_pool import ReaderPool
+from app.ai.indexing.readers import pdf
+from app.ai.indexing.readers.base_reader import ChunksResult, page_label_at
+from app.ai.indexing.readers.pdf import PDFReader
+
+
+def write_pdf(path: Path, page_texts: list[str]) -> None:
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for text in page_texts:
+        page = writer.add_blank_page(612, 792)
+        contents = DecodedStreamObject()
+        contents.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(contents)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+@pytest.fixture
+def manual(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(pdf, "PAGES_PER_SHARD", 2)
+    path = tmp_path / "manual.pdf"
+    write_pdf(path, [f"Text of page {page}." for page in range(1, 6)])
+    return path
+
+
+def reader(pool: ReaderPool | None = None) -> PDFReader:
+    return PDFReader(
+        splitter=SentenceSplitter(chunk_size=24, chunk_overlap=0),
+        document_id="document",
+        data_source_id=1,
+        pool=pool,
+    )
+
+
+@pytest.fixture
+def pool() -> Iterator[ReaderPool]:
+    pool = ReaderPool(processes=1, max_documents=10, max_memory_mb=0)
+    yield pool
+    pool.shutdown()
+
+
+def test_page_label_at() -> None:
+    page_starts = [(0, "i"), (10, "ii"), (25, "1")]
+    assert page_label_at(page_starts, 0) == "i"
+    assert page_label_at(page_starts, 9) == "i"
+    assert page_label_at(page_starts, 10) == "ii"
+    assert page_label_at(page_starts, 100) == "1"
+    assert page_label_at([(5, "1")], 0) == ""
+
+
+def test_shards_are_stitched_into_one_document(manual: Path) -> None:
+    parsed = reader().parse(manual)
+
+    assert reader().shards(manual) == [(0, ("1", "2")), (2, ("3", "4")), (4, ("5",))]
+    assert [segment.start_char_idx for segment in parsed.segments] == [0, 32, 64]
+    text = "\n".join(segment.text for segment in parsed.segments)
+    assert text.startswith("Text of page 1.\nText of page 2.\nText of page 3.")
+    for segment in parsed.segments:
+        for start, label in segment.page_starts or []:
+            assert text[start:].startswith(f"Text of page {label}.")
+
+    chunks = reader().chunk(parsed).chunks
+    assert [chunk.metadata["chunk_number"] for chunk in chunks] == list(
+        range(len(chunks))
+    )
+    for chunk in chunks:
+        assert chunk.start_char_idx is not None
+        assert text[chunk.start_char_idx :].startswith(chunk.text)
+        assert chunk.text.startswith(f"Text of page {chunk.metadata['page_number']}.")
+
+
+def test_pool_parses_shards_in_workers(manual: Path, pool: ReaderPool) -> None:
+    result = ChunksResult()
+    chunks = list(reader(pool).iter_chunks(manual, result))
+
+    expected = reader().load_chunks(manual).chunks
+    assert [(chunk.text, chunk.metadata) for chunk in chunks] == [
+        (chunk.text, chunk.metadata) for chunk in expected
+    ]
+    assert result.secret_types is None
@@ -0,0 +1,72 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import pytest
+
+from app.ai.indexing.readers import pii_anonymizer
+from app.ai.indexing.readers.pii_anonymizer import shard_boundaries
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(pii_anonymizer, "PII_SHARD_CHARS", 20)
+
+
+def test_shards_end_on_sentences() -> None:
+    text = "One sentence. Two sentences here. Three."
+    boundaries = list(shard_boundaries(text))
+
+    assert boundaries == [0, 14, 34, len(text)]
+    assert [text[start:end] for start, end in zip(boundaries, boundaries[1:])] == [
+        "One sentence. ",
+        "Two sentences here. ",
+        "Three.",
+    ]
+
+
+def test_shards_fall_back_to_whitespace_and_length() -> None:
+    assert list(shard_boundaries("word " * 8)) == [0, 20, 40]
+    assert list(shard_boundaries("x" * 45)) == [0, 20, 40, 45]
+
+
+def test_offsets_are_boundaries() -> None:
+    text = "Page one.\nPage two is a little longer.\nThree."
+    assert list(shard_boundaries(text, [0, 10, 39])) == [0, 10, 24, 39, len(text)]
+
+
+def test_empty_text() -> None:
+    assert list(shard_boundaries("")) == [0]
@@ -0,0 +1,160 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import os
+import types
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from llama_index.core.node_parser import SentenceSplitter
+
+from app.ai.indexing.embedding_indexer import EmbeddingIndexer
+from app.ai.indexing import reader_pool as reader_pool_module
+from app.ai.indexing.parsed_document_cache import LocalCacheEntries
+from app.ai.indexing.reader_pool import ReaderPool, reader_pool, shutdown_reader_pool
+from app.ai.indexing.readers.base_reader import ReaderConfig
+from app.ai.indexing.readers.csv import CSVReader
+from app.ai.vector_stores.qdrant import QdrantVectorStore
+
+from ....services import models
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setenv("READER_PROCESSES", "1")
+    monkeypatch.setenv("READER_PROCESS_MAX_DOCUMENTS", "1")
+    yield
+    shutdown_reader_pool()
+
+
+def _indexer(data_source_id: int) -> EmbeddingIndexer:
+    return EmbeddingIndexer(
+        data_source_id,
+        splitter=SentenceSplitter(chunk_size=100, chunk_overlap=0),
+        embedding_model=models.Embedding.get("dummy_model"),
+        chunks_vector_store=QdrantVectorStore.for_chunks(data_source_id),
+        llm=None,
+    )
+
+
+def test_parses_in_worker_and_caches(
+    tmp_path: Path, databases_dir: str, pool: None
+) -> None:
+    path = tmp_path / "people.csv"
+    path.write_text("name,age\nJohn,25\nJane,30")
+    indexer = _indexer(1)
+    expected = indexer._get_reader(path, "document").parse(path)
+    assert reader_pool() is not None
+
+    parsed = indexer.parse_file(path, "document")
+
+    assert parsed == expected
+    entries = LocalCacheEntries(os.path.join(databases_dir, "parsed_documents"))
+    assert len(entries.list()) == 1
+
+    # Workers are recycled after every document here, and the cached parse skips them
+    assert indexer.parse_file(path, "document") == expected
+    assert indexer.parse_file(path, "other") == indexer._get_reader(
+        path, "other"
+    ).parse(path)
+
+
+def test_indexes_parse_from_worker(tmp_path: Path, pool: None) -> None:
+    path = tmp_path / "people.csv"
+    path.write_text("name,age\nJohn,25\nJane,30\nJim,35")
+    vector_store = QdrantVectorStore.for_chunks(2)
+
+    _indexer(2).index_file(path, "document")
+
+    assert len(vector_store.document_node_ids("document")) == 3
+
+
+def test_replaces_pool_without_max_tasks_per_child(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        reader_pool_module, "sys", types.SimpleNamespace(version_info=(3, 10))
+    )
+    path = tmp_path / "people.csv"
+    path.write_text("name,age\nJohn,25")
+    pool = ReaderPool(processes=1, max_documents=1, max_memory_mb=0)
+    parse_args = (CSVReader, "document", 1, ReaderConfig(), str(path), None)
+    try:
+        first, first_parse = pool._submit(*parse_args)
+        # Retired once its worker has had its document
+        assert pool._executor is None
+        second, second_parse = pool._submit(*parse_args)
+
+        assert second is not first
+        assert first_parse.result() == second_parse.result()
+        assert len(first_parse.result().segments) == 1
+    finally:
+        pool.shutdown()
+
+
+def test_readers_that_load_models_get_a_pool_that_keeps_its_workers(
+    pool: None,
+) -> None:
+    indexer = _indexer(1)
+
+    images_pool = indexer._get_reader(Path("photo.png"), "document").pool
+    csv_pool = indexer._get_reader(Path("people.csv"), "document").pool
+
+    assert images_pool is reader_pool(loads_models=True)
+    assert images_pool is not None and images_pool is not csv_pool
+    assert images_pool.max_documents == 0
+
+
+def test_keeps_workers_without_max_documents(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        reader_pool_module, "sys", types.SimpleNamespace(version_info=(3, 10))
+    )
+    path = tmp_path / "people.csv"
+    path.write_text("name,age\nJohn,25")
+    pool = ReaderPool(processes=1, max_documents=0, max_memory_mb=0)
+    parse_args = (CSVReader, "document", 1, ReaderConfig(), str(path), None)
+    try:
+        first, first_parse = pool._submit(*parse_args)
+        second, second_parse = pool._submit(*parse_args)
+
+        assert second is first
+        assert first_parse.result() == second_parse.result()
+    finally:
+        pool.shutdown()
@@ -0,0 +1,129 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import os
+from pathlib import Path
+
+import pytest
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import TextNode
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+
+from app.ai.indexing.sqlite_kvstore import DEFAULT_FILENAME, SqliteKVStore
+from app.ai.indexing.summary_indexer import SummaryIndexer
+from app.config import settings
+from app.services.models import Embedding, LLM
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    store = SqliteKVStore(str(tmp_path / "store.sqlite3"))
+    assert store.get("a") is None
+    assert store.get_all() == {}
+    assert not os.path.exists(store.path)
+
+    store.put("a", {"value": 1})
+    store.put_all([("a", {"value": 2}), ("b", {"value": 3})])
+    store.put("a", {"other": True}, collection="other")
+
+    assert store.get("a") == {"value": 2}
+    assert store.get_all() == {"a": {"value": 2}, "b": {"value": 3}}
+    assert store.get_all(collection="other") == {"a": {"other": True}}
+    assert store.delete("a")
+    assert not store.delete("a")
+    assert store.get_all() == {"b": {"value": 3}}
+
+
+def test_transaction_rolls_back(tmp_path: Path) -> None:
+    store = SqliteKVStore(str(tmp_path / "store.sqlite3"))
+    store.put("kept", {})
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.put("a", {})
+            # stores on the same file share the transaction
+            with SqliteKVStore(store.path).transaction():
+                SqliteKVStore(store.path).put("b", {})
+            raise RuntimeError()
+
+    assert store.get_all() == {"kept": {}}
+
+
+def test_recreated_database_is_reopened(tmp_path: Path) -> None:
+    store = SqliteKVStore(str(tmp_path / "store.sqlite3"))
+    store.put("a", {})
+    os.remove(store.path)
+
+    assert store.get("a") is None
+    store.put("b", {})
+    assert store.get_all() == {"b": {}}
+
+
+def test_migrate_from_json(tmp_path: Path) -> None:
+    persist_dir = str(tmp_path)
+    json_store = SimpleDocumentStore()
+    json_store.add_documents([TextNode(id_="node", text="some text")])
+    json_store.persist(os.path.join(persist_dir, "docstore.json"))
+
+    store = SqliteKVStore.from_persist_dir(persist_dir)
+    assert store.migrate_from_json(persist_dir) > 0
+    assert store.migrate_from_json(persist_dir) == 0
+
+    node = KVDocumentStore(store).get_node("node")
+    assert node.get_content() == "some text"
+
+
+def test_summary_indexer_on_sqlite(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("SUMMARY_STORAGE_PROVIDER", "SQLite")
+    document = tmp_path / "document.txt"
+    document.write_text("Some words about something. " * 100)
+    indexer = SummaryIndexer(
+        data_source_id=1,
+        splitter=SentenceSplitter(),
+        llm=LLM.get_noop(),
+        embedding_model=Embedding.get_noop(),
+    )
+
+    indexer.index_file(document, "document")
+
+    assert indexer.get_summary("document")
+    persist_dir = os.path.join(settings.rag_databases_dir, "doc_summary_index_1")
+    files = os.listdir(persist_dir)
+    assert DEFAULT_FILENAME in files
+    assert "docstore.json" not in files
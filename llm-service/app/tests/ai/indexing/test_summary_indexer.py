@@ -1,9 +1,17 @@
+import os
 import random
+import time
+from typing import Any
 
+import pytest
+from llama_index.core import load_index_from_storage
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding as Vector
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.schema import TextNode
 
+from app.ai.indexing import summary_indexer
 from app.ai.indexing.summary_indexer import SummaryIndexer
+from app.config import settings
 from app.services.models import LLM, Embedding
 
 
@@ -175,3 +183,96 @@ def test_fallback_behavior() -> None:
     finally:
         # Restore the original random.sample function
         random.sample = original_sample
+
+
+def test_loaded_index_is_reused_until_the_files_change(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    loads: list[int] = []
+
+    def counting_load(**kwargs: Any) -> Any:
+        loads.append(1)
+        return load_index_from_storage(**kwargs)
+
+    monkeypatch.setattr(summary_indexer, "load_index_from_storage", counting_load)
+    indexer = SummaryIndexer(
+        data_source_id=1,
+        splitter=SentenceSplitter(),
+        llm=LLM.get_noop(),
+        embedding_model=Embedding.get_noop(),
+    )
+
+    assert indexer.get_summary("missing") is None
+    loads_after_first_read = len(loads)
+    assert indexer.get_summary("missing") is None
+    indexer.as_query_engine()
+    assert len(loads) == loads_after_first_read
+
+    # another process writing the index shows up as newer files
+    persist_dir = os.path.join(settings.rag_databases_dir, "doc_summary_index_1")
+    for name in os.listdir(persist_dir):
+        path = os.path.join(persist_dir, name)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert indexer.get_summary("missing") is None
+    assert len(loads) == loads_after_first_read + 1
+
+
+def test_sampling_is_linear_and_reproducible() -> None:
+    indexer = SummaryIndexer(
+        data_source_id=1,
+        splitter=SentenceSplitter(),
+        llm=LLM.get_noop(),
+        embedding_model=Embedding.get_noop(),
+    )
+    nodes = [TextNode(text=f"Node {i}") for i in range(200_000)]
+
+    start = time.monotonic()
+    sampled_nodes = indexer.sample_nodes(nodes, seed=7)
+    assert time.monotonic() - start < 1
+
+    assert len(sampled_nodes) == 1000
+    assert indexer.sample_nodes(nodes, seed=7) == sampled_nodes
+    indices = [int(node.text.split()[1]) for node in sampled_nodes]
+    assert indices == sorted(indices)
+    # 50 non-overlapping blocks of 20 contiguous nodes
+    for block in range(50):
+        block_indices = indices[block * 20 : block * 20 + 20]
+        assert block_indices == list(range(block_indices[0], block_indices[0] + 20))
+
+
+class TopicEmbedding(BaseEmbedding):
+    """Embeds texts that end with "topic <n>" as the n-th unit vector."""
+
+    def _get_query_embedding(self, query: str) -> Vector:
+        return self._get_text_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Vector:
+        return self._get_text_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Vector:
+        vector = [0.0] * 4
+        vector[int(text.split()[-1])] = 1.0
+        return vector
+
+
+def test_representative_sampling_covers_every_topic_once(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    indexer = SummaryIndexer(
+        data_source_id=1,
+        splitter=SentenceSplitter(),
+        llm=LLM.get_noop(),
+        embedding_model=TopicEmbedding(),
+    )
+    # three topics, in long runs
+    nodes = [TextNode(text=f"Node {i} topic {i // 1000}") for i in range(3000)]
+
+    sampled_nodes = indexer.sample_nodes(nodes, mode="representative")
+
+    # one block per topic is enough to cover the document
+    assert len(sampled_nodes) == 60
+    topics = [node.text.split()[-1] for node in sampled_nodes]
+    assert topics == ["0"] * 20 + ["1"] * 20 + ["2"] * 20
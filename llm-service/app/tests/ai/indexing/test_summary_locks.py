@@ -0,0 +1,215 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import fcntl
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from typing import Any
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.ai.indexing.summary_locks import (
+    ReadWriteLock,
+    S3Lease,
+    read_lock,
+    write_lock,
+)
+
+
+class TestReadWriteLock:
+    @staticmethod
+    def test_readers_share_the_lock() -> None:
+        lock = ReadWriteLock()
+        both_reading = threading.Barrier(2)
+
+        def read() -> None:
+            with lock.read():
+                both_reading.wait(timeout=5)
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        assert not both_reading.broken
+
+    @staticmethod
+    def test_writer_excludes_readers() -> None:
+        lock = ReadWriteLock()
+        events: list[str] = []
+
+        def read() -> None:
+            with lock.read():
+                events.append("read")
+
+        with lock.write():
+            reader = threading.Thread(target=read)
+            reader.start()
+            time.sleep(0.1)
+            events.append("write done")
+        reader.join(timeout=5)
+
+        assert events == ["write done", "read"]
+
+
+class TestFileLocks:
+    @staticmethod
+    def _locked_elsewhere(persist_dir: str, exclusive: bool) -> bool:
+        with open(persist_dir + ".lock", "a") as other:
+            try:
+                flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                fcntl.flock(other, flags | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(other, fcntl.LOCK_UN)
+            return False
+
+    def test_write_lock_excludes_other_processes(self, databases_dir: str) -> None:
+        persist_dir = os.path.join(databases_dir, "doc_summary_index_1")
+
+        with write_lock(persist_dir):
+            assert self._locked_elsewhere(persist_dir, exclusive=False)
+        assert not self._locked_elsewhere(persist_dir, exclusive=True)
+
+    def test_read_lock_is_shared_with_other_processes(self, databases_dir: str) -> None:
+        persist_dir = os.path.join(databases_dir, "doc_summary_index_1")
+
+        with read_lock(persist_dir):
+            assert not self._locked_elsewhere(persist_dir, exclusive=False)
+            assert self._locked_elsewhere(persist_dir, exclusive=True)
+
+    @staticmethod
+    def test_data_sources_do_not_block_each_other(databases_dir: str) -> None:
+        acquired = threading.Event()
+
+        def write_other() -> None:
+            with write_lock(os.path.join(databases_dir, "doc_summary_index_2")):
+                acquired.set()
+
+        with write_lock(os.path.join(databases_dir, "doc_summary_index_1")):
+            thread = threading.Thread(target=write_other)
+            thread.start()
+            assert acquired.wait(timeout=5)
+        thread.join(timeout=5)
+
+
+class FakeS3:
+    """Just enough of S3's conditional writes to exercise the lease."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, tuple[str, bytes]] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _error(code: str) -> ClientError:
+        return ClientError({"Error": {"Code": code}}, "operation")
+
+    def put_object(
+        self,
+        Bucket: str,
+        Key: str,
+        Body: bytes,
+        IfNoneMatch: str | None = None,
+        IfMatch: str | None = None,
+    ) -> dict[str, Any]:
+        with self.lock:
+            current = self.objects.get(Key)
+            if IfNoneMatch == "*" and current is not None:
+                raise self._error("PreconditionFailed")
+            if IfMatch is not None and (current is None or current[0] != IfMatch):
+                raise self._error("PreconditionFailed")
+            etag = hashlib.md5(Body + os.urandom(4)).hexdigest()
+            self.objects[Key] = (etag, Body)
+            return {"ETag": etag}
+
+    def get_object(self, Bucket: str, Key: str) -> dict[str, Any]:
+        with self.lock:
+            if Key not in self.objects:
+                raise self._error("NoSuchKey")
+            etag, body = self.objects[Key]
+            return {"ETag": etag, "Body": io.BytesIO(body)}
+
+    def delete_object(self, Bucket: str, Key: str) -> None:
+        with self.lock:
+            self.objects.pop(Key, None)
+
+
+class TestS3Lease:
+    @staticmethod
+    def test_lease_is_exclusive_until_released() -> None:
+        s3 = FakeS3()
+        first = S3Lease("locks/a.lock", ttl_seconds=60, poll_seconds=0.01, s3_client=s3)
+        second = S3Lease(
+            "locks/a.lock", ttl_seconds=60, poll_seconds=0.01, s3_client=s3
+        )
+        acquired = threading.Event()
+
+        def take_second() -> None:
+            with second:
+                acquired.set()
+
+        with first:
+            thread = threading.Thread(target=take_second)
+            thread.start()
+            assert not acquired.wait(timeout=0.2)
+        assert acquired.wait(timeout=5)
+        thread.join(timeout=5)
+        assert "locks/a.lock" not in s3.objects
+
+    @staticmethod
+    def test_expired_lease_is_taken_over() -> None:
+        s3 = FakeS3()
+        abandoned = json.dumps({"owner": "crashed", "expires_at": time.time() - 1})
+        s3.put_object("bucket", "locks/a.lock", abandoned.encode("utf-8"))
+
+        with S3Lease("locks/a.lock", ttl_seconds=60, poll_seconds=0.01, s3_client=s3):
+            _, body = s3.objects["locks/a.lock"]
+            assert json.loads(body)["owner"] != "crashed"
+
+    @staticmethod
+    def test_unexpected_errors_propagate() -> None:
+        class BrokenS3(FakeS3):
+            def put_object(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+                raise self._error("AccessDenied")
+
+        with pytest.raises(ClientError):
+            S3Lease("locks/a.lock", s3_client=BrokenS3()).acquire()
@@ -0,0 +1,183 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import functools
+import threading
+import time
+
+from app.ai.indexing.summary_tree import (
+    SummaryRefresher,
+    SummaryTree,
+    SummaryTreeStore,
+    refresh_summary_tree,
+)
+
+
+class CountingSummarizer:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, texts: list[str]) -> str:
+        self.calls += 1
+        return "(" + " ".join(sorted(texts)) + ")"
+
+
+def tree_with(document_count: int, fan_out: int = 4) -> SummaryTree:
+    tree = SummaryTree(fan_out=fan_out)
+    for i in range(document_count):
+        tree.upsert_document(f"{i:03}", f"d{i:03}")
+    tree.apply(tree.compute(CountingSummarizer()))
+    return tree
+
+
+def leaves_under(tree: SummaryTree, node_id: str) -> list[str]:
+    node = tree.nodes[node_id]
+    if node.height == 0:
+        return [node_id]
+    return [leaf for child in node.children for leaf in leaves_under(tree, child)]
+
+
+class TestSummaryTree:
+    @staticmethod
+    def test_fan_out_is_bounded() -> None:
+        tree = tree_with(100)
+
+        assert not tree.dirty
+        assert tree.root is not None
+        assert all(len(node.children) <= 4 for node in tree.nodes.values())
+        assert sorted(leaves_under(tree, tree.root)) == [
+            f"doc:{i:03}" for i in range(100)
+        ]
+        # every document's summary contributes to the root
+        assert tree.summary is not None
+        assert all(f"d{i:03}" in tree.summary for i in range(100))
+
+    @staticmethod
+    def test_insert_only_recomputes_the_path_to_the_root() -> None:
+        tree = tree_with(100)
+        height = tree.nodes[tree.root or ""].height
+
+        tree.upsert_document("new", "dnew")
+        summarize = CountingSummarizer()
+        tree.apply(tree.compute(summarize))
+
+        assert 0 < summarize.calls <= height + 1
+        assert tree.summary is not None and "dnew" in tree.summary
+
+    @staticmethod
+    def test_delete_only_recomputes_the_path_to_the_root() -> None:
+        tree = tree_with(100)
+        height = tree.nodes[tree.root or ""].height
+
+        tree.delete_document("042")
+        summarize = CountingSummarizer()
+        tree.apply(tree.compute(summarize))
+
+        assert summarize.calls <= height
+        assert tree.summary is not None and "d042" not in tree.summary
+        assert "doc:042" not in tree.nodes
+
+    @staticmethod
+    def test_deleting_everything_empties_the_tree() -> None:
+        tree = tree_with(20)
+        for i in range(20):
+            tree.delete_document(f"{i:03}")
+
+        assert tree.root is None
+        assert tree.nodes == {}
+        assert tree.summary is None
+
+    @staticmethod
+    def test_single_document_needs_no_llm_call() -> None:
+        tree = SummaryTree()
+        tree.upsert_document("only", "the only summary")
+        summarize = CountingSummarizer()
+        tree.apply(tree.compute(summarize))
+
+        assert summarize.calls == 0
+        assert tree.summary == "the only summary"
+
+    @staticmethod
+    def test_changes_made_during_a_refresh_stay_dirty() -> None:
+        tree = tree_with(10)
+        tree.upsert_document("late", "dlate")
+        results = tree.compute(CountingSummarizer())
+
+        tree.upsert_document("later", "dlater")
+        tree.apply(results)
+
+        assert tree.dirty
+        tree.apply(tree.compute(CountingSummarizer()))
+        assert tree.summary is not None and "dlater" in tree.summary
+
+
+def test_refresh_persisted_tree() -> None:
+    store = SummaryTreeStore()
+    tree = SummaryTree()
+    tree.upsert_document("a", "da")
+    tree.upsert_document("b", "db")
+    store.put(1, tree)
+
+    refresh_summary_tree(store, 1, CountingSummarizer())
+
+    refreshed = store.get(1)
+    assert refreshed is not None
+    assert refreshed.summary == "(da db)"
+    assert not refreshed.dirty
+    assert store.all() == {1: refreshed}
+
+    store.delete(1)
+    assert store.get(1) is None
+
+
+def test_refresher_debounces_bursts() -> None:
+    refreshes: list[int] = []
+    done = threading.Event()
+
+    def refresh(n: int) -> None:
+        refreshes.append(n)
+        done.set()
+
+    refresher = SummaryRefresher(lambda: 0.2)
+    for n in range(20):
+        refresher.schedule(1, functools.partial(refresh, n))
+    assert refresher.is_pending(1)
+
+    assert done.wait(timeout=5)
+    time.sleep(0.3)
+    assert refreshes == [19]
+    assert not refresher.is_pending(1)
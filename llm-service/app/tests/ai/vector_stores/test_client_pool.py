@@ -0,0 +1,107 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+from typing import Any
+
+from app.ai.vector_stores import client_pool
+from app.ai.vector_stores.client_pool import ClientPool
+
+
+class FakeClient:
+    def __init__(self, healthy: bool = True):
+        self.healthy = healthy
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+    def ping(self) -> None:
+        if not self.healthy:
+            raise ConnectionError("unreachable")
+
+
+def _ping(client: FakeClient) -> Any:
+    client.ping()
+
+
+class TestClientPool:
+    @staticmethod
+    def test_reuses_client_until_config_changes() -> None:
+        pool: ClientPool[FakeClient] = ClientPool("fake", _ping)
+        client = pool.client(("host", "key"), FakeClient)
+        wrapper = pool.vector_store("index_1", object)
+        assert pool.client(("host", "key"), FakeClient) is client
+
+        rotated = pool.client(("host", "rotated key"), FakeClient)
+        assert rotated is not client
+        assert client.closed and not rotated.closed
+        assert pool.vector_store("index_1", object) is not wrapper
+
+        stats = pool.stats()
+        assert stats.clients == 1
+        assert stats.client_requests == 3
+        assert stats.client_reuses == 1
+        assert stats.healthy
+
+    @staticmethod
+    def test_caches_vector_stores_until_evicted() -> None:
+        pool: ClientPool[FakeClient] = ClientPool("fake", _ping)
+        wrapper = pool.vector_store("index_1", object)
+        assert pool.vector_store("index_1", object) is wrapper
+        assert pool.stats().cached_vector_stores == 1
+
+        pool.evict("index_1")
+        assert pool.vector_store("index_1", object) is not wrapper
+
+    @staticmethod
+    def test_reports_unhealthy_clients() -> None:
+        pool: ClientPool[FakeClient] = ClientPool("fake", _ping)
+        pool.client("config", lambda: FakeClient(healthy=False))
+
+        stats = pool.stats()
+        assert stats.healthy is False
+        assert stats.error == "unreachable"
+
+    @staticmethod
+    def test_registers_one_pool_per_backend() -> None:
+        first: ClientPool[FakeClient] = ClientPool("fake", _ping)
+        first.client("config", FakeClient)
+        second: ClientPool[FakeClient] = ClientPool("fake", _ping)
+        second.client("config", FakeClient)
+
+        assert client_pool._pools["fake"] is second
+        assert [stats.backend for stats in client_pool.pool_stats()].count("fake") == 1
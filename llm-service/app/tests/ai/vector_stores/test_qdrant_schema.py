@@ -0,0 +1,95 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+from unittest.mock import MagicMock
+
+import pytest
+import qdrant_client
+from qdrant_client.http.models import Distance, HnswConfigDiff, VectorParams
+
+from app.ai.vector_stores.qdrant import (
+    PAYLOAD_INDEXES,
+    QdrantVectorStore,
+    migrate_chunk_collections,
+)
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    monkeypatch.setenv("QDRANT_HNSW_M", "32")
+    monkeypatch.setenv("QDRANT_HNSW_EF_CONSTRUCT", "200")
+    return MagicMock(wraps=qdrant_client.QdrantClient(":memory:"))
+
+
+def indexed_fields(client: MagicMock, collection_name: str) -> set[str]:
+    return {
+        call.kwargs["field_name"]
+        for call in client.create_payload_index.call_args_list
+        if call.args[0] == collection_name
+    }
+
+
+def test_prepare_for_write_creates_the_collection(client: MagicMock) -> None:
+    store = QdrantVectorStore("index_1", data_source_id=1, client=client)
+    store.prepare_for_write(4)
+    store.prepare_for_write(4)
+
+    assert client.create_collection.call_count == 1
+    create_kwargs = client.create_collection.call_args.kwargs
+    assert create_kwargs["vectors_config"] == VectorParams(
+        size=4, distance=Distance.COSINE, on_disk=False
+    )
+    assert create_kwargs["hnsw_config"] == HnswConfigDiff(m=32, ef_construct=200)
+    assert create_kwargs["on_disk_payload"] is True
+    assert indexed_fields(client, "index_1") == set(PAYLOAD_INDEXES)
+
+
+def test_migration_applies_the_schema_to_chunk_collections(client: MagicMock) -> None:
+    for collection_name in ["index_7", "summary_index_7"]:
+        client.create_collection(
+            collection_name,
+            vectors_config=VectorParams(size=4, distance=Distance.COSINE),
+        )
+
+    migrate_chunk_collections(client)
+
+    update = client.update_collection.call_args
+    assert update.args == ("index_7",)
+    assert update.kwargs["hnsw_config"] == HnswConfigDiff(m=32, ef_construct=200)
+    assert client.update_collection.call_count == 1
+    assert indexed_fields(client, "index_7") == set(PAYLOAD_INDEXES)
+    assert indexed_fields(client, "summary_index_7") == set()
@@ -50,12 +50,15 @@ import qdrant_client as q_client
 from fastapi.testclient import TestClient
 from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
 
+from app.ai.indexing.ingestion import parsed_file_cache
 from app.ai.vector_stores.qdrant import QdrantVectorStore
+from app.ai.vector_stores.vector_store import collection_stats_cache
 from app.main import app
 from app.services.metadata_apis import data_sources_metadata_api
 from app.services import models
 from app.services.metadata_apis.data_sources_metadata_api import RagDataSource
 from app.services.models.providers import BedrockModelProvider
+from app.services.query.query_embeddings import query_embedding_cache
 
 
 @dataclass
@@ -78,11 +81,52 @@ def databases_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path) -> st
     return databases_dir
 
 
+@pytest.fixture(autouse=True)
+def model_registry() -> Iterator[None]:
+    """Resolve the model provider and model clients from scratch in every test."""
+    models.invalidate()
+    yield
+    models.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def clear_collection_stats() -> Iterator[None]:
+    collection_stats_cache.clear()
+    yield
+    collection_stats_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_query_embeddings() -> Iterator[None]:
+    query_embedding_cache.clear()
+    yield
+    query_embedding_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_parsed_files() -> Iterator[None]:
+    parsed_file_cache.clear()
+    yield
+    parsed_file_cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def use_local_storage(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("S3_RAG_DOCUMENT_BUCKET", "")
 
 
+@pytest.fixture(autouse=True)
+def parse_in_process(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests that need the reader pool set READER_PROCESSES themselves."""
+    monkeypatch.setenv("READER_PROCESSES", "0")
+
+
+@pytest.fixture(autouse=True)
+def skip_qdrant_migration(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests use an in-memory Qdrant, so startup mustn't look for a server to migrate."""
+    monkeypatch.setenv("QDRANT_MIGRATE_COLLECTIONS", "false")
+
+
 @pytest.fixture(autouse=True)
 def use_mlflow_reconciler_data_path(
     monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
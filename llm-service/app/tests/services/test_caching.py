@@ -0,0 +1,137 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import threading
+import time
+
+from app.services.caching import StaleWhileRevalidateCache, TtlCache
+
+
+class TestTtlCache:
+    @staticmethod
+    def test_entries_expire() -> None:
+        cache: TtlCache[str, int] = TtlCache(0.05)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        time.sleep(0.06)
+        assert cache.get("a") is None
+
+    @staticmethod
+    def test_evicts_least_recently_used() -> None:
+        cache: TtlCache[str, int] = TtlCache(60, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    @staticmethod
+    def test_get_or_load_only_loads_missing_entries() -> None:
+        cache: TtlCache[str, int] = TtlCache(lambda: 60)
+        loads: list[str] = []
+
+        def load() -> int:
+            loads.append("a")
+            return 1
+
+        assert cache.get_or_load("a", load) == 1
+        assert cache.get_or_load("a", load) == 1
+        cache.invalidate("a")
+        assert cache.get_or_load("a", load) == 1
+        assert len(loads) == 2
+
+
+class TestStaleWhileRevalidateCache:
+    @staticmethod
+    def test_fresh_entries_are_not_reloaded() -> None:
+        cache: StaleWhileRevalidateCache[str, int] = StaleWhileRevalidateCache(60, 60)
+        loads = iter(range(10))
+
+        assert cache.get_or_load("a", lambda: next(loads)) == 0
+        assert cache.get_or_load("a", lambda: next(loads)) == 0
+
+    @staticmethod
+    def test_stale_entries_are_served_while_reloading() -> None:
+        cache: StaleWhileRevalidateCache[str, int] = StaleWhileRevalidateCache(0, 60)
+        reloaded = threading.Event()
+        loads = iter(range(10))
+
+        def load() -> int:
+            value = next(loads)
+            if value:
+                reloaded.set()
+            return value
+
+        assert cache.get_or_load("a", load) == 0
+        assert cache.get_or_load("a", load) == 0
+        assert reloaded.wait(timeout=5)
+        deadline = time.monotonic() + 5
+        while cache.get_or_load("a", load) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get_or_load("a", load) >= 1
+
+    @staticmethod
+    def test_failed_reload_keeps_the_stale_entry() -> None:
+        cache: StaleWhileRevalidateCache[str, int] = StaleWhileRevalidateCache(0, 60)
+        cache.get_or_load("a", lambda: 1)
+
+        def fail() -> int:
+            raise RuntimeError("metadata API is down")
+
+        for _ in range(3):
+            assert cache.get_or_load("a", fail) == 1
+
+    @staticmethod
+    def test_expired_entries_are_loaded_inline() -> None:
+        cache: StaleWhileRevalidateCache[str, int] = StaleWhileRevalidateCache(0, 0)
+        loads = iter(range(10))
+
+        assert cache.get_or_load("a", lambda: next(loads)) == 0
+        assert cache.get_or_load("a", lambda: next(loads)) == 1
+
+    @staticmethod
+    def test_load_overlapping_an_invalidation_is_not_stored() -> None:
+        cache: StaleWhileRevalidateCache[str, int] = StaleWhileRevalidateCache(60, 60)
+
+        def load_then_invalidate() -> int:
+            cache.invalidate("a")
+            return 1
+
+        assert cache.get_or_load("a", load_then_invalidate) == 1
+        assert cache.get_or_load("a", lambda: 2) == 2
@@ -0,0 +1,133 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2025
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+from typing import Iterator, Optional
+
+import pytest
+
+from app.services.metadata_apis import data_sources_metadata_api, session_metadata_api
+from app.services.metadata_apis.session_metadata_api import (
+    Session,
+    SessionQueryConfiguration,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_session_cache() -> Iterator[None]:
+    session_metadata_api.invalidate()
+    yield
+    session_metadata_api.invalidate()
+
+
+class TestSessionMetadata:
+    @staticmethod
+    def fetches(monkeypatch: pytest.MonkeyPatch) -> list[tuple[int, Optional[str]]]:
+        fetched: list[tuple[int, Optional[str]]] = []
+
+        def fetch_session(session_id: int, user_name: Optional[str]) -> Session:
+            fetched.append((session_id, user_name))
+            return Session(
+                id=session_id,
+                name="session",
+                data_source_ids=[1],
+                project_id=1,
+                inference_model="model",
+                rerank_model=None,
+                response_chunks=5,
+                query_configuration=SessionQueryConfiguration(
+                    enable_hyde=False, enable_summary_filter=False
+                ),
+            )
+
+        monkeypatch.setattr(session_metadata_api, "_fetch_session", fetch_session)
+        return fetched
+
+    def test_sessions_are_cached_per_user(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        fetched = self.fetches(monkeypatch)
+
+        session_metadata_api.get_session(1, "alice")
+        session_metadata_api.get_session(1, "alice")
+        session_metadata_api.get_session(1, "bob")
+
+        assert fetched == [(1, "alice"), (1, "bob")]
+
+    def test_callers_cannot_modify_the_cached_session(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        self.fetches(monkeypatch)
+
+        session_metadata_api.get_session(1, "alice").name = "renamed"
+
+        assert session_metadata_api.get_session(1, "alice").name == "session"
+
+    def test_invalidate_drops_the_session_for_every_user(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        fetched = self.fetches(monkeypatch)
+        session_metadata_api.get_session(1, "alice")
+        session_metadata_api.get_session(1, "bob")
+        session_metadata_api.get_session(2, "alice")
+
+        session_metadata_api.invalidate(1)
+        session_metadata_api.get_session(1, "alice")
+        session_metadata_api.get_session(1, "bob")
+        session_metadata_api.get_session(2, "alice")
+
+        assert fetched.count((1, "alice")) == 2
+        assert fetched.count((1, "bob")) == 2
+        assert fetched.count((2, "alice")) == 1
+
+
+def test_bulk_metadata_skips_data_sources_that_fail(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    get_metadata = data_sources_metadata_api.get_metadata
+
+    def get_metadata_or_fail(
+        data_source_id: int,
+    ) -> data_sources_metadata_api.RagDataSource:
+        if data_source_id == 2:
+            raise RuntimeError("not found")
+        return get_metadata(data_source_id)
+
+    monkeypatch.setattr(data_sources_metadata_api, "get_metadata", get_metadata_or_fail)
+
+    metadata = data_sources_metadata_api.get_metadata_bulk([1, 2, 3, 1])
+
+    assert sorted(metadata) == [1, 3]
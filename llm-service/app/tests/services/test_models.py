@@ -36,13 +36,19 @@
 #  DATA.
 #
 import itertools
+import time
 
 import pytest
 
 from app.services import models
 from app.services.caii import caii
 from app.services.caii.types import ListEndpointEntry
-from app.services.models.providers import BedrockModelProvider
+from app.services.models.providers import (
+    AzureModelProvider,
+    BedrockModelProvider,
+    OpenAiModelProvider,
+    get_provider_class,
+)
 from app.services.models.providers._model_provider import _ModelProvider
 
 
@@ -115,3 +121,45 @@ class TestListAvailableModels:
             models.Reranking.list_available()
             == EnabledModelProvider.list_reranking_models()
         )
+
+
+class TestModelRegistry:
+    @pytest.fixture(autouse=True)
+    def azure_env(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        for name in get_all_env_var_names():
+            monkeypatch.delenv(name, raising=False)
+        for name in AzureModelProvider.get_env_var_names():
+            monkeypatch.setenv(name, "test")
+
+    def test_provider_is_resolved_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        assert get_provider_class() is AzureModelProvider
+
+        for name in AzureModelProvider.get_env_var_names():
+            monkeypatch.delenv(name)
+        for name in OpenAiModelProvider.get_env_var_names():
+            monkeypatch.setenv(name, "test")
+        assert get_provider_class() is AzureModelProvider
+
+        models.invalidate()
+        assert get_provider_class() is OpenAiModelProvider
+
+    def test_clients_are_reused(self) -> None:
+        reranker = models.Reranking.get("reranker", top_n=3)
+        assert models.Reranking.get("reranker", top_n=3) is reranker
+        assert models.Reranking.get("reranker", top_n=4) is not reranker
+
+        models.invalidate()
+        assert models.Reranking.get("reranker", top_n=3) is not reranker
+
+    def test_clients_are_rebuilt_after_the_provider_ttl(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(
+            AzureModelProvider, "get_client_ttl_seconds", staticmethod(lambda: 300)
+        )
+        clock = itertools.count(step=200)
+        monkeypatch.setattr(time, "monotonic", lambda: next(clock))
+
+        reranker = models.Reranking.get("reranker", top_n=3)
+        assert models.Reranking.get("reranker", top_n=3) is reranker
+        assert models.Reranking.get("reranker", top_n=3) is not reranker
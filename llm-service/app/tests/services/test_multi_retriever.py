@@ -0,0 +1,219 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2025
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+import asyncio
+import threading
+import time
+from typing import Iterator, cast
+
+import pytest
+from llama_index.core import QueryBundle
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from app.services.query.flexible_retriever import FlexibleRetriever
+from app.services.query import multi_retriever
+from app.services.query.multi_retriever import MultiSourceRetriever
+
+
+class CountingEmbeddingModel(BaseEmbedding):
+    calls: int = 0
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        self.calls += 1
+        return [0.1] * 4
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return [0.1] * 4
+
+
+class StubRetriever(FlexibleRetriever):
+    def __init__(
+        self,
+        data_source_id: int,
+        delay: float = 0.0,
+        error: Exception | None = None,
+        barrier: threading.Barrier | None = None,
+        embedding_model: BaseEmbedding | None = None,
+        release: threading.Event | None = None,
+    ) -> None:
+        BaseRetriever.__init__(self)
+        self.data_source_id = data_source_id
+        self.embedding_model = embedding_model or CountingEmbeddingModel()
+        self.received: list[QueryBundle] = []
+        self.delay = delay
+        self.error = error
+        self.barrier = barrier
+        self.release = release
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        self.received.append(query_bundle)
+        if self.barrier:
+            # only passes if every source is being queried at the same time
+            self.barrier.wait(timeout=5)
+        time.sleep(self.delay)
+        if self.release:
+            self.release.wait(timeout=5)
+        if self.error:
+            raise self.error
+        return [NodeWithScore(node=TextNode(text=f"{self.data_source_id}"), score=1.0)]
+
+
+def _texts(nodes: list[NodeWithScore]) -> list[str]:
+    return sorted(node.node.get_content() for node in nodes)
+
+
+@pytest.fixture
+def small_pool(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setenv("RETRIEVAL_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("RETRIEVAL_MAX_QUEUED", "0")
+    multi_retriever._pool.cache_clear()
+    yield
+    multi_retriever._pool.cache_clear()
+
+
+class TestMultiSourceRetriever:
+    def test_sources_are_queried_concurrently(self) -> None:
+        barrier = threading.Barrier(3)
+        retriever = MultiSourceRetriever(
+            [StubRetriever(i, barrier=barrier) for i in range(3)]
+        )
+
+        nodes = retriever.retrieve("question")
+
+        assert _texts(nodes) == ["0", "1", "2"]
+        timings = retriever.drain_source_timings()
+        assert [t.status for t in timings] == ["ok", "ok", "ok"]
+        assert retriever.drain_source_timings() == []
+
+    def test_slow_and_failing_sources_are_left_out(self) -> None:
+        retriever = MultiSourceRetriever(
+            [
+                StubRetriever(1),
+                StubRetriever(2, delay=2),
+                StubRetriever(3, error=RuntimeError("unavailable")),
+            ],
+            timeout_seconds=0.2,
+        )
+
+        start = time.perf_counter()
+        nodes = retriever.retrieve("question")
+
+        assert time.perf_counter() - start < 1.5
+        assert _texts(nodes) == ["1"]
+        timings = {t.data_source_id: t for t in retriever.drain_source_timings()}
+        assert timings[1].status == "ok"
+        assert timings[1].node_count == 1
+        assert timings[2].status == "timeout"
+        assert timings[3].status == "error"
+
+    def test_async_retrieval_applies_the_deadline(self) -> None:
+        retriever = MultiSourceRetriever(
+            [StubRetriever(1), StubRetriever(2, delay=2)], timeout_seconds=0.2
+        )
+
+        start = time.perf_counter()
+        nodes = asyncio.run(retriever.aretrieve("question"))
+
+        assert time.perf_counter() - start < 1.5
+        assert _texts(nodes) == ["1"]
+        statuses = {
+            t.data_source_id: t.status for t in retriever.drain_source_timings()
+        }
+        assert statuses == {1: "ok", 2: "timeout"}
+
+    def test_query_is_embedded_once_per_model(self) -> None:
+        shared = CountingEmbeddingModel(model_name="shared")
+        other = CountingEmbeddingModel(model_name="other")
+        sources: list[FlexibleRetriever] = [
+            StubRetriever(1, embedding_model=shared),
+            StubRetriever(2, embedding_model=shared),
+            StubRetriever(3, embedding_model=other),
+        ]
+        retriever = MultiSourceRetriever(sources)
+
+        retriever.retrieve("question")
+        retriever.retrieve("question")
+
+        assert shared.calls == 1
+        assert other.calls == 1
+        assert all(
+            bundle.embedding == [0.1] * 4
+            for source in sources
+            for bundle in cast(StubRetriever, source).received
+        )
+
+    def test_a_single_source_gets_the_deadline(self) -> None:
+        retriever = MultiSourceRetriever(
+            [StubRetriever(1, delay=2)], timeout_seconds=0.2
+        )
+
+        start = time.perf_counter()
+        assert retriever.retrieve("question") == []
+
+        assert time.perf_counter() - start < 1.5
+        assert [t.status for t in retriever.drain_source_timings()] == ["timeout"]
+
+    def test_a_single_source_still_raises_errors(self) -> None:
+        retriever = MultiSourceRetriever([StubRetriever(1, error=ValueError("bad"))])
+
+        with pytest.raises(ValueError):
+            retriever.retrieve("question")
+
+    @pytest.mark.usefixtures("small_pool")
+    def test_hung_sources_shed_load_instead_of_queueing(self) -> None:
+        release = threading.Event()
+        hung = MultiSourceRetriever(
+            [StubRetriever(1, release=release)], timeout_seconds=0.1
+        )
+        hung.retrieve("question")
+        retriever = MultiSourceRetriever([StubRetriever(3)], timeout_seconds=5)
+
+        start = time.perf_counter()
+        assert retriever.retrieve("question") == []
+
+        assert time.perf_counter() - start < 1
+        assert [t.status for t in retriever.drain_source_timings()] == ["overloaded"]
+        release.set()
+        deadline = time.monotonic() + 5
+        while not retriever.retrieve("question") and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert [t.status for t in retriever.drain_source_timings()][-1] == "ok"
@@ -0,0 +1,81 @@
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2024
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. ("Cloudera") to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+"""This script copies RAG Studio's local summary stores from their JSON files into SQLite.
+
+Run it before setting SUMMARY_STORAGE_PROVIDER=SQLite, with RAG Studio stopped. Stores
+that haven't been migrated are otherwise migrated the first time they're opened.
+
+NOTE:
+
+* The JSON files are left where they are, so switching back to Local storage still works,
+  but won't see any summaries created in the meantime.
+
+Requirements:
+
+* Run this script from the llm-service/ directory:
+  ```python
+  uv run python scripts/migrate_summaries_to_sqlite.py
+  ```
+
+"""
+
+import os
+import sys
+
+sys.path.append(".")
+from app.ai.indexing.sqlite_kvstore import SqliteKVStore, has_json_store
+from app.config import settings
+
+
+def persist_dirs() -> list[str]:
+    try:
+        names = sorted(os.listdir(settings.rag_databases_dir))
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(settings.rag_databases_dir, name)
+        for name in names
+        if name.startswith("doc_summary_index_")
+    ]
+
+
+def main() -> None:
+    for persist_dir in persist_dirs():
+        if not has_json_store(persist_dir):
+            continue
+        imported = SqliteKVStore.from_persist_dir(persist_dir).migrate_from_json(
+            persist_dir
+        )
+        print(f"{persist_dir}: imported {imported} entries.")
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()